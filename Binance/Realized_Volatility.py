@@ -1,30 +1,43 @@
+import os
+import sys
+import time
+
 import pandas as pd
 import numpy as np
-import time
 
-# Step 1: Load the minute-level price data
-start_time = time.time()
-df = pd.read_csv("ETHUSDC.csv")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rv import RollingRV
 
-# Step 2: Calculate log returns
-log_returns = np.log(df["ETH_price"].values[1:] / df["ETH_price"].values[:-1])
+CHUNK_ROWS = 1_000_000
+
+# Step 1: Stream the minute-level price data
+start_time = time.time()
 
 # Step 3: Define rolling window size (1440 minutes = 1 day)
 window_size = 1440 * 5
+rv = RollingRV(window_size)
+
+# Step 2 + 4: log returns and rolling realized volatility, O(N) per chunk
+header = True
+prev_price = None
+seen = 0
+for chunk in pd.read_csv("ETHUSDC.csv", chunksize=CHUNK_ROWS):
+    price = chunk["ETH_price"].to_numpy(dtype=np.float64)
+    prev = np.concatenate([[np.nan if prev_price is None else prev_price], price[:-1]])
+    log_returns = np.log(price / prev)
+    prev_price = price[-1]
 
-# Step 4: Calculate rolling realized volatility using NumPy
-realized_volatility = np.array([
-    np.sqrt(np.sum(log_returns[i:i+window_size] ** 2))
-    for i in range(len(log_returns) - window_size + 1)
-])
+    # RV of row t uses the window_size returns ending at t (row 0 has no return)
+    chunk["Realized Volatility"] = rv.update(log_returns)
 
-# Step 5: Save results back to DataFrame
-result_df = df.iloc[window_size:].copy()
-result_df["Realized Volatility"] = realized_volatility
+    # Step 5: drop the first window_size rows (no full window yet), as before
+    result_df = chunk.iloc[max(window_size - seen, 0):]
+    seen += len(chunk)
 
-# Step 6: Save the result to a new CSV
-result_df.to_csv("RV.csv", index=False)
+    # Step 6: Save the result to a new CSV
+    result_df.to_csv("RV.csv", mode="w" if header else "a", index=False, header=header)
+    header = False
 
 end_time = time.time()
-print(f"Rolling realized volatility has been saved to 'RV_1m_optimized.csv'.")
+print(f"Rolling realized volatility has been saved to 'RV.csv'.")
 print(f"Execution time: {end_time - start_time:.2f} seconds")
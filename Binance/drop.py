@@ -1,19 +1,21 @@
-import pandas as pd
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from resample import resample_csv
 
 # Define file paths
 input_file = "ETHUSDC_1s.csv"
-output_file = "ETHUSDC_12s.csv"
-
-# Read the CSV file
-df = pd.read_csv(input_file)
-
-# Ensure the datetime column is parsed as datetime
-df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-
-# Resample to 15-second intervals by selecting every 15th row
-df_15s = df.iloc[11::12].reset_index(drop=True)
+outputs = {
+    "12s": "ETHUSDC_12s.csv",
+    "1min": "ETHUSDC_1min.csv",
+    "1h": "ETHUSDC_1h.csv",
+}
 
-# Save the new DataFrame to a CSV file
-df_15s.to_csv(output_file, index=False)
+# One streaming pass over the 1s file writes every interval: time buckets labelled by
+# their start, Open/High/Low/Close of ETH_price and the number of 1s rows (Count).
+# (Before: every 12th row via iloc[11::12], which shifted after any gap in the data.)
+rows = resample_csv(input_file, outputs, time_col="Timestamp", price_col="ETH_price")
 
-print(f"CSV with 15-second intervals saved as '{output_file}'.")
+for interval, output_file in outputs.items():
+    print(f"CSV with {interval} intervals saved as '{output_file}' ({rows[interval]:,} rows).")
@@ -1,23 +1,24 @@
-import pandas as pd
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from align import asof_join_csv
 
 # File paths
 block_file = "ETHUSDC_12s.csv"  # Contains blockNumber and timestamp
 price_file = "ETHUSDC_1s.csv"  # Contains price and timestamp
 output_file = "ETHUSDC.csv"
 
-# Read the two CSV files
-blocks_df = pd.read_csv(block_file)
-blocks_df.drop(columns=['ETH_price'], inplace=True)
-prices_df = pd.read_csv(price_file)
-
-# Ensure the timestamp columns are in datetime format
-blocks_df['Timestamp'] = pd.to_datetime(blocks_df['Timestamp'])
-prices_df['Timestamp'] = pd.to_datetime(prices_df['Timestamp'])
-
-# Merge the DataFrames on the timestamp column
-merged_df = pd.merge(blocks_df, prices_df, on="Timestamp", how="inner")
+# As-of join instead of an exact timestamp match: every block gets the last 1s price
+# at or before its timestamp (no look-ahead), as long as it is at most TOLERANCE old.
+DIRECTION = "backward"
+TOLERANCE = "2s"
+HOW = "inner"  # drop blocks without a price within tolerance (like the old inner merge)
 
-# Save the merged data to a new CSV file
-merged_df.to_csv(output_file, index=False)
+# Both files are streamed in chunks, so years of 1s data need not fit in memory
+report = asof_join_csv(block_file, price_file, output_file, left_on="Timestamp",
+                       direction=DIRECTION, tolerance=TOLERANCE, how=HOW,
+                       left_drop=["ETH_price", "Open", "High", "Low", "Close", "Count"])
 
 print(f"Merged data saved as '{output_file}'.")
+print(report.summary())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+mock_binance.py
+-------------------------------------------------
+Local stand-in for GET /api/v3/klines (and /api/v3/time) to exercise price.py.
+
+• same paging rules as Binance: open time ≥ startTime, ≤ endTime, at most
+  `limit` (≤ 1000) klines, oldest first
+• prices are a deterministic function of the open time → any run can be
+  checked against expected_close()
+• REQUEST_WEIGHT accounting per minute with X-MBX-USED-WEIGHT-1M, 429 +
+  Retry-After above --weight-limit；--fail-rate 隨機回 500 測 retry
+
+    python mock_binance.py --port 8765 --weight-limit 1200 --fail-rate 0.05
+    python price.py --base-url http://127.0.0.1:8765/api/v3 --start 2024-01-01 --end 2024-01-02
+"""
+
+import argparse
+import math
+import random
+import time
+
+from aiohttp import web
+
+INTERVAL_MS = {"1s": 1_000, "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000,
+               "30m": 1_800_000, "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000,
+               "6h": 21_600_000, "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000,
+               "3d": 259_200_000, "1w": 604_800_000}
+
+
+def expected_close(open_ms):
+    return round(2000.0 + 100.0 * math.sin(open_ms / 3.6e6) + (open_ms // 1000) % 7 * 0.01, 2)
+
+
+def make_app(weight_limit=6000, fail_rate=0.0, seed=0, listing_ms=0):
+    rng = random.Random(seed)
+    state = {"minute": None, "used": 0, "requests": 0}
+
+    def charge(weight):
+        minute = int(time.time() // 60)
+        if state["minute"] != minute:
+            state["minute"], state["used"] = minute, 0
+        state["used"] += weight
+        state["requests"] += 1
+        return state["used"]
+
+    async def klines(request):
+        used = charge(2)
+        headers = {"X-MBX-USED-WEIGHT-1M": str(used)}
+        if used > weight_limit:
+            retry = 60 - int(time.time()) % 60
+            return web.json_response({"code": -1003, "msg": "Too many requests"}, status=429,
+                                     headers={**headers, "Retry-After": str(retry)})
+        if fail_rate and rng.random() < fail_rate:
+            return web.json_response({"code": -1000, "msg": "mock failure"}, status=500, headers=headers)
+
+        q = request.query
+        step = INTERVAL_MS.get(q.get("interval"))
+        if step is None or "symbol" not in q:
+            return web.json_response({"code": -1120, "msg": "Invalid interval."}, status=400)
+        limit = min(int(q.get("limit", 500)), 1000)
+        start = int(q.get("startTime", listing_ms))
+        end = int(q.get("endTime", int(time.time() * 1000)))
+
+        first = max(-(-start // step) * step, listing_ms)
+        rows = []
+        for t in range(first, end + 1, step):
+            if len(rows) == limit:
+                break
+            c = expected_close(t)
+            rows.append([t, f"{c:.2f}", f"{c + 1:.2f}", f"{c - 1:.2f}", f"{c:.2f}", "1.0",
+                         t + step - 1, f"{c:.2f}", 1, "0.5", f"{c / 2:.2f}", "0"])
+        return web.json_response(rows, headers=headers)
+
+    async def server_time(request):
+        return web.json_response({"serverTime": int(time.time() * 1000)})
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_get("/api/v3/klines", klines)
+    app.router.add_get("/api/v3/time", server_time)
+    return app
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Mock Binance /api/v3/klines server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--weight-limit", type=int, default=6000)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args(argv)
+    web.run_app(make_app(args.weight_limit, args.fail_rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
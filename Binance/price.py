@@ -1,88 +1,229 @@
-import requests
-import pandas as pd
+#!/usr/bin/env python
+"""
+price.py
+-------------------------------------------------
+Binance klines → {symbol}_{interval}.csv  (Open Time, Close Price)
+
+• the time range is cut into windows of WINDOW_PAGES × 1000 klines; many
+  windows are in flight at once (asyncio + aiohttp)
+• every request first takes its weight from a token bucket (REQUEST_WEIGHT
+  per minute)；伺服器回傳的 X-MBX-USED-WEIGHT-1M 會把 bucket 校正下來，
+  429 / 418 依 Retry-After 等待
+• windows are written to the CSV in order as soon as they are complete;
+  <out>.progress.json records the last completed window, so a crashed run
+  resumes from there (python price.py ... again)
+• --base-url points at another server, e.g. mock_binance.py
+
+    python price.py --symbol ETHUSDT --interval 1s --start 2020-08-25T07:57:22 --end 2021-08-25
+    python mock_binance.py --port 8765 &  python price.py --base-url http://127.0.0.1:8765/api/v3
+"""
+
+import argparse
+import asyncio
 import datetime
+import json
+import os
 import time
 
+import aiohttp
+import pandas as pd
+
 # Define the base URL and endpoint for Binance API
 BASE_URL = "https://api.binance.com/api/v3"
 ENDPOINT = "/klines"
 
-# Define the trading pair and interval
-symbol = "ETHUSDT"
-interval = "1s"  # 1-hour candlesticks
-
-# Convert start and end dates to UTC timestamps in milliseconds
-start_time = int(datetime.datetime(2020, 8, 25, 7, 57, 22, tzinfo=datetime.timezone.utc).timestamp() * 1000)
-end_time = int(datetime.datetime(2020, 8, 25, 8, 57, 22, tzinfo=datetime.timezone.utc).timestamp() * 1000)
-
-start = time.time()
-
-print(f"Fetching data from {datetime.datetime.fromtimestamp(start_time/1000, datetime.timezone.utc)} UTC "
-      f"to {datetime.datetime.fromtimestamp(end_time/1000, datetime.timezone.utc)} UTC")
-
-# Function to fetch data in batches
-def fetch_data(start_time, end_time, symbol, interval):
-    all_data = []
-    
-    while start_time < end_time:
-        params = {
-            "symbol": symbol,
-            "interval": interval,
-            "startTime": start_time,
-            "endTime": end_time,
-            "limit": 1000  # Binance API allows max 1000 per request
-        }
-
-        response = requests.get(BASE_URL + ENDPOINT, params=params)
-
-        if response.status_code == 200:
-            data = response.json()
-            if not data:
-                break  # No more data available
-
-            # Append data to the list
-            all_data.extend(data)
-
-            # Move to the next batch (next timestamp after the last one)
-            last_timestamp = data[-1][0]
-            if last_timestamp == start_time:  # Prevent infinite loops if no progress is made
-                break
-            start_time = last_timestamp + 1  # Avoid duplicate entries
-
-            # Respect API rate limits
-            time.sleep(0.1)
-        else:
-            print(f"Error: Unable to fetch data. Status code {response.status_code}")
+PAGE_LIMIT    = 1000                  # Binance API allows max 1000 per request
+KLINES_WEIGHT = 2                     # request weight of /klines with limit ≤ 1000
+WEIGHT_LIMIT  = 6000                  # REQUEST_WEIGHT per minute (spot API)
+WINDOW_PAGES  = 1                     # pages per window (= unit of resume)
+MAX_RETRIES   = 8
+
+INTERVAL_MS = {"1s": 1_000, "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000,
+               "30m": 1_800_000, "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000,
+               "6h": 21_600_000, "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000,
+               "3d": 259_200_000, "1w": 604_800_000}
+
+COLUMNS = ["Open Time", "Close Price"]
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"   # fixed: pandas drops the time when a window is all midnights
+
+
+# ---------------- 1. rate limit ---------------- #
+class TokenBucket:
+    """Weight-aware token bucket: `capacity` tokens, refilled over `period` seconds."""
+
+    def __init__(self, capacity=WEIGHT_LIMIT, period=60.0):
+        self.capacity = float(capacity)
+        self.rate     = capacity / period
+        self.tokens   = float(capacity)
+        self._t       = time.monotonic()
+        self._lock    = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    async def acquire(self, weight):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+
+    def observe(self, used):
+        """Server says `used` weight is spent this minute → never hold more than what is left."""
+        self._refill()
+        self.tokens = min(self.tokens, max(self.capacity - used, 0.0))
+
+    def pause(self, seconds):
+        """429 / 418: nothing may be sent for `seconds`."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+# ---------------- 2. one window ---------------- #
+async def fetch_window(session, bucket, base_url, symbol, interval, lo, hi):
+    """All klines with open time in [lo, hi), paging within the window."""
+    rows = []
+    while lo < hi:
+        params = {"symbol": symbol, "interval": interval,
+                  "startTime": lo, "endTime": hi - 1, "limit": PAGE_LIMIT}
+        page = None
+        for attempt in range(MAX_RETRIES):
+            await bucket.acquire(KLINES_WEIGHT)
+            try:
+                async with session.get(base_url + ENDPOINT, params=params) as resp:
+                    used = resp.headers.get("X-MBX-USED-WEIGHT-1M")
+                    if used is not None:
+                        bucket.observe(float(used))
+                    if resp.status in (418, 429):
+                        bucket.pause(float(resp.headers.get("Retry-After", 2 ** attempt)))
+                        continue
+                    if resp.status >= 500:
+                        await asyncio.sleep(min(2 ** attempt * 0.5, 30))
+                        continue
+                    if resp.status != 200:
+                        raise RuntimeError(f"HTTP {resp.status} for {params}: {await resp.text()}")
+                    page = await resp.json()
+                    break
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(min(2 ** attempt * 0.5, 30))
+        if page is None:
+            raise RuntimeError(f"giving up on window starting {lo} after {MAX_RETRIES} attempts")
+
+        rows.extend((k[0], float(k[4])) for k in page)
+        if len(page) < PAGE_LIMIT:
             break
-
-    return all_data
-
-# Fetch data from Binance API
-data = fetch_data(start_time, end_time, symbol, interval)
-
-
-if not data:
-    print("No data retrieved. Check your parameters or API limits.")
-    exit()
-
-# Extract relevant columns: Open Time and Close Price
-columns = ["Open Time", "Close Price"]
-extracted_data = [[item[0], float(item[4])] for item in data]
-
-# Create DataFrame
-df = pd.DataFrame(extracted_data, columns=columns)
-
-# Convert timestamps to readable UTC datetime format
-df["Open Time"] = pd.to_datetime(df["Open Time"], unit="ms", utc=True).dt.tz_localize(None)
-
-end = time.time()
-print(f"cost time: {end - start}")
-
-# Ensure no boundary issues by checking the first and last rows
-print(f"First timestamp: {df.iloc[0]['Open Time']}")
-print(f"Last timestamp: {df.iloc[-1]['Open Time']}")
-
-# Save to CSV
-df.to_csv(f"{symbol}_{interval}.csv", index=False)
-
-print(f"✅ Data successfully saved to {symbol}_{interval}.csv")
+        lo = page[-1][0] + 1                                  # Avoid duplicate entries
+    return rows
+
+
+# ---------------- 3. ordered writer + resume ---------------- #
+def _progress_file(out):
+    return out + ".progress.json"
+
+
+def _load_progress(out, job):
+    """Resume point for the same job, truncating the CSV to its last committed size."""
+    path = _progress_file(out)
+    if not (os.path.exists(path) and os.path.exists(out)):
+        return None
+    with open(path) as f:
+        prog = json.load(f)
+    if any(prog.get(k) != v for k, v in job.items()) or os.path.getsize(out) < prog["bytes"]:
+        return None
+    with open(out, "r+b") as f:
+        f.truncate(prog["bytes"])
+    return prog["done_until"]
+
+
+def _save_progress(out, job, done_until, nbytes):
+    tmp = _progress_file(out) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({**job, "done_until": done_until, "bytes": nbytes}, f)
+    os.replace(tmp, _progress_file(out))
+
+
+def _to_frame(rows):
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    # Convert timestamps to readable UTC datetime format
+    df["Open Time"] = pd.to_datetime(df["Open Time"], unit="ms", utc=True).dt.tz_localize(None)
+    return df
+
+
+async def download(symbol, interval, start_ms, end_ms, out, base_url=BASE_URL,
+                   concurrency=16, weight_limit=WEIGHT_LIMIT, window_pages=WINDOW_PAGES):
+    """Klines with open time in [start_ms, end_ms) → out; returns rows written this run."""
+    step = INTERVAL_MS[interval] * PAGE_LIMIT * window_pages
+    job = {"symbol": symbol, "interval": interval, "start": start_ms, "end": end_ms}
+
+    done_until = _load_progress(out, job)
+    if done_until is None:
+        pd.DataFrame(columns=COLUMNS).to_csv(out, index=False)
+        done_until = start_ms
+        _save_progress(out, job, done_until, os.path.getsize(out))
+
+    windows = [(lo, min(lo + step, end_ms)) for lo in range(done_until, end_ms, step)]
+    bucket  = TokenBucket(weight_limit)
+    ahead   = 2 * concurrency                                 # windows buffered ahead of the writer
+    written = 0
+
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout,
+                                     connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        tasks, nxt = {}, 0
+        try:
+            for i, (lo, hi) in enumerate(windows):
+                while nxt < len(windows) and nxt < i + ahead:
+                    tasks[nxt] = asyncio.create_task(
+                        fetch_window(session, bucket, base_url, symbol, interval, *windows[nxt]))
+                    nxt += 1
+                rows = await tasks.pop(i)
+                if rows:
+                    _to_frame(rows).to_csv(out, mode="a", header=False, index=False, date_format=DATE_FORMAT)
+                    written += len(rows)
+                _save_progress(out, job, hi, os.path.getsize(out))
+        finally:
+            for t in tasks.values():
+                t.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return written
+
+
+# ---------------- 4. CLI ---------------- #
+def _utc_ms(text):
+    dt = datetime.datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Concurrent Binance kline downloader with resume")
+    ap.add_argument("--symbol", default="ETHUSDT")
+    ap.add_argument("--interval", default="1s", choices=list(INTERVAL_MS))
+    ap.add_argument("--start", default="2020-08-25T07:57:22", help="UTC, ISO format")
+    ap.add_argument("--end", default="2020-08-25T08:57:22", help="UTC, ISO format (exclusive)")
+    ap.add_argument("--out", default=None, help="default: {symbol}_{interval}.csv")
+    ap.add_argument("--base-url", default=BASE_URL)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--weight-limit", type=int, default=WEIGHT_LIMIT, help="request weight per minute")
+    args = ap.parse_args(argv)
+
+    out = args.out or f"{args.symbol}_{args.interval}.csv"
+    start_ms, end_ms = _utc_ms(args.start), _utc_ms(args.end)
+    print(f"Fetching data from {datetime.datetime.fromtimestamp(start_ms/1000, datetime.timezone.utc)} UTC "
+          f"to {datetime.datetime.fromtimestamp(end_ms/1000, datetime.timezone.utc)} UTC")
+
+    start = time.time()
+    n = asyncio.run(download(args.symbol, args.interval, start_ms, end_ms, out,
+                             base_url=args.base_url, concurrency=args.concurrency,
+                             weight_limit=args.weight_limit))
+    print(f"cost time: {time.time() - start:.1f} s  ({n:,} new rows)")
+    print(f"✅ Data successfully saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
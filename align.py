@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+align.py
+-------------------------------------------------
+Streaming as-of join: block timestamps (DEX) ← CEX price series.
+
+• same result as pd.merge_asof(left, right, on=…, direction=…, tolerance=…)
+  on the whole files, but both inputs are read in chunks: a left row is
+  joined as soon as the right buffer reaches past its time, and the right
+  buffer only keeps rows a later left row can still match
+• direction: backward (last price at or before the block, no look-ahead),
+  forward, nearest；tolerance = 最大容許時間差
+• report: rows, matched, out of tolerance, largest |lag|
+
+    python align.py ETHUSDC_12s.csv ETHUSDC_1s.csv ETHUSDC.csv --tolerance 2s
+    python align.py blocks.csv prices.csv out.csv --left-on Timestamp --right-on "Open Time" --how inner
+"""
+
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+_RT = "__right_time"
+
+
+@dataclass
+class AsofReport:
+    rows: int = 0
+    matched: int = 0
+    max_lag: pd.Timedelta = pd.Timedelta(0)
+
+    @property
+    def out_of_tolerance(self):
+        return self.rows - self.matched
+
+    def summary(self):
+        pct = self.out_of_tolerance / self.rows if self.rows else 0.0
+        return (f"rows = {self.rows:,}  matched = {self.matched:,}  "
+                f"out of tolerance = {self.out_of_tolerance:,} ({pct:.2%})  max |lag| = {self.max_lag}")
+
+
+def _sorted_times(frame, col, name):
+    t = pd.to_datetime(frame[col]).astype("datetime64[ns]")
+    if not t.is_monotonic_increasing:
+        raise ValueError(f"{name} input is not sorted by {col!r}")
+    return frame.assign(**{col: t})
+
+
+def asof_stream(left_chunks, right_chunks, left_on, right_on=None, direction="backward",
+                tolerance=None, how="left", report=None):
+    """Yield joined frames for every left chunk piece; inputs must be sorted by time."""
+    right_on = right_on or left_on
+    tolerance = pd.Timedelta(tolerance) if tolerance is not None else None
+    report = AsofReport() if report is None else report
+
+    right_iter = iter(right_chunks)
+    rbuf, r_done = None, False
+    last_left = None
+
+    def more_right():
+        nonlocal rbuf, r_done
+        try:
+            chunk = _sorted_times(next(right_iter), right_on, "right")
+        except StopIteration:
+            r_done = True
+            return
+        chunk[_RT] = chunk[right_on]
+        if rbuf is not None and len(rbuf) and len(chunk) and chunk[right_on].iloc[0] < rbuf[right_on].iloc[-1]:
+            raise ValueError("right input is not sorted across chunks")
+        rbuf = chunk if rbuf is None else pd.concat([rbuf, chunk], ignore_index=True)
+
+    for left in left_chunks:
+        left = _sorted_times(left, left_on, "left")
+        if len(left) and last_left is not None and left[left_on].iloc[0] < last_left:
+            raise ValueError("left input is not sorted across chunks")
+        while len(left):
+            # left rows strictly before the last buffered right time are fully determined
+            while not r_done and (rbuf is None or not len(rbuf)
+                                  or rbuf[right_on].iloc[-1] <= left[left_on].iloc[0]):
+                more_right()
+            if r_done:
+                ready = len(left)
+            else:
+                ready = int(np.searchsorted(left[left_on].to_numpy(), rbuf[right_on].iloc[-1].to_datetime64(),
+                                            side="left"))
+                if ready == 0:
+                    more_right()
+                    continue
+
+            part, left = left.iloc[:ready], left.iloc[ready:]
+            if rbuf is None:                                  # empty right input
+                joined = part.assign(**{_RT: pd.NaT})
+            else:
+                joined = pd.merge_asof(part, rbuf.drop(columns=[right_on]), left_on=left_on, right_on=_RT,
+                                       direction=direction, tolerance=tolerance)
+            ok = joined[_RT].notna()
+            report.rows += len(joined)
+            report.matched += int(ok.sum())
+            if ok.any():
+                report.max_lag = max(report.max_lag, (joined.loc[ok, left_on] - joined.loc[ok, _RT]).abs().max())
+            if how == "inner":
+                joined = joined[ok]
+            yield joined.drop(columns=[_RT])
+
+            # keep right rows from the last one ≤ the newest joined time (and its ties)
+            last_left = part[left_on].iloc[-1]
+            if rbuf is not None and len(rbuf):
+                rt = rbuf[right_on].to_numpy()
+                pos = int(np.searchsorted(rt, last_left.to_datetime64(), side="right")) - 1
+                if pos > 0:
+                    pos = int(np.searchsorted(rt, rt[pos], side="left"))
+                    rbuf = rbuf.iloc[pos:].reset_index(drop=True)
+
+
+def asof_join_csv(left_csv, right_csv, out_csv, left_on="Timestamp", right_on=None,
+                  direction="backward", tolerance=None, how="left", chunksize=CHUNK_ROWS,
+                  left_drop=(), right_usecols=None):
+    """CSV → CSV as-of join, chunk by chunk; returns the AsofReport."""
+    report = AsofReport()
+    left = (c.drop(columns=[d for d in left_drop if d in c.columns])
+            for c in pd.read_csv(left_csv, chunksize=chunksize))
+    right = pd.read_csv(right_csv, chunksize=chunksize, usecols=right_usecols)
+    header = True
+    for frame in asof_stream(left, right, left_on, right_on, direction, tolerance, how, report):
+        frame.to_csv(out_csv, mode="w" if header else "a", header=header, index=False)
+        header = False
+    if header:                                                # no rows at all
+        pd.DataFrame().to_csv(out_csv, index=False)
+    return report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Streaming as-of join of block times with a price series")
+    ap.add_argument("left", help="block CSV (sorted by time)")
+    ap.add_argument("right", help="price CSV (sorted by time)")
+    ap.add_argument("out")
+    ap.add_argument("--left-on", default="Timestamp")
+    ap.add_argument("--right-on", default=None, help="default: --left-on")
+    ap.add_argument("--direction", choices=["backward", "forward", "nearest"], default="backward")
+    ap.add_argument("--tolerance", default=None, help="e.g. 2s, 500ms (default: unlimited)")
+    ap.add_argument("--how", choices=["left", "inner"], default="left",
+                    help="inner drops rows without a match in tolerance")
+    ap.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args(argv)
+
+    report = asof_join_csv(args.left, args.right, args.out, args.left_on, args.right_on,
+                           args.direction, args.tolerance, args.how, args.chunksize)
+    print(f"✅ {args.out}  {report.summary()}")
+
+
+if __name__ == "__main__":
+    main()
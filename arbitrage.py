@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+arbitrage.py
+-------------------------------------------------
+CEX–DEX analytics per block for a constant-product pool: price gap,
+fee-aware optimal arbitrage and loss-versus-rebalancing (LVR).
+
+• inputs (both sorted by blockNumber, streamed in chunks → bounded memory):
+      <pool>.csv     pipeline.py output: blockNumber, price, pool_value, fee
+      CEX prices     blockNumber + a price column in the same quote / base
+                     convention (e.g. block_time.py annotate → align.py join
+                     with the Binance 1s prices)；每個區塊取 ≤ 該區塊最後一筆
+• reserves from the pool state: y (quote) = pool_value / 2, x (base) = y / P,
+  k = x·y, γ = 1 − fee
+• optimal arbitrage against CEX price m (closed form, 0 inside the no-arb
+  band P·γ ≤ m ≤ P / γ):
+      m > P/γ  buy base:   quote in  Δy = (√(γ·m·k) − y) / γ,  base out Δx = x − √(k / (γ·m))
+      m < P·γ  sell base:  base in   Δx = (√(γ·k / m) − x) / γ, quote out Δy = y − √(k·m / γ)
+  profit = CEX value received − paid；fee to LPs = fee × input (in quote)
+• LVR per block (per unit of liquidity, marked at the CEX price m_t):
+      lvr_t = L_{t-1} · [ (√P_{t-1} + m_t/√P_{t-1}) − (√P_t + m_t/√P_t) ],   L = pool_value / (2√P)
+  = rebalancing portfolio P&L − pool P&L, without the mints / burns that
+  also move pool_value；cum_lvr 與 cum_fee（LP 的手續費收入）可以直接比較
+
+    python arbitrage.py USDC_ETH --cex ETHUSDC_blocks.csv --cex-col ETH_price
+    python arbitrage.py USDC_ETH --cex ETHUSDC_blocks.csv --fee-bps 5 --out USDC_ETH_arb5.csv
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from pools import POOLS, get_pool
+
+CHUNK_ROWS = 1_000_000
+
+
+# ============================================================
+# 1‧ closed form：gap、最佳套利量、利潤
+# ============================================================
+def optimal_arbitrage(price, pool_value, cex, fee_rate):
+    """Per-block optimal arbitrage against the CEX price; every argument may be an array.
+
+    Returns a dict of arrays: gap (m / P − 1), side (+1 buy base from the pool,
+    −1 sell base to it, 0 inside the no-arb band), base (|Δx|), quote (|Δy|),
+    profit and fee (both in quote, valued at the CEX price).
+    """
+    P = np.asarray(price, dtype=np.float64)
+    m = np.asarray(cex, dtype=np.float64)
+    g = 1.0 - fee_rate
+    y = np.asarray(pool_value, dtype=np.float64) / 2
+    x = y / P
+    k = x * y
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        buy = m * g > P                                       # m > P / γ
+        sell = m < P * g
+        dy = np.where(buy, (np.sqrt(g * m * k) - y) / g, np.where(sell, y - np.sqrt(k * m / g), 0.0))
+        dx = np.where(buy, x - np.sqrt(k / (g * m)), np.where(sell, (np.sqrt(g * k / m) - x) / g, 0.0))
+        profit = np.where(buy, m * dx - dy, np.where(sell, dy - m * dx, 0.0))
+        fee = fee_rate * np.where(buy, dy, np.where(sell, m * dx, 0.0))
+        return {"gap": m / P - 1.0, "side": buy.astype(np.int8) - sell.astype(np.int8),
+                "base": dx, "quote": dy, "profit": profit, "fee": fee}
+
+
+def lvr_increment(prev_price, price, prev_liquidity, cex):
+    """Loss-versus-rebalancing of each block in quote (closed form, see module docstring)."""
+    sp0, sp1 = np.sqrt(prev_price), np.sqrt(price)
+    return prev_liquidity * ((sp0 + cex / sp0) - (sp1 + cex / sp1))
+
+
+# ============================================================
+# 2‧ streaming：pool 區塊 ← CEX 價格（≤ 區塊的最後一筆）
+# ============================================================
+class CexByBlock:
+    """Backward lookup of a block-sorted CEX CSV, reading it chunk by chunk."""
+
+    def __init__(self, path, col, chunksize=CHUNK_ROWS):
+        self.chunks = pd.read_csv(path, usecols=["blockNumber", col], chunksize=chunksize)
+        self.col = col
+        self.blocks = np.empty(0, dtype=np.int64)
+        self.prices = np.empty(0, dtype=np.float64)
+        self.done = False
+
+    def _more(self):
+        try:
+            c = next(self.chunks).dropna()
+        except StopIteration:
+            self.done = True
+            return
+        b = c["blockNumber"].to_numpy(dtype=np.int64)
+        if (len(b) and len(self.blocks) and b[0] < self.blocks[-1]) or np.any(np.diff(b) < 0):
+            raise ValueError("CEX input is not sorted by blockNumber")
+        self.blocks = np.r_[self.blocks, b]
+        self.prices = np.r_[self.prices, c[self.col].to_numpy(dtype=np.float64)]
+
+    def at(self, blocks):
+        """CEX price of the last row ≤ each block (NaN before the first one); blocks ascending."""
+        while not self.done and (not len(self.blocks) or self.blocks[-1] <= blocks[-1]):
+            self._more()
+        idx = np.searchsorted(self.blocks, blocks, side="right") - 1
+        out = self.prices[np.maximum(idx, 0)] if len(self.prices) else np.full(len(blocks), np.nan)
+        out[idx < 0] = np.nan
+        keep = max(int(idx[-1]), 0)                           # later blocks only need rows ≥ this one
+        self.blocks, self.prices = self.blocks[keep:], self.prices[keep:]
+        return out
+
+
+def arbitrage_frames(pool_chunks, cex, fee_rate):
+    """Yield one output frame per pool chunk; LVR / cumulative sums carry across chunks."""
+    prev_p, prev_l = np.nan, np.nan
+    cum = np.zeros(3)                                         # lvr, arb profit, LP fee income
+    for c in pool_chunks:
+        blk = c["blockNumber"].to_numpy(dtype=np.int64)
+        if not len(blk):
+            continue
+        P = c["price"].to_numpy(dtype=np.float64)
+        V = c["pool_value"].to_numpy(dtype=np.float64)
+        m = cex.at(blk)
+        L = V / (2 * np.sqrt(P))
+
+        arb = optimal_arbitrage(P, V, m, fee_rate)
+        lvr = lvr_increment(np.r_[prev_p, P[:-1]], P, np.r_[prev_l, L[:-1]], m)
+        prev_p, prev_l = P[-1], L[-1]
+
+        parts = [np.nan_to_num(lvr), np.nan_to_num(arb["profit"]), np.nan_to_num(c["fee"].to_numpy(dtype=np.float64))]
+        sums = [np.cumsum(a) + s for a, s in zip(parts, cum)]
+        cum = np.array([s[-1] for s in sums])
+        yield pd.DataFrame({"blockNumber": blk, "price": P, "cex_price": m, "gap": arb["gap"],
+                            "side": arb["side"], "arb_base": arb["base"], "arb_quote": arb["quote"],
+                            "arb_profit": arb["profit"], "arb_fee": arb["fee"], "lvr": lvr,
+                            "cum_lvr": sums[0], "cum_arb_profit": sums[1], "cum_fee": sums[2]})
+
+
+def arbitrage_csv(pool_csv, cex_csv, out_csv, fee_rate, cex_col="ETH_price", chunksize=CHUNK_ROWS):
+    """CSV → CSV, chunk by chunk; returns (rows, cum_lvr, cum_arb_profit, cum_fee)."""
+    chunks = (c.dropna(subset=["price"]) for c in
+              pd.read_csv(pool_csv, usecols=["blockNumber", "price", "pool_value", "fee"], chunksize=chunksize))
+    cex = CexByBlock(cex_csv, cex_col, chunksize)
+    mode, rows, last = "w", 0, None
+    for frame in arbitrage_frames(chunks, cex, fee_rate):
+        frame.to_csv(out_csv, mode=mode, header=(mode == "w"), index=False)
+        mode, rows, last = "a", rows + len(frame), frame.iloc[-1]
+    if last is None:
+        return 0, 0.0, 0.0, 0.0
+    return rows, last["cum_lvr"], last["cum_arb_profit"], last["cum_fee"]
+
+
+# ============================================================
+# 3‧ CLI
+# ============================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-block CEX–DEX gap, optimal arbitrage and LVR")
+    ap.add_argument("pool", help=f"pool name ({', '.join(POOLS)})")
+    ap.add_argument("--cex", required=True, help="CSV with blockNumber and the CEX price (sorted by block)")
+    ap.add_argument("--cex-col", default="ETH_price", help="price column in --cex (quote / base)")
+    ap.add_argument("--data-dir", default=".", help="directory with the pipeline output <pool>.csv")
+    ap.add_argument("--fee-bps", type=float, default=None, help="default: the pool's fee")
+    ap.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--out", default=None, help="default: <pool>_arb.csv")
+    args = ap.parse_args(argv)
+
+    pool = get_pool(args.pool)
+    fee_rate = pool.fee_rate if args.fee_bps is None else args.fee_bps / 10_000
+    out = args.out or f"{pool.name}_arb.csv"
+    start = time.perf_counter()
+    rows, lvr, profit, fee = arbitrage_csv(os.path.join(args.data_dir, pool.output_file), args.cex, out,
+                                           fee_rate, args.cex_col, args.chunksize)
+    print(f"✅ {out}  rows = {rows:,}  ({time.perf_counter() - start:.1f} s)")
+    print(f"   cum LVR = {lvr:,.2f}  arb profit = {profit:,.2f}  LP fees = {fee:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+"""
+preprocess.py  (Balancer V2)
+-------------------------------------------------
+Per-block features of Balancer V2 weighted pools in the same schema as
+pipeline.py: blockNumber, price, pool_value, RV, volume, fee.
+
+• per pool (pools.BALANCER_POOLS) two CSVs, both with the V2 swap columns
+  blockNumber, amount0In, amount1In, amount0Out, amount1Out:
+      <pool>_swaps.csv      Vault Swap events of the poolId (what fetch/swap.cjs writes)
+      <pool>_balances.csv   PoolBalanceChanged: join delta → In；exit delta 與
+                            protocol fee → Out
+• balances = initial + Σ In − Σ Out per token, exact running sums on uint256
+  limbs (wideint.cumsum)；每個區塊最後的餘額 = change point
+• weighted spot price  p = (B_q / w_q) / (B_b / w_b)，pool_value = B_q + B_b·p
+• volume / fee / RV / chunked output: pipeline.block_volume / block_frames
+• shard: one streaming pass over Vault-wide CSVs (every poolId behind the one
+  Vault address) writes the per-pool files, then the pools run in parallel
+
+  Vault-wide input:
+      vault_swaps.csv      blockNumber, poolId, tokenIn, tokenOut, amountIn, amountOut
+      vault_balances.csv   blockNumber, poolId, tokens, deltas, protocolFeeAmounts
+                           (arrays ';'-joined in the Vault's token order)
+
+    python balancerv2/preprocess.py --all --vault-swaps vault_swaps.csv --vault-balances vault_balances.csv
+    python balancerv2/preprocess.py GNO_COW --data-dir data --sparse
+    python balancerv2/preprocess.py GNO_COW --initial 1000000000000000000000,250000000000000000000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import profiling
+import wideint
+from event_cache import load_table
+from pipeline import block_frames, block_volume, to_units
+from pools import BALANCER_POOLS, get_balancer_pool
+
+COLUMNS    = ["blockNumber", "amount0In", "amount1In", "amount0Out", "amount1Out"]
+CHUNK_ROWS = 1_000_000
+
+
+# ============================================================
+# 1‧ shard：Vault-wide events → per-pool CSVs
+# ============================================================
+def _per_pool(chunk, pools):
+    """(pool, rows of that pool) for the registered poolIds in a chunk."""
+    ids = chunk["poolId"].str.lower()
+    by_id = {p.pool_id.lower(): p for p in pools}
+    for pid, rows in chunk[ids.isin(by_id.keys())].groupby(ids, sort=False):
+        yield by_id[pid], rows
+
+
+def _swap_rows(rows, pool):
+    t_in, t_out = rows["tokenIn"].str.lower(), rows["tokenOut"].str.lower()
+    a0, a1 = pool.token0_address.lower(), pool.token1_address.lower()
+    return pd.DataFrame({
+        "blockNumber": rows["blockNumber"],
+        "amount0In":   rows["amountIn"].where(t_in == a0, "0"),
+        "amount1In":   rows["amountIn"].where(t_in == a1, "0"),
+        "amount0Out":  rows["amountOut"].where(t_out == a0, "0"),
+        "amount1Out":  rows["amountOut"].where(t_out == a1, "0"),
+    })
+
+
+def _balance_rows(rows, pool):
+    tokens = rows["tokens"].str.lower().str.split(";", expand=True)
+    want = [pool.token0_address.lower(), pool.token1_address.lower()]
+    if tokens.shape[1] != 2 or not (tokens[0] == want[0]).all() or not (tokens[1] == want[1]).all():
+        raise ValueError(f"{pool.name}: PoolBalanceChanged tokens differ from {want}")
+    deltas = rows["deltas"].str.split(";", expand=True)
+    fees = rows["protocolFeeAmounts"].str.split(";", expand=True)
+
+    out = {"blockNumber": rows["blockNumber"].to_numpy()}
+    for i in (0, 1):
+        neg = deltas[i].str.startswith("-").to_numpy()
+        mag = wideint.from_column(deltas[i].str.lstrip("-").to_numpy())
+        fee = wideint.from_column(fees[i].to_numpy())
+        # exit: −delta − protocol fee；join: +delta − protocol fee
+        out[f"amount{i}In"]  = np.where(neg, "0", wideint.to_decimal(mag))
+        out[f"amount{i}Out"] = wideint.to_decimal(wideint.add(np.where(neg[:, None], mag, 0), fee))
+    return pd.DataFrame(out)[COLUMNS]
+
+
+def shard(vault_csv, pools, data_dir=".", kind="swaps", chunksize=CHUNK_ROWS):
+    """Split a Vault-wide event CSV into <pool>_swaps.csv / <pool>_balances.csv; returns rows per pool."""
+    convert = _swap_rows if kind == "swaps" else _balance_rows
+    paths = {p.name: os.path.join(data_dir, p.swap_file if kind == "swaps" else p.balance_file)
+             for p in pools}
+    for path in paths.values():
+        pd.DataFrame(columns=COLUMNS).to_csv(path, index=False)
+    rows = {p.name: 0 for p in pools}
+    for chunk in pd.read_csv(vault_csv, dtype=str, chunksize=chunksize):
+        for pool, part in _per_pool(chunk, pools):
+            out = convert(part, pool)
+            out.to_csv(paths[pool.name], mode="a", header=False, index=False)
+            rows[pool.name] += len(out)
+    return rows
+
+
+# ============================================================
+# 2‧ balances → change points（每個有事件的區塊最後的餘額）
+# ============================================================
+def balance_changes(swaps, balances, pool, initial=(0, 0)):
+    """Swap + PoolBalanceChanged tables → blockNumber, price, pool_value per block with an event."""
+    blk = np.r_[swaps["blockNumber"], balances["blockNumber"]].astype(np.int64)
+    order = np.argsort(blk, kind="stable")
+    blk = blk[order]
+    last = np.flatnonzero(np.r_[blk[1:] != blk[:-1], len(blk) > 0])
+
+    bal = []
+    for i, init in enumerate(initial):
+        flows = {d: wideint.cumsum(np.concatenate([swaps[f"amount{i}{d}"], balances[f"amount{i}{d}"]])[order])[last]
+                 for d in ("In", "Out")}
+        start = wideint.from_column(np.full(len(last), int(init), dtype=object))
+        try:
+            bal.append(wideint.sub(wideint.add(start, flows["In"]), flows["Out"]))
+        except OverflowError:
+            raise ValueError(f"{pool.name}: token{i} balance goes negative — events start after "
+                             "the pool was funded; pass the balances before the first event (--initial)") from None
+
+    # 人類單位 → quote / base，weighted spot price
+    bal_h = (to_units(bal[0], pool.dec0), to_units(bal[1], pool.dec1))
+    weight = (pool.weight0, pool.weight1)
+    q, b = pool.numeraire, 1 - pool.numeraire
+    bq, bb = bal_h[q], bal_h[b]
+    live = (bq > 0) & (bb > 0)                                # empty pool → no price
+    price = (bq[live] / weight[q]) / (bb[live] / weight[b])
+    return pd.DataFrame({"blockNumber": blk[last][live], "price": price,
+                         "pool_value": pd.Series(bq[live] + bb[live] * price).apply(int)})
+
+
+# ============================================================
+# 3‧ 一個 pool：讀檔 → change points → volume → 輸出
+# ============================================================
+def preprocess_pool(pool, data_dir=".", out_dir=None, dense=True, initial=(0, 0)):
+    """Run the Balancer pipeline for one pool; returns (pool name, rows, seconds)."""
+    if isinstance(pool, str):
+        pool = get_balancer_pool(pool)
+    with profiling.run(pool.name):
+        return _preprocess_pool(pool, data_dir, out_dir, dense, initial)
+
+
+def _preprocess_pool(pool, data_dir, out_dir, dense, initial):
+    out_dir = data_dir if out_dir is None else out_dir
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    with profiling.stage("load") as st:
+        swaps = load_table(os.path.join(data_dir, pool.swap_file))
+        balances = load_table(os.path.join(data_dir, pool.balance_file))
+        st.rows = len(swaps["blockNumber"]) + len(balances["blockNumber"])
+    with profiling.stage("reserves") as st:
+        changes = balance_changes(swaps, balances, pool, initial)
+        st.rows = len(swaps["blockNumber"]) + len(balances["blockNumber"])
+    if changes.empty:
+        raise ValueError(f"{pool.name}: no block with both balances > 0")
+    with profiling.stage("classify") as st:
+        swaps_blk = block_volume(swaps, changes, pool)
+        st.rows = len(swaps["blockNumber"])
+    del swaps, balances
+
+    output, mode, rows = os.path.join(out_dir, pool.output_file), "w", 0
+    for frame in block_frames(changes, swaps_blk, pool, dense=dense):
+        with profiling.stage("write") as st:
+            frame.to_csv(output, mode=mode, header=(mode == "w"), index=False)
+            mode, rows = "a", rows + len(frame)
+            st.rows = len(frame)
+    return pool.name, rows, time.perf_counter() - start
+
+
+# ============================================================
+# 4‧ CLI：shard 一次，pools 平行跑
+# ============================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-block features for Balancer V2 weighted pools")
+    ap.add_argument("pools", nargs="*", help=f"pool names ({', '.join(BALANCER_POOLS)})")
+    ap.add_argument("--all", action="store_true", help="process every registered Balancer pool")
+    ap.add_argument("--jobs", type=int, default=0, help="worker processes (0 = one per pool, up to #cores)")
+    ap.add_argument("--data-dir", default=".", help="directory with <pool>_swaps.csv / <pool>_balances.csv")
+    ap.add_argument("--out-dir", default=None, help="output directory (default: --data-dir)")
+    ap.add_argument("--vault-swaps", default=None, help="Vault-wide Swap CSV to shard first")
+    ap.add_argument("--vault-balances", default=None, help="Vault-wide PoolBalanceChanged CSV to shard first")
+    ap.add_argument("--sparse", action="store_true", help="only write blocks with an event")
+    ap.add_argument("--initial", default=None,
+                    help="balance0,balance1 (raw units) before the first event; one pool only")
+    profiling.add_argument(ap)
+    args = ap.parse_args(argv)
+    profiling.apply(args)
+
+    names = list(BALANCER_POOLS) if args.all else args.pools
+    if not names:
+        ap.error("give pool names or --all")
+    pools = [get_balancer_pool(n) for n in names]
+    if args.initial and len(pools) != 1:
+        ap.error("--initial needs exactly one pool")
+    initial = tuple(int(x) for x in args.initial.split(",")) if args.initial else (0, 0)
+
+    vault = [(kind, path) for kind, path in (("swaps", args.vault_swaps), ("balances", args.vault_balances)) if path]
+    with profiling.run("balancer_shard") if vault else nullcontext():
+        for kind, path in vault:
+            with profiling.stage(f"shard_{kind}") as st:
+                rows = shard(path, pools, args.data_dir, kind)
+                st.rows = sum(rows.values())
+            print(f"🔀 {path} → " + "  ".join(f"{n} = {r:,}" for n, r in rows.items()))
+
+    jobs = args.jobs or min(len(names), os.cpu_count() or 1)
+    opts = (args.data_dir, args.out_dir, not args.sparse, initial)
+    if jobs == 1 or len(names) == 1:
+        results = [preprocess_pool(n, *opts) for n in names]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            futs = [ex.submit(preprocess_pool, n, *opts) for n in names]
+            results = [f.result() for f in as_completed(futs)]
+
+    for name, rows, secs in sorted(results):
+        print(f"✅ {name:10}  rows = {rows:,}  ({secs:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+"""
+benchmark.py
+-------------------------------------------------
+Offline benchmark suite for the preprocessing and GMM stages, on synthetic
+data of any scale (10^5 … 10^8 rows), with a stored baseline to catch
+regressions.
+
+• generators (deterministic given --seed, written chunk by chunk):
+      <pool>_swaps.csv / <pool>_syncs.csv   fetcher format；uint256 值超過 int64
+                                            (WETH 18 decimals)，~2% flash swaps
+      replay.csv                            uniswapv2/preprocess merge.csv format
+      volume.csv                            V, sigma, c with known
+                                            V = a0 + a_sigma·sigma + a_c·sqrt(c) + ε
+  generated files are reused while rows / seed match (bench.json in --data-dir)
+• stages: load_csv, load_cache, reserves, classify, rv, replay, gmm_load
+  (volume.csv → cleaned V, sigma, c, V_prev), gmm_step1, gmm_step2；每個 stage
+  的 setup 不計時，取 --repeat 次中最快的一次；每次至少跑 --min-seconds
+  (短的 stage 重複呼叫再取平均，timeit 那樣), so ~10 ms stages are not noise
+• results → JSON (seconds, rows, rows/s per stage + machine / library info)；
+  --baseline 比較每列耗時 (s / row)，任何 stage 慢超過 --tolerance 就
+  exit 1；--update-baseline 把這次結果存成新的 baseline
+
+    python benchmark.py --rows 1e6 --out bench_results.json --baseline bench_baseline.json
+    python benchmark.py --rows 1e5 --stages rv gmm_step1 gmm_step2 --repeat 5
+    python benchmark.py --rows 1e7 --update-baseline bench_baseline.json
+    python benchmark.py --rows 1e8 --generate-only --data-dir /scratch/bench
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "uniswapv2", "preprocess"))
+from event_cache import ingest, load_table
+from gmm_core import cross_products, design_blocks, load_volume_data, moment_cov
+from numpy.linalg import pinv, solve
+from pipeline import block_volume, load_events, reserve_changes
+from pools import get_pool
+from replay import initial_state, replay_chunk
+from rv import RollingRV
+
+POOL       = get_pool("USDC_ETH")          # dec 6 / 18 → reserve1 does not fit int64
+CHUNK_ROWS = 1_000_000
+THETA      = (50.0, 1000.0, 5.0)           # a0, a_sigma, a_c of the synthetic volume data
+REPLAY_INIT = (50_000_000 * 10**6, 25_000 * 10**18)
+MIN_SECONDS = 0.2                          # each timed run repeats its stage at least this long
+
+
+# ============================================================
+# 1‧ synthetic data
+# ============================================================
+def _uint_str(x, rng):
+    """Non-negative floats → decimal strings of about that size, exact beyond 2**64."""
+    hi = np.floor(np.asarray(x) / 1e9).astype(np.int64)
+    lo = rng.integers(0, 10**9, len(hi))
+    s = pd.Series(lo).astype(str)
+    wide = hi > 0
+    s[wide] = pd.Series(hi[wide]).astype(str).to_numpy() + s[wide].str.zfill(9).to_numpy()
+    return s.to_numpy()
+
+
+def synth_events(n, seed=0, first_block=10_000_000, chunksize=CHUNK_ROWS):
+    """Yield (swaps, syncs) chunks: n swaps, each followed by its Sync, ~2 per block."""
+    rng = np.random.default_rng(seed)
+    block, r0 = first_block, 5e13                             # 50M USDC
+    price = 2000.0
+    for lo in range(0, n, chunksize):
+        m = min(chunksize, n - lo)
+        blk = block + np.cumsum(rng.random(m) < 0.5)
+        block = int(blk[-1]) + 1
+        logp = np.log(price) + np.cumsum(rng.normal(0, 2e-4, m))
+        price = float(np.exp(logp[-1]))
+        r0_t = r0 * np.exp(np.cumsum(rng.normal(0, 1e-5, m)))
+        r0 = float(r0_t[-1])
+        r1_t = r0_t / np.exp(logp) * 1e12                     # reserve1 in wei
+
+        usd = rng.lognormal(np.log(2e9), 1.5, m)              # trade size, raw USDC
+        sell0 = rng.random(m) < 0.5
+        flash = rng.random(m) < 0.02
+        wei = usd / np.exp(logp) * 1e12
+        z = np.full(m, "0", dtype=object)
+        swaps = pd.DataFrame({
+            "blockNumber": blk,
+            "amount0In":  np.where(sell0 | flash, _uint_str(usd, rng), z),
+            "amount1In":  np.where(~sell0 | flash, _uint_str(wei, rng), z),
+            "amount0Out": np.where(~sell0, _uint_str(usd * 0.997, rng), z),
+            "amount1Out": np.where(sell0, _uint_str(wei * 0.997, rng), z),
+        })
+        syncs = pd.DataFrame({"blockNumber": blk, "reserve0": _uint_str(r0_t, rng),
+                              "reserve1": _uint_str(r1_t, rng)})
+        yield swaps, syncs
+
+
+def synth_replay(n, seed=0, chunksize=CHUNK_ROWS):
+    """Yield merge.csv-style chunks (all string columns) whose replay stays positive."""
+    rng = np.random.default_rng(seed + 1)
+    cols = ["mint_amount0", "mint_amount1", "burn_amount0", "burn_amount1",
+            "amount0In", "amount1In", "amount0Out", "amount1Out"]
+    block = 10_000_000
+    for lo in range(0, n, chunksize):
+        m = min(chunksize, n - lo)
+        blk = block + np.cumsum(rng.random(m) < 0.5)
+        block = int(blk[-1]) + 1
+        a0 = rng.lognormal(np.log(REPLAY_INIT[0] * 1e-6), 1.0, m)
+        a1 = a0 / REPLAY_INIT[0] * REPLAY_INIT[1]
+        sell0, kind = rng.random(m) < 0.5, rng.random(m)
+        z = np.full(m, "0", dtype=object)
+        swap, mint, burn = kind < 0.98, (kind >= 0.98) & (kind < 0.99), kind >= 0.99
+        s0, s1 = _uint_str(a0, rng), _uint_str(a1, rng)
+        frame = {"blockNumber": blk.astype(str),
+                 "mint_amount0": np.where(mint, s0, z), "mint_amount1": np.where(mint, s1, z),
+                 "burn_amount0": np.where(burn, _uint_str(a0 * 0.5, rng), z),
+                 "burn_amount1": np.where(burn, _uint_str(a1 * 0.5, rng), z),
+                 "amount0In":  np.where(swap & sell0, s0, z),
+                 "amount1In":  np.where(swap & ~sell0, s1, z),
+                 "amount0Out": np.where(swap & ~sell0, _uint_str(a0 * 0.997, rng), z),
+                 "amount1Out": np.where(swap & sell0, _uint_str(a1 * 0.997, rng), z)}
+        yield pd.DataFrame(frame)[["blockNumber", *cols]].astype("string")
+
+
+def synth_volume(n, seed=0, theta=THETA):
+    """V, sigma, c with V = a0 + a_sigma·sigma + a_c·sqrt(c) + ε (plain arrays)."""
+    rng = np.random.default_rng(seed + 2)
+    sigma = np.abs(rng.normal(0.03, 0.01, n))
+    c = rng.lognormal(np.log(5e7), 0.3, n)
+    e = rng.normal(0, 100.0, n)
+    V = theta[0] + theta[1] * sigma + theta[2] * np.sqrt(c) + e
+    return V, sigma, c
+
+
+def _write(path, frames):
+    mode = "w"
+    for frame in frames:
+        frame.to_csv(path, mode=mode, header=(mode == "w"), index=False)
+        mode = "a"
+
+
+def generate(data_dir, rows, seed=0):
+    """Write every synthetic input to data_dir unless the same rows / seed are already there."""
+    os.makedirs(data_dir, exist_ok=True)
+    stamp = os.path.join(data_dir, "bench.json")
+    want = {"rows": rows, "seed": seed}
+    if os.path.exists(stamp):
+        with open(stamp) as f:
+            if json.load(f) == want:
+                return False
+        os.remove(stamp)
+
+    swap_path, sync_path = (os.path.join(data_dir, f) for f in (POOL.swap_file, POOL.sync_file))
+    for path in (swap_path, sync_path):
+        shutil.rmtree(os.path.splitext(path)[0] + ".cache", ignore_errors=True)
+    mode = "w"
+    for swaps, syncs in synth_events(rows, seed):
+        swaps.to_csv(swap_path, mode=mode, header=(mode == "w"), index=False)
+        syncs.to_csv(sync_path, mode=mode, header=(mode == "w"), index=False)
+        mode = "a"
+    _write(os.path.join(data_dir, "replay.csv"), synth_replay(rows, seed))
+    _write(os.path.join(data_dir, "volume.csv"),
+           (pd.DataFrame(dict(zip(["V", "sigma", "c"], synth_volume(min(CHUNK_ROWS, rows - lo), seed + lo))))
+            for lo in range(0, rows, CHUNK_ROWS)))
+    with open(stamp, "w") as f:
+        json.dump(want, f)
+    return True
+
+
+# ============================================================
+# 2‧ stages：setup（不計時）→ run → rows
+# ============================================================
+@dataclass
+class Stage:
+    name: str
+    setup: object           # (data_dir, rows, seed) → args for run
+    run: object             # (*args) → rows processed
+
+
+def _event_paths(data_dir):
+    return os.path.join(data_dir, POOL.swap_file), os.path.join(data_dir, POOL.sync_file)
+
+
+def _setup_load_csv(data_dir, rows, seed):
+    return _event_paths(data_dir) + (os.path.join(data_dir, "no.cache"),)
+
+
+def _run_load_csv(swap_path, sync_path, no_cache):
+    swaps, syncs = load_table(swap_path, no_cache), load_table(sync_path, no_cache)
+    return len(swaps["blockNumber"]) + len(syncs["blockNumber"])
+
+
+def _setup_load_cache(data_dir, rows, seed):
+    paths = _event_paths(data_dir)
+    for path in paths:
+        ingest(path)
+    return paths
+
+
+def _run_load_cache(swap_path, sync_path):
+    swaps, syncs = load_events(swap_path, sync_path)
+    tables = [{c: np.array(a) for c, a in t.items()} for t in (swaps, syncs)]   # read every page
+    return sum(len(t["blockNumber"]) for t in tables)
+
+
+def _setup_events(data_dir, rows, seed):
+    swaps, syncs = load_events(*_event_paths(data_dir))
+    return swaps, syncs, reserve_changes(syncs, POOL)
+
+
+def _run_reserves(swaps, syncs, changes):
+    reserve_changes(syncs, POOL)
+    return len(syncs["blockNumber"])
+
+
+def _run_classify(swaps, syncs, changes):
+    block_volume(swaps, changes, POOL)
+    return len(swaps["blockNumber"])
+
+
+def _setup_rv(data_dir, rows, seed):
+    rng = np.random.default_rng(seed + 3)
+    x = rng.normal(0, 1e-4, min(rows, CHUNK_ROWS))
+    x[rng.random(len(x)) < 0.7] = 0.0                         # forward-filled blocks
+    return x, rows
+
+
+def _run_rv(x, rows):
+    rv = RollingRV(POOL.rv_window)
+    for lo in range(0, rows, len(x)):
+        rv.update(x[:rows - lo])
+    return rows
+
+
+def _setup_replay(data_dir, rows, seed):
+    return (os.path.join(data_dir, "replay.csv"),)
+
+
+def _run_replay(path):
+    state, rows = initial_state(*REPLAY_INIT), 0
+    for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS, dtype="string"):
+        chunk, state = replay_chunk(chunk, state)
+        rows += len(chunk)
+    return rows
+
+
+def _setup_gmm_load(data_dir, rows, seed):
+    return (os.path.join(data_dir, "volume.csv"),)
+
+
+def _run_gmm_load(path):
+    return len(load_volume_data(path)[0])
+
+
+def _setup_gmm(data_dir, rows, seed):
+    V, sigma, c, V_prev = load_volume_data(os.path.join(data_dir, "volume.csv"))
+    ZX, Zy, T = cross_products(design_blocks(V, sigma, c, V_prev))
+    A, b = ZX / T, Zy / T
+    return V, sigma, c, V_prev, solve(A.T @ A, A.T @ b)
+
+
+def _run_gmm_step1(V, sigma, c, V_prev, theta1):
+    ZX, Zy, T = cross_products(design_blocks(V, sigma, c, V_prev))
+    A, b = ZX / T, Zy / T
+    solve(A.T @ A, A.T @ b)
+    return T
+
+
+def _run_gmm_step2(V, sigma, c, V_prev, theta1):
+    W = pinv(moment_cov(design_blocks(V, sigma, c, V_prev), theta1))
+    ZX, Zy, T = cross_products(design_blocks(V, sigma, c, V_prev))
+    A, b = ZX / T, Zy / T
+    solve(A.T @ W @ A, A.T @ W @ b)
+    return T
+
+
+STAGES = {s.name: s for s in [
+    Stage("load_csv",   _setup_load_csv,   _run_load_csv),
+    Stage("load_cache", _setup_load_cache, _run_load_cache),
+    Stage("reserves",   _setup_events,     _run_reserves),
+    Stage("classify",   _setup_events,     _run_classify),
+    Stage("rv",         _setup_rv,         _run_rv),
+    Stage("replay",     _setup_replay,     _run_replay),
+    Stage("gmm_load",   _setup_gmm_load,   _run_gmm_load),
+    Stage("gmm_step1",  _setup_gmm,        _run_gmm_step1),
+    Stage("gmm_step2",  _setup_gmm,        _run_gmm_step2),
+]}
+
+
+def run_stage(stage, data_dir, rows, seed=0, repeat=3, min_seconds=MIN_SECONDS):
+    """Fastest of `repeat` runs; a run calls the stage until min_seconds have passed (time per call)."""
+    args = stage.setup(data_dir, rows, seed)
+    runs, n, calls = [], 0, 0
+    for _ in range(repeat):
+        calls, t = 0, time.perf_counter()
+        while True:
+            n = stage.run(*args)
+            calls += 1
+            dt = time.perf_counter() - t
+            if dt >= min_seconds:
+                break
+        runs.append(dt / calls)
+    del args
+    best = min(runs)
+    return {"rows": int(n), "seconds": best, "rows_per_s": n / best if best > 0 else float("inf"),
+            "calls": calls, "runs": runs}
+
+
+def machine_info():
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count()}
+
+
+# ============================================================
+# 3‧ baseline：每列耗時比較
+# ============================================================
+def compare(results, baseline, tolerance=0.25):
+    """[(stage, ratio, regressed)] where ratio = (s / row now) / (s / row in the baseline)."""
+    out = []
+    for name, r in results["stages"].items():
+        b = baseline.get("stages", {}).get(name)
+        if not b or not b["rows"] or not r["rows"]:
+            continue
+        ratio = (r["seconds"] / r["rows"]) / (b["seconds"] / b["rows"])
+        out.append((name, ratio, ratio > 1.0 + tolerance))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline benchmarks on synthetic swap / sync / GMM data")
+    ap.add_argument("--rows", type=float, default=1e6, help="rows per dataset (1e5 … 1e8)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--data-dir", default="bench_data", help="where synthetic inputs are generated")
+    ap.add_argument("--stages", nargs="*", default=list(STAGES), choices=list(STAGES))
+    ap.add_argument("--repeat", type=int, default=3, help="runs per stage (the fastest counts)")
+    ap.add_argument("--min-seconds", type=float, default=MIN_SECONDS,
+                    help="a run repeats a short stage until this long (time per call is reported)")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", default=None, help="fail if a stage is slower than this baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per row (0.25 = +25%%)")
+    ap.add_argument("--update-baseline", default=None, metavar="PATH", help="save these results as the baseline")
+    ap.add_argument("--generate-only", action="store_true")
+    args = ap.parse_args(argv)
+
+    rows = int(args.rows)
+    start = time.perf_counter()
+    if generate(args.data_dir, rows, args.seed):
+        print(f"🧪 generated {rows:,} rows per dataset in {args.data_dir}  ({time.perf_counter() - start:.1f} s)")
+    if args.generate_only:
+        return 0
+
+    results = {"meta": {"rows": rows, "seed": args.seed, "repeat": args.repeat, "min_seconds": args.min_seconds,
+                        "time": time.strftime("%Y-%m-%dT%H:%M:%S"), **machine_info()},
+               "stages": {}}
+    for name in args.stages:
+        r = results["stages"][name] = run_stage(STAGES[name], args.data_dir, rows, args.seed, args.repeat,
+                                                    args.min_seconds)
+        print(f"⏱  {name:11} {r['seconds']:9.3f} s  {r['rows']:>12,} rows  {r['rows_per_s']:>14,.0f} rows/s")
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ {args.out}")
+    if args.update_baseline:
+        with open(args.update_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ baseline → {args.update_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["rows"] != rows:
+            print(f"⚠️  baseline was run at {baseline['meta']['rows']:,} rows; comparing time per row")
+        checks = compare(results, baseline, args.tolerance)
+        for name, ratio, bad in checks:
+            print(f"{'❌' if bad else '  '} {name:11} {ratio:6.2f}× baseline time per row")
+        if any(bad for _, _, bad in checks):
+            print(f"❌ regression beyond +{args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
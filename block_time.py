@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+block_time.py
+-------------------------------------------------
+Block → timestamp index per chain (pools.CHAINS), replacing "anchor block +
+constant average block time" extrapolation.
+
+• index = two sorted int64 arrays (block, unix seconds) from sampled anchor
+  blocks (eth_getBlockByNumber every --step blocks) or from header data
+  (any CSV with blockNumber + timestamp)
+• lookup is vectorized piecewise-linear interpolation between anchors
+  (np.interp; anchors on a regular --step grid find their segment by
+  arithmetic instead)；超出 anchor 範圍才用該鏈的 block_time 外插
+• stored as <chain>_blocks.npz (a few hundred kB for the whole chain)
+
+    python block_time.py build --chain ethereum --from 10000000 --to latest --step 1000 --rpc-url $ETHEREUM_RPC_URL
+    python block_time.py build --chain bsc --headers bsc_headers.csv
+    python block_time.py annotate USDC_ETH.csv USDC_ETH_ts.csv --chain ethereum
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from pools import CHAINS
+
+
+class BlockTimeIndex:
+    """Sorted anchor blocks and their unix timestamps for one chain."""
+
+    def __init__(self, blocks, times, chain, block_time=None):
+        if chain not in CHAINS:
+            raise KeyError(f"unknown chain {chain!r}; known: {', '.join(CHAINS)}")
+        blocks = np.asarray(blocks, dtype=np.int64)
+        times = np.asarray(times, dtype=np.int64)
+        order = np.argsort(blocks, kind="stable")
+        blocks, times = blocks[order], times[order]
+        keep = np.r_[True, blocks[1:] != blocks[:-1]]
+        self.blocks, self.times, self.chain = blocks[keep], times[keep], chain
+        # seconds per block outside the anchors
+        self.block_time = float(CHAINS[chain]["block_time"] if block_time is None else block_time)
+        # anchors every `step` blocks (last gap may be shorter) → segment = offset // step
+        gaps = np.diff(self.blocks)
+        self._step = int(gaps[0]) if len(gaps) > 1 and (gaps[:-1] == gaps[0]).all() \
+            and gaps[-1] <= gaps[0] else None
+        self._tf = self.times.astype(np.float64)
+        self._slope = np.diff(self._tf) / gaps if len(gaps) else np.zeros(0)
+        if len(self.blocks) == 0:
+            raise ValueError("empty block-time index")
+        if (np.diff(self.times) < 0).any():
+            raise ValueError("timestamps decrease between anchor blocks")
+
+    def __len__(self):
+        return len(self.blocks)
+
+    # ---------------- build ---------------- #
+    @classmethod
+    def from_anchor(cls, block, timestamp, chain, block_time=None):
+        """Single anchor → constant block time (the old extrapolation)."""
+        return cls([block], _to_unix(timestamp), chain, block_time)
+
+    @classmethod
+    def from_headers(cls, path, chain, block_col="blockNumber", time_col="timestamp"):
+        """CSV with one row per (sampled) block; timestamp as unix seconds or datetime text."""
+        df = pd.read_csv(path, usecols=[block_col, time_col])
+        return cls(df[block_col].to_numpy(dtype=np.int64), _to_unix(df[time_col]), chain)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            return cls(z["blocks"], z["times"], str(z["chain"]), float(z["block_time"]))
+
+    def save(self, path):
+        np.savez(path, blocks=self.blocks, times=self.times, chain=self.chain, block_time=self.block_time)
+
+    # ---------------- lookup ---------------- #
+    def timestamps(self, blocks):
+        """Unix seconds (int64) for every block number."""
+        b = np.asarray(blocks, dtype=np.int64)
+        if self._step is None:
+            t = np.interp(b, self.blocks, self._tf)
+        else:                                   # regular grid: no binary search
+            off = b - self.blocks[0]
+            k = off // self._step
+            np.clip(k, 0, len(self.blocks) - 2, out=k)
+            t = self._tf[k] + (off - k * self._step) * self._slope[k]
+
+        bt = self.block_time
+        if b.size and b.min() < self.blocks[0]:
+            lo = b < self.blocks[0]
+            t[lo] = self._tf[0] + (b[lo] - self.blocks[0]) * bt
+        if b.size and b.max() > self.blocks[-1]:
+            hi = b > self.blocks[-1]
+            t[hi] = self._tf[-1] + (b[hi] - self.blocks[-1]) * bt
+        # whole seconds are truncated like the old datetime + timedelta → strftime path
+        # (timedelta keeps microseconds, rounded half-even, before the truncation)
+        return np.floor(np.rint(t * 1e6) / 1e6).astype(np.int64)
+
+    def datetimes(self, blocks):
+        """Naive UTC datetime64[s]; to_csv writes them as 'YYYY-MM-DD HH:MM:SS'."""
+        return self.timestamps(blocks).astype("datetime64[s]")
+
+
+def _to_unix(values):
+    arr = pd.Series(np.atleast_1d(values))
+    if pd.api.types.is_numeric_dtype(arr):
+        return arr.to_numpy(dtype=np.int64)
+    ts = pd.to_datetime(arr, utc=True)
+    return (ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def index_path(chain, data_dir="."):
+    return os.path.join(data_dir, f"{chain}_blocks.npz")
+
+
+# ---------------- sampled anchors over JSON-RPC ---------------- #
+async def fetch_anchors(rpc_url, first, last, step=1000, concurrency=16):
+    """Timestamps of blocks first, first+step, …, last via eth_getBlockByNumber."""
+    import aiohttp
+    from fetch_logs import RPC
+
+    wanted = list(range(first, last + 1, step))
+    if wanted[-1] != last:
+        wanted.append(last)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+        rpc = RPC(session, rpc_url, concurrency)
+
+        async def one(b):
+            head = await rpc.call("eth_getBlockByNumber", [hex(b), False])
+            return int(head["timestamp"], 16)
+
+        times = await asyncio.gather(*(one(b) for b in wanted))
+    return np.array(wanted, dtype=np.int64), np.array(times, dtype=np.int64)
+
+
+async def _latest(rpc_url):
+    import aiohttp
+    from fetch_logs import RPC
+    async with aiohttp.ClientSession() as session:
+        return await RPC(session, rpc_url, 1).block_number()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chain-aware block → timestamp index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="build <chain>_blocks.npz")
+    b.add_argument("--chain", required=True, choices=list(CHAINS))
+    b.add_argument("--headers", default=None, help="CSV with blockNumber,timestamp instead of RPC")
+    b.add_argument("--rpc-url", default=None, help="default: $<CHAIN>_RPC_URL")
+    b.add_argument("--from", dest="first", type=int, default=0)
+    b.add_argument("--to", dest="last", default="latest")
+    b.add_argument("--step", type=int, default=1000, help="blocks between sampled anchors")
+    b.add_argument("--data-dir", default=".")
+
+    a = sub.add_parser("annotate", help="add a Timestamp column to a CSV with blockNumber")
+    a.add_argument("input")
+    a.add_argument("output")
+    a.add_argument("--chain", required=True, choices=list(CHAINS))
+    a.add_argument("--index", default=None, help="default: <chain>_blocks.npz in --data-dir")
+    a.add_argument("--data-dir", default=".")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        if args.headers:
+            idx = BlockTimeIndex.from_headers(args.headers, args.chain)
+        else:
+            url = args.rpc_url or os.environ.get(f"{args.chain.upper()}_RPC_URL")
+            if not url:
+                ap.error(f"give --headers, --rpc-url or set {args.chain.upper()}_RPC_URL")
+            last = asyncio.run(_latest(url)) if args.last == "latest" else int(args.last)
+            idx = BlockTimeIndex(*asyncio.run(fetch_anchors(url, args.first, last, args.step)), args.chain)
+        out = index_path(args.chain, args.data_dir)
+        idx.save(out)
+        print(f"✅ {len(idx):,} anchors  blocks {idx.blocks[0]} → {idx.blocks[-1]}  → {out}")
+        return
+
+    idx = BlockTimeIndex.load(args.index or index_path(args.chain, args.data_dir))
+    start = time.perf_counter()
+    df = pd.read_csv(args.input, dtype=str)
+    df["Timestamp"] = idx.datetimes(df["blockNumber"].astype(np.int64).to_numpy())
+    df.to_csv(args.output, index=False)
+    print(f"✅ {len(df):,} rows → {args.output}  ({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
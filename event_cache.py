@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""
+event_cache.py
+-------------------------------------------------
+One-time ingest of fetcher CSVs (*_swaps.csv / *_syncs.csv) into a binary
+columnar cache that loads with np.memmap instead of re-parsing strings.
+
+    USDC_ETH_swaps.csv  →  USDC_ETH_swaps.cache/
+                              manifest.json        rows, block range, columns, source stamp
+                              blockNumber.bin      int64
+                              amount0In.bin        uint256 = 4 × uint64 little-endian limbs
+                              ...
+
+• uint256 columns are exact: decimal strings are converted with a
+  vectorized base-10^9 → base-2^32 Horner pass, never through float
+• load_table keeps uint256 columns as limbs for wideint.py (no Python ints)
+• iter_table: the same tables in row chunks (bounded memory for streaming)
+• manifest 記錄來源 CSV 的大小與 mtime；CSV 被 fetcher 追加後 cache 自動失效
+
+    python event_cache.py USDC_ETH_swaps.csv USDC_ETH_syncs.csv
+    python event_cache.py --pool USDC_ETH --data-dir data
+"""
+
+import argparse
+import json
+import os
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+U256_LIMBS  = 4                      # uint64 limbs, least significant first
+INT_COLUMNS = {"blockNumber", "logIndex", "transactionIndex"}
+CHUNK_ROWS  = 1_000_000
+
+_DEC_DIGITS = 9
+_DEC_WIDTH  = 81                     # 9 × 9 digits ≥ 78 digits of 2**256
+_POW10      = 10 ** np.arange(_DEC_DIGITS - 1, -1, -1, dtype=np.int64)
+
+
+# ---------------- 1. decimal strings → uint256 limbs ---------------- #
+def parse_uint256(values) -> np.ndarray:
+    """Decimal strings → (N, 4) uint64 limbs (least significant first)."""
+    raw = pd.Series(values, dtype="string").fillna("0").str.strip()
+    if len(raw) and raw.str.len().max() > _DEC_WIDTH:
+        raise ValueError("integer wider than 256 bits")
+    buf = np.asarray(raw.to_numpy(dtype=object), dtype=f"S{_DEC_WIDTH}")
+    n   = len(buf)
+    u8  = buf.view(np.uint8).reshape(n, _DEC_WIDTH)
+
+    lens   = (u8 != 0).sum(axis=1)
+    idx    = np.arange(_DEC_WIDTH)[None, :] - (_DEC_WIDTH - lens)[:, None]
+    shift  = np.take_along_axis(u8, np.clip(idx, 0, None), axis=1)
+    digits = np.where(idx >= 0, shift.astype(np.int64) - 48, 0)
+    if ((digits < 0) | (digits > 9)).any():
+        raise ValueError("non-decimal characters in uint256 column")
+    dec = digits.reshape(n, -1, _DEC_DIGITS) @ _POW10            # base 10^9, MS first
+
+    # Horner in base 2^32: acc = acc * 10^9 + d
+    acc = np.zeros((n, 2 * U256_LIMBS), dtype=np.uint64)
+    for j in range(dec.shape[1]):
+        carry = dec[:, j].astype(np.uint64)
+        for k in range(2 * U256_LIMBS):
+            t = acc[:, k] * np.uint64(10**_DEC_DIGITS) + carry
+            acc[:, k] = t & np.uint64(0xFFFFFFFF)
+            carry = t >> np.uint64(32)
+        if carry.any():
+            raise OverflowError("integer wider than 256 bits")
+    return acc[:, 0::2] | (acc[:, 1::2] << np.uint64(32))
+
+
+def uint256_to_int(limbs) -> np.ndarray:
+    """(N, 4) limbs → object array of exact Python ints."""
+    out = np.zeros(len(limbs), dtype=object)
+    for k in range(U256_LIMBS - 1, -1, -1):
+        out = (out << 64) + limbs[:, k].astype(object)
+    return out
+
+
+def int_to_uint256(values) -> np.ndarray:
+    """int64 / Python-int column → (N, 4) uint64 limbs (inverse of uint256_to_int)."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iu":
+        if arr.dtype.kind == "i" and len(arr) and arr.min() < 0:
+            raise ValueError("negative value in uint256 column")
+        out = np.zeros((len(arr), U256_LIMBS), dtype=np.uint64)
+        out[:, 0] = arr.astype(np.uint64)
+        return out
+    width = 8 * U256_LIMBS
+    try:
+        try:
+            raw = b"".join(map(int.to_bytes, arr, repeat(width), repeat("little")))
+        except TypeError:                                     # numpy scalars mixed in
+            raw = b"".join([int(x).to_bytes(width, "little") for x in arr])
+    except OverflowError:
+        raise ValueError("negative value or integer wider than 256 bits in uint256 column") from None
+    return np.frombuffer(raw, dtype="<u8").reshape(len(arr), U256_LIMBS).astype(np.uint64)
+
+
+def uint256_to_float(limbs, decimals=0) -> np.ndarray:
+    out = np.zeros(len(limbs), dtype=np.float64)
+    for k in range(U256_LIMBS - 1, -1, -1):
+        out = out * 2.0**64 + limbs[:, k].astype(np.float64)
+    return out / 10.0**decimals if decimals else out
+
+
+def uint256_column(limbs):
+    """Same dtype as read_csv(converters=int): int64 if every value fits, else Python ints."""
+    if not (limbs[:, 1:] == 0).all() or (limbs[:, 0] >= np.uint64(2**63)).any():
+        return uint256_to_int(limbs)
+    return limbs[:, 0].astype(np.int64)
+
+
+# ---------------- 2. ingest ---------------- #
+def cache_dir_for(csv_path):
+    root, _ = os.path.splitext(csv_path)
+    return root + ".cache"
+
+
+def _source_stamp(csv_path):
+    st = os.stat(csv_path)
+    return {"path": os.path.basename(csv_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def ingest(csv_path, cache_dir=None, chunksize=CHUNK_ROWS):
+    """Convert one fetcher CSV to the columnar cache; returns the manifest."""
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    columns, files, rows = None, {}, 0
+    first_blk = last_blk = None
+    try:
+        for chunk in pd.read_csv(csv_path, dtype=str, chunksize=chunksize):
+            if columns is None:
+                columns = {c: ("int64" if c in INT_COLUMNS else "uint256") for c in chunk.columns}
+                files = {c: open(os.path.join(cache_dir, f"{c}.bin"), "wb") for c in columns}
+            for c, kind in columns.items():
+                if kind == "int64":
+                    arr = chunk[c].astype(np.int64).to_numpy()
+                else:
+                    arr = parse_uint256(chunk[c])
+                files[c].write(np.ascontiguousarray(arr, dtype="<i8" if kind == "int64" else "<u8").tobytes())
+            blk = chunk["blockNumber"].astype(np.int64)
+            first_blk = int(blk.min()) if first_blk is None else min(first_blk, int(blk.min()))
+            last_blk  = int(blk.max()) if last_blk  is None else max(last_blk,  int(blk.max()))
+            rows += len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+
+    if columns is None:                       # header only / empty file
+        columns = {c: ("int64" if c in INT_COLUMNS else "uint256")
+                   for c in pd.read_csv(csv_path, nrows=0).columns}
+        for c in columns:
+            open(os.path.join(cache_dir, f"{c}.bin"), "wb").close()
+
+    manifest = {
+        "source":      _source_stamp(csv_path),
+        "rows":        rows,
+        "first_block": first_blk,
+        "last_block":  last_blk,
+        "columns":     columns,
+    }
+    with open(os.path.join(cache_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ---------------- 3. load ---------------- #
+def read_manifest(cache_dir):
+    with open(os.path.join(cache_dir, "manifest.json")) as f:
+        return json.load(f)
+
+
+def is_fresh(csv_path, cache_dir=None):
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    if not os.path.exists(os.path.join(cache_dir, "manifest.json")):
+        return False
+    if not os.path.exists(csv_path):
+        return True                           # cache only, source removed
+    return read_manifest(cache_dir)["source"] == _source_stamp(csv_path)
+
+
+def open_cache(cache_dir):
+    """Memory-map every column: int64 → (N,), uint256 → (N, 4) uint64."""
+    manifest = read_manifest(cache_dir)
+    n = manifest["rows"]
+    cols = {}
+    for c, kind in manifest["columns"].items():
+        path  = os.path.join(cache_dir, f"{c}.bin")
+        shape = (n,) if kind == "int64" else (n, U256_LIMBS)
+        if n == 0:
+            cols[c] = np.empty(shape, dtype="<i8" if kind == "int64" else "<u8")
+        else:
+            cols[c] = np.memmap(path, dtype="<i8" if kind == "int64" else "<u8", mode="r", shape=shape)
+    return cols, manifest
+
+
+def load_frame(csv_path, cache_dir=None):
+    """DataFrame equal to read_csv(csv_path, converters=int for every column).
+
+    Uses the cache when it is fresh, otherwise parses the CSV.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    if not is_fresh(csv_path, cache_dir):
+        header = pd.read_csv(csv_path, nrows=0).columns
+        return pd.read_csv(csv_path, converters={c: int for c in header})
+
+    cols, manifest = open_cache(cache_dir)
+    data = {}
+    for c, kind in manifest["columns"].items():
+        data[c] = np.asarray(cols[c]) if kind == "int64" else uint256_column(cols[c])
+    return pd.DataFrame(data)
+
+
+def frame_to_table(df):
+    """DataFrame with int columns → {column: int64 array | (N, 4) uint64 limbs}."""
+    return {c: (df[c].to_numpy(dtype=np.int64) if c in INT_COLUMNS else int_to_uint256(df[c].to_numpy()))
+            for c in df.columns}
+
+
+def load_table(csv_path, cache_dir=None):
+    """Like load_frame, but uint256 columns stay (N, 4) limbs (for wideint.py).
+
+    A fresh cache is memory-mapped as is, without any per-value conversion.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    if not is_fresh(csv_path, cache_dir):
+        header = pd.read_csv(csv_path, nrows=0).columns
+        return frame_to_table(pd.read_csv(csv_path, converters={c: int for c in header}))
+    cols, _ = open_cache(cache_dir)
+    return {c: np.asarray(a) for c, a in cols.items()}
+
+
+def iter_table(csv_path, chunksize=CHUNK_ROWS, cache_dir=None):
+    """load_table in row chunks: slices of the memory-mapped cache, or parsed CSV chunks."""
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    if not is_fresh(csv_path, cache_dir):
+        header = pd.read_csv(csv_path, nrows=0).columns
+        for chunk in pd.read_csv(csv_path, converters={c: int for c in header}, chunksize=chunksize):
+            yield frame_to_table(chunk)
+        return
+    cols, manifest = open_cache(cache_dir)
+    for lo in range(0, manifest["rows"], chunksize):
+        yield {c: np.array(a[lo:lo + chunksize]) for c, a in cols.items()}
+
+
+# ---------------- 4. CLI ---------------- #
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build the binary columnar cache for event CSVs")
+    ap.add_argument("csv", nargs="*", help="fetcher CSVs (*_swaps.csv / *_syncs.csv)")
+    ap.add_argument("--pool", action="append", default=[], help="registered pool name (repeatable)")
+    ap.add_argument("--data-dir", default=".")
+    ap.add_argument("--force", action="store_true", help="rebuild even if the cache is fresh")
+    args = ap.parse_args(argv)
+
+    paths = list(args.csv)
+    if args.pool:
+        from pools import get_pool
+        for name in args.pool:
+            pool = get_pool(name)
+            paths += [os.path.join(args.data_dir, pool.swap_file),
+                      os.path.join(args.data_dir, pool.sync_file)]
+    if not paths:
+        ap.error("give CSV paths or --pool")
+
+    for path in paths:
+        if not args.force and is_fresh(path):
+            print(f"– {path}: cache is fresh")
+            continue
+        m = ingest(path)
+        print(f"✅ {path} → {cache_dir_for(path)}  rows = {m['rows']:,}  "
+              f"blocks {m['first_block']} → {m['last_block']}")
+
+
+if __name__ == "__main__":
+    main()
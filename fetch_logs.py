@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+"""
+fetch_logs.py
+-------------------------------------------------
+eth_getLogs fetcher for V2 pairs (Uniswap V2 / PancakeSwap V2) → the same
+CSVs the .cjs fetchers write:
+
+    <pool>_swaps.csv   blockNumber, amount0In, amount1In, amount0Out, amount1Out
+    <pool>_syncs.csv   blockNumber, reserve0, reserve1
+    <pool>_mints.csv   blockNumber, amount0, amount1
+    <pool>_burns.csv   blockNumber, amount0, amount1
+
+• one eth_getLogs per range asks for all four topics; many ranges are in
+  flight at once (raw JSON-RPC over aiohttp)
+• provider 回「結果太多 / 範圍太大」→ 這段對半切再查；結果很稀疏 → 下一段加倍
+  (SPAN_MIN … SPAN_MAX blocks)
+• event data is decoded in bulk: hex → bytes → (N, words, 4) uint64 limbs →
+  exact ints (event_cache.uint256_to_int)
+• ranges are appended in block order；<pool>_events.progress.json records the
+  last written block, so a rerun (or a later --to-block) continues from there
+
+    python fetch_logs.py USDC_ETH --from-block 10008355 --to-block latest --rpc-url $ETHEREUM_RPC_URL
+    python fetch_logs.py USDT_WBNB --from-block 45360000 --data-dir data      # BSC_RPC_URL from env
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import aiohttp
+import numpy as np
+import pandas as pd
+from web3 import Web3
+
+from event_cache import uint256_to_int
+from pools import POOLS, get_pool
+
+# event name → (signature, non-indexed uint fields = data words = CSV columns after blockNumber)
+EVENTS = {
+    "swap": ("Swap(address,uint256,uint256,uint256,uint256,address)",
+             ["amount0In", "amount1In", "amount0Out", "amount1Out"]),
+    "sync": ("Sync(uint112,uint112)", ["reserve0", "reserve1"]),
+    "mint": ("Mint(address,uint256,uint256)", ["amount0", "amount1"]),
+    "burn": ("Burn(address,uint256,uint256,address)", ["amount0", "amount1"]),
+}
+TOPICS = {Web3.keccak(text=sig).hex().removeprefix("0x"): name for name, (sig, _) in EVENTS.items()}
+
+SPAN_START  = 2_000                    # first range width (blocks)
+SPAN_MIN    = 1
+SPAN_MAX    = 100_000
+TARGET_LOGS = 5_000                    # widen the span while ranges return fewer than TARGET_LOGS / 4
+MAX_RETRIES = 8
+
+# provider messages meaning "ask for a smaller range" (Infura, Alchemy, QuickNode, BSC nodes, Ankr, geth);
+# anything else (rate limits, 5xx, "invalid block range", …) is retried as is and then raised
+TOO_MANY = ("more than", "too many", "response size", "query timeout", "limited to a",
+            "exceed maximum block range", "block range is too wide", "block range too large")
+LIMIT_CODE = -32005                    # "limit exceeded" (EIP-1474); Infura also sends it for rate limits
+
+
+class RangeTooLarge(Exception):
+    pass
+
+
+# ---------------- 1. JSON-RPC ---------------- #
+class RPC:
+    def __init__(self, session, url, concurrency):
+        self.session, self.url = session, url
+        self._sem = asyncio.Semaphore(concurrency)
+        self._id = 0
+        self.calls = 0
+
+    async def call(self, method, params):
+        for attempt in range(MAX_RETRIES):
+            self._id += 1
+            body = {"jsonrpc": "2.0", "id": self._id, "method": method, "params": params}
+            try:
+                async with self._sem:
+                    self.calls += 1
+                    async with self.session.post(self.url, json=body) as resp:
+                        if resp.status == 429 or resp.status >= 500:
+                            await asyncio.sleep(min(0.5 * 2 ** attempt, 30))
+                            continue
+                        reply = await resp.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(min(0.5 * 2 ** attempt, 30))
+                continue
+            if "error" not in reply:
+                return reply["result"]
+            msg = str(reply["error"].get("message", "")).lower()
+            too_many = reply["error"].get("code") == LIMIT_CODE and "rate" not in msg
+            if too_many or any(p in msg for p in TOO_MANY):
+                raise RangeTooLarge(msg)
+            await asyncio.sleep(min(0.5 * 2 ** attempt, 30))
+        raise RuntimeError(f"{method} failed after {MAX_RETRIES} attempts: {params}")
+
+    async def block_number(self):
+        return int(await self.call("eth_blockNumber", []), 16)
+
+
+class Span:
+    """Adaptive range width shared by all workers."""
+
+    def __init__(self, start=SPAN_START):
+        self.value = start
+
+    def observe(self, blocks, logs):
+        if logs < TARGET_LOGS // 4:
+            self.value = min(SPAN_MAX, max(self.value, blocks) * 2)
+
+    def shrink(self, blocks):
+        self.value = max(SPAN_MIN, min(self.value, blocks // 2))
+
+
+async def fetch_range(rpc, span, address, lo, hi):
+    """All logs of `address` in [lo, hi]; halves the range whenever the provider refuses it."""
+    flt = {"address": address, "fromBlock": hex(lo), "toBlock": hex(hi),
+           "topics": [["0x" + t for t in TOPICS]]}
+    try:
+        logs = await rpc.call("eth_getLogs", [flt])
+    except RangeTooLarge:
+        if lo == hi:
+            raise
+        span.shrink(hi - lo + 1)
+        mid = (lo + hi) // 2
+        a, b = await asyncio.gather(fetch_range(rpc, span, address, lo, mid),
+                                    fetch_range(rpc, span, address, mid + 1, hi))
+        return a + b
+    span.observe(hi - lo + 1, len(logs))
+    return logs
+
+
+# ---------------- 2. bulk decoding ---------------- #
+def decode_words(data, n_words):
+    """'0x…' data strings of n_words 32-byte words → (N, n_words, 4) uint64 limbs (LS first)."""
+    hexes = [d[2:] if d.startswith("0x") else d for d in data]
+    if any(len(h) != 64 * n_words for h in hexes):
+        raise ValueError(f"unexpected log data length (want {n_words} words)")
+    raw = np.frombuffer(bytes.fromhex("".join(hexes)), dtype=">u8")
+    return raw.reshape(len(hexes), n_words, 4)[:, :, ::-1].astype(np.uint64)
+
+
+def decode_logs(logs):
+    """Raw logs → {event name: DataFrame in the fetcher CSV schema}, sorted by (block, logIndex)."""
+    by_event = {name: [] for name in EVENTS}
+    for lg in logs:
+        name = TOPICS.get(lg["topics"][0][2:].lower()) if lg["topics"] else None
+        if name and not lg.get("removed"):
+            by_event[name].append(lg)
+
+    out = {}
+    for name, (_, cols) in EVENTS.items():
+        sel = by_event[name]
+        sel.sort(key=lambda lg: (int(lg["blockNumber"], 16), int(lg["logIndex"], 16)))
+        frame = {"blockNumber": np.array([int(lg["blockNumber"], 16) for lg in sel], dtype=np.int64)}
+        if sel:
+            limbs = decode_words([lg["data"] for lg in sel], len(cols))
+            for j, col in enumerate(cols):
+                frame[col] = uint256_to_int(limbs[:, j]).astype(str)
+        else:
+            for col in cols:
+                frame[col] = np.empty(0, dtype=object)
+        out[name] = pd.DataFrame(frame)
+    return out
+
+
+# ---------------- 3. ordered writer + progress ---------------- #
+def event_files(pool, data_dir):
+    return {"swap": os.path.join(data_dir, pool.swap_file),
+            "sync": os.path.join(data_dir, pool.sync_file),
+            "mint": os.path.join(data_dir, pool.mint_file),
+            "burn": os.path.join(data_dir, pool.burn_file)}
+
+
+def _progress_path(pool, data_dir):
+    return os.path.join(data_dir, f"{pool.name}_events.progress.json")
+
+
+def _start(pool, data_dir, files, from_block, overwrite):
+    """Block to continue from; creates / truncates the CSVs to their last committed size."""
+    path = _progress_path(pool, data_dir)
+    if os.path.exists(path) and not overwrite:
+        with open(path) as f:
+            prog = json.load(f)
+        if prog["address"].lower() != pool.address.lower():
+            raise ValueError(f"{path} belongs to {prog['address']}")
+        for name, p in files.items():
+            with open(p, "r+b") as f:
+                f.truncate(prog["bytes"][name])
+        return prog["done_until"] + 1
+
+    if from_block is None:
+        raise ValueError("--from-block is required for a new download")
+    existing = [p for p in files.values() if os.path.exists(p)]
+    if existing and not overwrite:
+        raise FileExistsError(f"{existing[0]} exists without a progress file; use --overwrite")
+    for name, p in files.items():
+        with open(p, "w") as f:
+            f.write(",".join(["blockNumber", *EVENTS[name][1]]) + "\n")
+    _save_progress(pool, data_dir, files, from_block - 1)
+    return from_block
+
+
+def _save_progress(pool, data_dir, files, done_until):
+    path = _progress_path(pool, data_dir)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"address": pool.address, "done_until": done_until,
+                   "bytes": {n: os.path.getsize(p) for n, p in files.items()}}, f)
+    os.replace(path + ".tmp", path)
+
+
+async def fetch_pool(pool, rpc_url, from_block=None, to_block="latest", data_dir=".",
+                     concurrency=8, overwrite=False):
+    """Fetch Swap / Sync / Mint / Burn of one pool into its CSVs; returns rows per event."""
+    if isinstance(pool, str):
+        pool = get_pool(pool)
+    files = event_files(pool, data_dir)
+    rows = {name: 0 for name in EVENTS}
+
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(timeout=timeout,
+                                     connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        rpc = RPC(session, rpc_url, concurrency)
+        end = await rpc.block_number() if to_block == "latest" else int(to_block)
+        cursor = _start(pool, data_dir, files, from_block, overwrite)
+        span = Span()
+
+        pending = deque()                                     # (hi, task) in block order
+        try:
+            while cursor <= end or pending:
+                while cursor <= end and len(pending) < 2 * concurrency:
+                    hi = min(cursor + span.value - 1, end)
+                    pending.append((hi, asyncio.create_task(
+                        fetch_range(rpc, span, pool.address, cursor, hi))))
+                    cursor = hi + 1
+                hi, task = pending.popleft()
+                for name, df in decode_logs(await task).items():
+                    if len(df):
+                        df.to_csv(files[name], mode="a", header=False, index=False)
+                        rows[name] += len(df)
+                _save_progress(pool, data_dir, files, hi)
+        finally:
+            for _, t in pending:
+                t.cancel()
+            await asyncio.gather(*(t for _, t in pending), return_exceptions=True)
+    return rows, rpc.calls
+
+
+# ---------------- 4. CLI ---------------- #
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Concurrent eth_getLogs fetcher for V2 pairs")
+    ap.add_argument("pool", help=f"registered pool ({', '.join(POOLS)})")
+    ap.add_argument("--from-block", type=int, default=None, help="first block (new downloads)")
+    ap.add_argument("--to-block", default="latest")
+    ap.add_argument("--rpc-url", default=None, help="default: $<CHAIN>_RPC_URL, e.g. ETHEREUM_RPC_URL")
+    ap.add_argument("--data-dir", default=".")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--overwrite", action="store_true", help="start over, ignoring existing CSVs")
+    args = ap.parse_args(argv)
+
+    pool = get_pool(args.pool)
+    rpc_url = args.rpc_url or os.environ.get(f"{pool.chain.upper()}_RPC_URL")
+    if not rpc_url:
+        ap.error(f"give --rpc-url or set {pool.chain.upper()}_RPC_URL")
+
+    start = time.perf_counter()
+    rows, calls = asyncio.run(fetch_pool(pool, rpc_url, args.from_block, args.to_block,
+                                         args.data_dir, args.concurrency, args.overwrite))
+    secs = time.perf_counter() - start
+    print("🎉 " + "  ".join(f"{n}s = {r:,}" for n, r in rows.items())
+          + f"  ({calls:,} eth_getLogs calls, {secs:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+gmm_core.py
+-------------------------------------------------
+Two-step GMM for the volume equation
+
+    V = a0 + a_sigma·sigma + a_c·sqrt(c) + ε,     E[ z·ε ] = 0  (12 instruments)
+
+The moments  m̄(θ) = Z'(y - Xθ)/T = b - Aθ  are linear in θ, so with the
+sufficient statistics A = Z'X/T, b = Z'y/T and the moment covariance S:
+
+• step 1 (W = I):       θ₁ = (A'A)⁻¹ A'b
+• step 2 (W = S(θ₁)⁺):  θ₂ = (A'WA)⁻¹ A'Wb
+• G = -A exactly → Var(θ₂) = (A'WA)⁻¹ / T,   J = T · m̄(θ₂)' W m̄(θ₂)
+
+No optimizer and no numerical gradient; method="bfgs" keeps the original
+BFGS + finite-difference path for checking.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from numpy.linalg import inv, pinv, solve
+from scipy.optimize import minimize
+from scipy.stats import chi2
+
+import profiling
+
+EPS         = 1e-8                       # 防 log(0)
+PARAM_NAMES = ["a0", "a_sigma", "a_c"]
+THETA0      = np.array([50.0, 1000.0, 5.0])
+BLOCK_ROWS  = 1_000_000                  # rows per block when forming Z'X, S
+
+
+# ---------------- 1. data & instruments ---------------- #
+def clean_volume_data(data, lag_v=True, drop=True):
+    """gmm.py 的清理規則：數字化、V_prev = V.shift(1)、丟 NaN 與 log/sqrt 不合法列.
+
+    lag_v=False keeps the file's own V_prev column instead of V.shift(1);
+    drop=False only converts to numbers and keeps every row (gmm_sgima2.py).
+    """
+    data = data.copy()
+    for col in ["V", "sigma", "c"]:
+        data[col] = pd.to_numeric(data[col], errors="coerce")
+    if lag_v:
+        data["V_prev"] = data["V"].shift(1)
+    else:
+        data["V_prev"] = pd.to_numeric(data["V_prev"], errors="coerce")
+    if not drop:
+        return data.reset_index(drop=True)
+    data = data.dropna(subset=["V", "sigma", "c", "V_prev"])
+    data = data[(data["V_prev"] > 0) & (data["c"] > 0) & (data["sigma"] >= 0)]
+    return data.reset_index(drop=True)
+
+
+def load_volume_data(csv_file):
+    """data.csv (V, sigma, c) → cleaned arrays V, sigma, c, V_prev."""
+    with profiling.stage("load") as st:
+        data = clean_volume_data(pd.read_csv(csv_file, dtype=str))
+        st.rows = len(data)
+    return tuple(data[col].to_numpy(dtype=np.float64) for col in ["V", "sigma", "c", "V_prev"])
+
+
+def build_regressors(sigma, c, sig_term=None):
+    """X = [1, sig_term, sqrt(c)]；sig_term 預設為 sigma."""
+    sig_term = sigma if sig_term is None else sig_term
+    return np.column_stack((np.ones(len(c)), sig_term, np.sqrt(c)))
+
+
+def build_instruments(sigma, c, V_prev, sig_term=None):
+    """12 instruments: z_base, z_base·sig_term, z_base·log c, z_base·log V_prev."""
+    z_base = build_regressors(sigma, c, sig_term)
+    sig_term = z_base[:, 1]
+    log_c = np.log(c + EPS)
+    log_v = np.log(V_prev + EPS)
+    return np.column_stack((z_base,
+                            z_base * sig_term[:, None],
+                            z_base * log_c[:, None],
+                            z_base * log_v[:, None]))
+
+
+# ---------------- 2. sufficient statistics ---------------- #
+def design_blocks(V, sigma, c, V_prev, sig_term=None, size=BLOCK_ROWS):
+    """Yield (y, X, Z) for consecutive row blocks, so Z is never built for all T rows."""
+    for lo in range(0, len(V), size):
+        sl = slice(lo, lo + size)
+        st = None if sig_term is None else sig_term[sl]
+        yield (V[sl],
+               build_regressors(sigma[sl], c[sl], st),
+               build_instruments(sigma[sl], c[sl], V_prev[sl], st))
+
+
+def csv_design_blocks(csv_file, chunksize=BLOCK_ROWS, dtype=np.float64):
+    """Stream (y, X, Z) blocks from a CSV with V, sigma, c.
+
+    Same rows as clean_volume_data: V_prev is the previous *raw* V, carried
+    across chunk boundaries, and invalid rows are dropped after the shift.
+    """
+    last_V = np.nan
+    for chunk in pd.read_csv(csv_file, usecols=["V", "sigma", "c"], dtype=str, chunksize=chunksize):
+        V, sigma, c = (pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=np.float64)
+                       for col in ["V", "sigma", "c"])
+        V_prev = np.concatenate(([last_V], V[:-1]))
+        last_V = V[-1]
+
+        ok = ~(np.isnan(V) | np.isnan(sigma) | np.isnan(c) | np.isnan(V_prev))
+        ok &= (V_prev > 0) & (c > 0) & (sigma >= 0)
+        if not ok.any():
+            continue
+        V, sigma, c, V_prev = (a[ok].astype(dtype) for a in (V, sigma, c, V_prev))
+        yield V, build_regressors(sigma, c), build_instruments(sigma, c, V_prev)
+
+
+def cross_products(blocks):
+    """(Z'X, Z'y, T) accumulated over an iterable of (y, X, Z) blocks.
+
+    Works for any array backend with `@` (NumPy, CuPy); sums stay on that backend.
+    """
+    ZX = Zy = None
+    T = 0
+    with profiling.stage("gmm_step1") as st:
+        for y, X, Z in blocks:
+            zx, zy = Z.T @ X, Z.T @ y
+            ZX = zx if ZX is None else ZX + zx
+            Zy = zy if Zy is None else Zy + zy
+            T += len(y)
+        st.rows = T
+    return ZX, Zy, T
+
+
+def moment_cov(blocks, theta):
+    """S = cov(m_t(θ), bias=True) with m_t = z_t·(y_t - x_t θ), one pass over the blocks."""
+    s1 = s2 = None
+    T = 0
+    for y, X, Z in blocks:
+        m = (y - X @ theta)[:, None] * Z
+        m1, m2 = m.sum(axis=0), m.T @ m
+        s1 = m1 if s1 is None else s1 + m1
+        s2 = m2 if s2 is None else s2 + m2
+        T += len(y)
+    m_bar = s1 / T
+    return s2 / T - m_bar[:, None] * m_bar[None, :]
+
+
+def augmented_products(y, X, Z):
+    """u_t = w_t ⊗ z_t with w_t = (y_t, x_t): (T, (1+k)·p).
+
+    Σu holds Z'y and Z'X; Σuu' holds Σ w_a w_b z z', from which S(θ) follows
+    for any θ without touching the data again (see stats_gmm).
+    """
+    W = np.column_stack((y, X))
+    return (W[:, :, None] * Z[:, None, :]).reshape(len(y), -1)
+
+
+def stats_gmm(n, sU, sUU, k=3, p=12, step2="closed"):
+    """Two-step GMM from (n, Σu, Σuu') of augmented_products."""
+    U1 = sU.reshape(1 + k, p)
+    Zy, ZX = U1[0], U1[1:].T
+    M = sUU.reshape(1 + k, p, 1 + k, p)
+
+    def cov_fn(theta):
+        cc = np.concatenate(([1.0], -theta))
+        E = np.einsum("a,b,aibj->ij", cc, cc, M)
+        m_bar = (Zy - ZX @ theta) / n
+        return E / n - np.outer(m_bar, m_bar)
+
+    return gmm_from_stats(ZX, Zy, n, cov_fn, step2=step2)
+
+
+# ---------------- 3. estimator ---------------- #
+@dataclass
+class GMMResult:
+    theta: np.ndarray
+    se: np.ndarray
+    J: float
+    df: int
+    p_value: float
+    n: int
+    theta1: np.ndarray
+    W: np.ndarray
+    trajectory: list = field(default_factory=list, repr=False)
+    names: list = field(default_factory=lambda: list(PARAM_NAMES))
+
+    @property
+    def ci_lower(self):
+        return self.theta - 1.96 * self.se
+
+    @property
+    def ci_upper(self):
+        return self.theta + 1.96 * self.se
+
+    def summary(self):
+        lines = ["=== Two-step GMM Estimates ==="]
+        for n, est, se, lo, hi in zip(self.names, self.theta, self.se, self.ci_lower, self.ci_upper):
+            lines.append(f"{n:8}: {est:12.4f}  SE={se:9.4f}  95% CI=[{lo:10.4f}, {hi:10.4f}]")
+        lines.append(f"\nHansen J-stat = {self.J:.4f}  (df={self.df})  p-value = {self.p_value:.4f}")
+        return "\n".join(lines)
+
+
+def gmm_from_stats(ZX, Zy, T, cov_fn, step2="closed", theta1=None):
+    """Two-step GMM from Z'X, Z'y and S(θ) = cov_fn(θ).
+
+    step2="bfgs" minimizes m̄(θ)'W m̄(θ) numerically instead, still evaluated
+    from the accumulators (m̄(θ) = b - Aθ), never from the data.
+    theta1: step-1 estimate to use instead of identity-weight GMM (A'A)⁻¹A'b.
+    """
+    A = ZX / T
+    b = Zy / T
+
+    if theta1 is None:
+        theta1 = solve(A.T @ A, A.T @ b)
+    with profiling.stage("gmm_step2") as st:
+        W = pinv(cov_fn(theta1))
+
+        AWA = A.T @ W @ A
+        trajectory = []
+        if step2 == "bfgs":
+            theta2 = minimize(lambda th: (b - A @ th) @ W @ (b - A @ th), theta1, method="BFGS",
+                              callback=lambda xk: trajectory.append(xk.copy())).x
+        else:
+            theta2 = solve(AWA, A.T @ W @ b)
+        st.rows = T
+
+    var_t = inv(AWA) / T
+    m_final = b - A @ theta2
+    J_stat = T * (m_final @ W @ m_final)
+    df_J = A.shape[0] - A.shape[1]
+    return GMMResult(theta=theta2, se=np.sqrt(np.diag(var_t)),
+                     J=float(J_stat), df=df_J, p_value=float(chi2.sf(J_stat, df_J)),
+                     n=int(T), theta1=theta1, W=W, trajectory=trajectory)
+
+
+def gmm_bfgs(y, X, Z, theta0=THETA0):
+    """Original path: two BFGS minimizations + finite-difference Jacobian."""
+    T = len(y)
+
+    def compute_moments(theta):
+        return (y - X @ theta)[:, None] * Z
+
+    def avg_moments(theta):
+        return compute_moments(theta).mean(axis=0)
+
+    theta1 = minimize(lambda th: avg_moments(th) @ avg_moments(th), theta0, method="BFGS").x
+
+    S = np.cov(compute_moments(theta1).T, bias=True)
+    W_opt = pinv(S)
+
+    trajectory = []
+    res2 = minimize(lambda th: avg_moments(th) @ W_opt @ avg_moments(th), theta1,
+                    method="BFGS", callback=lambda xk: trajectory.append(xk.copy()))
+    theta2 = res2.x
+
+    def num_grad(f, theta, eps=1e-6):
+        g = np.zeros((len(theta), Z.shape[1]))
+        for i in range(len(theta)):
+            delta    = np.zeros_like(theta)
+            delta[i] = eps
+            g[i, :]  = (f(theta + delta) - f(theta - delta)) / (2*eps)
+        return g.T
+
+    G = num_grad(avg_moments, theta2)
+    var_t = inv(G.T @ W_opt @ G) / T
+    m_final = avg_moments(theta2)
+    J_stat = T * (m_final @ W_opt @ m_final)
+    df_J = Z.shape[1] - len(theta2)
+    return GMMResult(theta=theta2, se=np.sqrt(np.diag(var_t)),
+                     J=float(J_stat), df=df_J, p_value=float(chi2.sf(J_stat, df_J)),
+                     n=T, theta1=theta1, W=W_opt, trajectory=trajectory)
+
+
+def two_step_gmm(V, sigma, c, V_prev, sig_term=None, method="closed", theta0=THETA0):
+    """Two-step GMM of V on [1, sig_term, sqrt(c)] with the 12 standard instruments.
+
+    method = "closed" (default) or "bfgs" (original optimizer path, for checking).
+    """
+    if method == "bfgs":
+        X = build_regressors(sigma, c, sig_term)
+        Z = build_instruments(sigma, c, V_prev, sig_term)
+        return gmm_bfgs(V, X, Z, theta0)
+    if method != "closed":
+        raise ValueError(f"unknown method {method!r} (closed / bfgs)")
+
+    def blocks():
+        return design_blocks(V, sigma, c, V_prev, sig_term)
+
+    ZX, Zy, T = cross_products(blocks())
+    return gmm_from_stats(ZX, Zy, T, lambda th: moment_cov(blocks(), th))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+gmm_panel.py
+-------------------------------------------------
+Panel GMM over every registered pool (pools.POOLS), using the pipeline.py
+outputs  <pool>.csv  (volume → V, RV → sigma, pool_value → c).
+
+• separate：每個 pool 各自做兩階段 GMM，一個 pool 一個 process
+• pooled：stacked GMM with pool fixed effects
+      V_it = α_i + a_sigma·sigma_it + a_c·sqrt(c_it) + ε_it
+  moments are the 12 instruments *per pool* (12·P moments); --common picks
+  which slopes are restricted to be equal across pools (default: both)
+  each pool's moments are scaled to unit RMS first, so pools of very
+  different size do not vanish in pinv(S) or in the first step
+• the workers also return (n, Σu, Σuu') of gmm_core.augmented_products, so
+  the pooled model is solved in closed form without reloading any pool
+
+    python gmm_panel.py --data-dir data --out panel.csv
+    python gmm_panel.py --data-dir data --common a_c          # a_sigma per pool
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from gmm_core import (PARAM_NAMES, augmented_products, clean_volume_data, design_blocks,
+                      gmm_from_stats, two_step_gmm)
+from pools import POOLS, get_pool
+
+PIPELINE_COLUMNS = {"volume": "V", "RV": "sigma", "pool_value": "c"}
+
+
+# ---------------- 1. per pool (worker) ---------------- #
+def load_pool_data(path):
+    data = pd.read_csv(path, usecols=list(PIPELINE_COLUMNS), dtype=str).rename(columns=PIPELINE_COLUMNS)
+    data = clean_volume_data(data)
+    return tuple(data[col].to_numpy(dtype=np.float64) for col in ["V", "sigma", "c", "V_prev"])
+
+
+def fit_pool(name, path):
+    """Separate two-step GMM of one pool + its augmented sufficient statistics."""
+    with profiling.run(f"gmm_panel_{name}"):
+        with profiling.stage("load") as st:
+            V, sigma, c, V_prev = load_pool_data(path)
+            st.rows = len(V)
+        res = two_step_gmm(V, sigma, c, V_prev)
+
+        sU = sUU = None
+        with profiling.stage("products") as st:
+            for y, X, Z in design_blocks(V, sigma, c, V_prev):
+                U = augmented_products(y, X, Z)
+                sU = U.sum(axis=0) if sU is None else sU + U.sum(axis=0)
+                sUU = U.T @ U if sUU is None else sUU + U.T @ U
+            st.rows = len(V)
+    return name, res, (len(V), sU, sUU)
+
+
+# ---------------- 2. pooled / stacked GMM ---------------- #
+def pooled_gmm(stats, common=("a_sigma", "a_c"), k=3, p=12):
+    """Stacked GMM with pool fixed effects from per-pool (n, Σu, Σuu').
+
+    θ = [α_1 … α_P, common slopes, pool-specific slopes (pool-major)].
+    Returns (GMMResult, parameter labels, R) where β_i = R[i] @ θ.
+    """
+    names = list(stats)
+    P = len(names)
+    slopes = PARAM_NAMES[1:]
+    labels = [f"a0[{n}]" for n in names] + [s for s in slopes if s in common]
+    for n in names:
+        labels += [f"{s}[{n}]" for s in slopes if s not in common]
+    col = {lab: j for j, lab in enumerate(labels)}
+
+    R = np.zeros((P, k, len(labels)))
+    for i, n in enumerate(names):
+        R[i, 0, col[f"a0[{n}]"]] = 1.0
+        for s_i, s in enumerate(slopes, start=1):
+            R[i, s_i, col[s if s in common else f"{s}[{n}]"]] = 1.0
+
+    # every moment is scaled by 1/RMS(y·z) of its pool: S grows with V², and pools
+    # far apart in scale would otherwise fall under pinv's cutoff in one S
+    N = sum(stats[n][0] for n in names)
+    ZX = np.zeros((P * p, len(labels)))
+    Zy = np.zeros(P * p)
+    M = []
+    for i, n in enumerate(names):
+        n_i, sU, sUU = stats[n]
+        Mi = sUU.reshape(1 + k, p, 1 + k, p)
+        d = np.sqrt(np.diagonal(Mi[0, :, 0, :]) / n_i)
+        d = 1.0 / np.where(d > 0, d, 1.0)
+        U1 = sU.reshape(1 + k, p) * d
+        ZX[i * p:(i + 1) * p] = U1[1:].T @ R[i]
+        Zy[i * p:(i + 1) * p] = U1[0]
+        M.append(Mi * d[None, :, None, None] * d[None, None, None, :])
+
+    def cov_fn(theta):
+        S = np.zeros((P * p, P * p))
+        for i in range(P):
+            cc = np.concatenate(([1.0], -(R[i] @ theta)))
+            S[i * p:(i + 1) * p, i * p:(i + 1) * p] = np.einsum("a,b,aibj->ij", cc, cc, M[i]) / N
+        m_bar = (Zy - ZX @ theta) / N
+        return S - np.outer(m_bar, m_bar)
+
+    res = gmm_from_stats(ZX, Zy, N, cov_fn)
+    res.names = labels
+    return res, labels, R
+
+
+# ---------------- 3. driver ---------------- #
+def panel(paths, common=("a_sigma", "a_c"), jobs=None):
+    """Fit every pool in parallel, then the pooled FE model; returns one table."""
+    with ProcessPoolExecutor(max_workers=jobs or min(len(paths), os.cpu_count() or 1)) as ex:
+        futs = [ex.submit(fit_pool, n, p) for n, p in paths.items()]
+        out = [f.result() for f in futs]
+
+    rows, stats = [], {}
+    for name, res, st in out:
+        stats[name] = st
+        rec = {"model": "separate", "pool": name, "n": res.n}
+        for pn, est, se in zip(PARAM_NAMES, res.theta, res.se):
+            rec[pn], rec[f"se_{pn}"] = est, se
+        rec.update(J=res.J, df=res.df, p_J=res.p_value)
+        rows.append(rec)
+
+    pooled, labels, R = pooled_gmm(stats, common)
+    for i, name in enumerate(stats):
+        beta = R[i] @ pooled.theta
+        se = np.sqrt(np.einsum("kj,kj->k", R[i], R[i] * pooled.se**2))   # R picks single entries
+        rec = {"model": f"pooled FE (common: {','.join(common) or 'none'})", "pool": name, "n": stats[name][0]}
+        for pn, est, s in zip(PARAM_NAMES, beta, se):
+            rec[pn], rec[f"se_{pn}"] = est, s
+        rec.update(J=pooled.J, df=pooled.df, p_J=pooled.p_value)
+        rows.append(rec)
+    return pd.DataFrame(rows), pooled
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-pool and pooled GMM across registered pools")
+    ap.add_argument("pools", nargs="*", help="pool names (default: every registered pool with an output file)")
+    ap.add_argument("--data-dir", default=".", help="directory with the pipeline.py outputs <pool>.csv")
+    ap.add_argument("--common", nargs="*", default=["a_sigma", "a_c"], choices=PARAM_NAMES[1:],
+                    help="slopes restricted equal across pools")
+    ap.add_argument("--jobs", type=int, default=0)
+    ap.add_argument("--out", default="gmm_panel.csv")
+    profiling.add_argument(ap)
+    args = ap.parse_args(argv)
+    profiling.apply(args)
+
+    names = args.pools or [n for n in POOLS
+                           if os.path.exists(os.path.join(args.data_dir, POOLS[n].output_file))]
+    paths = {n: os.path.join(args.data_dir, get_pool(n).output_file) for n in names}
+    if not paths:
+        ap.error("no pool outputs found; run pipeline.py first")
+
+    with profiling.run("gmm_panel"):
+        with profiling.stage("panel"):
+            table, pooled = panel(paths, tuple(args.common), args.jobs or None)
+    table.to_csv(args.out, index=False)
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(table[["model", "pool", "n", *PARAM_NAMES, "J", "df", "p_J"]])
+    print(f"\n✅ {len(paths)} pools → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+gmm_rolling.py
+-------------------------------------------------
+Rolling / expanding-window two-step GMM for parameter-stability tracking.
+
+• rows are grouped into steps (e.g. 7200 blocks = 1 day); each step is
+  reduced once to (n, Σu, Σuu') with u = (V, x) ⊗ z  (gmm_core.augmented_products)
+• the window statistics are updated incrementally: add the new step,
+  subtract the expired one；每 REANCHOR 步重新加總一次，避免長時間累積誤差
+• every window is then solved in closed form (gmm_core.stats_gmm), so
+  thousands of windows cost about one pass over the data
+
+    python gmm_rolling.py --csv data.csv --step 7200 --window 30 --out rolling.csv
+    python gmm_rolling.py --csv data.csv --step 7200 --expanding
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from numpy.linalg import LinAlgError
+
+import profiling
+from gmm_core import (PARAM_NAMES, augmented_products, build_instruments, build_regressors,
+                      clean_volume_data, stats_gmm)
+
+REANCHOR = 256                  # steps between exact re-sums of the running window
+
+
+def step_stats(V, sigma, c, V_prev, step_id):
+    """Per-step (n, Σu, Σuu') for rows already sorted by step_id."""
+    starts = np.flatnonzero(np.r_[True, step_id[1:] != step_id[:-1]])
+    ends = np.r_[starts[1:], len(step_id)]
+
+    n = ends - starts
+    sU = sUU = None
+    with profiling.stage("products") as st:
+        for i, (lo, hi) in enumerate(zip(starts, ends)):
+            s = slice(lo, hi)
+            U = augmented_products(V[s], build_regressors(sigma[s], c[s]),
+                                   build_instruments(sigma[s], c[s], V_prev[s]))
+            if sU is None:
+                sU = np.empty((len(starts), U.shape[1]))
+                sUU = np.empty((len(starts), U.shape[1], U.shape[1]))
+            sU[i] = U.sum(axis=0)
+            sUU[i] = U.T @ U
+        st.rows = len(V)
+    return step_id[starts], n, sU, sUU
+
+
+def rolling_gmm(V, sigma, c, V_prev, step_id, window=30, expanding=False, min_rows=100):
+    """Time series of GMM estimates over windows of `window` steps (or expanding)."""
+    keys, n, sU, sUU = step_stats(V, sigma, c, V_prev, step_id)
+
+    rows = []
+    run_n, run_U, run_UU = 0, np.zeros(sU.shape[1]), np.zeros(sUU.shape[1:])
+    for k in range(len(keys)):
+        lo = 0 if expanding else max(0, k - window + 1)
+        if k % REANCHOR == 0:
+            run_n, run_U, run_UU = n[lo:k + 1].sum(), sU[lo:k + 1].sum(axis=0), sUU[lo:k + 1].sum(axis=0)
+        else:
+            run_n, run_U, run_UU = run_n + n[k], run_U + sU[k], run_UU + sUU[k]
+            if not expanding and k - window >= 0:
+                old = k - window
+                run_n, run_U, run_UU = run_n - n[old], run_U - sU[old], run_UU - sUU[old]
+
+        if (not expanding and k < window - 1) or run_n < min_rows:
+            continue
+        rec = {"step_start": keys[lo], "step_end": keys[k], "n": int(run_n)}
+        try:
+            res = stats_gmm(run_n, run_U, run_UU)
+        except LinAlgError:
+            rows.append(rec)
+            continue
+        for name, est, se in zip(PARAM_NAMES, res.theta, res.se):
+            rec[name] = est
+            rec[f"se_{name}"] = se
+        rec.update(J=res.J, df=res.df, p_J=res.p_value)
+        rows.append(rec)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rolling / expanding two-step GMM")
+    ap.add_argument("--csv", default="data.csv", help="CSV with V, sigma, c (and optionally blockNumber)")
+    ap.add_argument("--step", type=int, default=7200, help="rows (or blocks with --by) per step")
+    ap.add_argument("--window", type=int, default=30, help="steps per rolling window")
+    ap.add_argument("--expanding", action="store_true")
+    ap.add_argument("--by", default=None, help="column to bucket on, e.g. blockNumber (default: row count)")
+    ap.add_argument("--out", default="rolling_gmm.csv")
+    profiling.add_argument(ap)
+    args = ap.parse_args(argv)
+    profiling.apply(args)
+
+    with profiling.run("gmm_rolling"):
+        with profiling.stage("load") as st:
+            data = clean_volume_data(pd.read_csv(args.csv, dtype=str))
+            st.rows = len(data)
+        if args.by:
+            step_id = pd.to_numeric(data[args.by]).to_numpy(dtype=np.int64) // args.step
+        else:
+            step_id = np.arange(len(data)) // args.step
+        V, sigma, c, V_prev = (data[col].to_numpy(dtype=np.float64) for col in ["V", "sigma", "c", "V_prev"])
+
+        out = rolling_gmm(V, sigma, c, V_prev, step_id, window=args.window, expanding=args.expanding)
+    out.to_csv(args.out, index=False)
+    print(f"✅ {len(out):,} windows → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+"""
+gmm_spec.py
+-------------------------------------------------
+Batched specification search for the volume equation
+
+    V = a0 + a_sigma·f(sigma) + a_c·sqrt(c) + ε,    f ∈ {sigma, sigma², …}
+
+with instruments  z_base = [1, f(sigma), sqrt(c)]  plus  z_base × block  for
+every chosen block (f(sigma), sigma, sigma², log c, log V_{t-1}, log V_{t-2}, …).
+
+• 每個 instrument 都是基本因子的乘積 (sigma, sqrt_c, log_c, log_v1, …)，
+  以排序後的因子 tuple 當 key → 各 spec 共用同一組欄位，重複的欄位自動去掉
+• one pass over the data accumulates, for the union of all columns,
+      Σ w q'            (w = [V, 1, every regressor], q = every instrument)
+      Σ (w_a w_b)(q_i q_j)   over unique pairs
+  and every spec is then solved in closed form from sub-blocks of those sums
+• results: ranked table of estimates, SEs, J, and Andrews (1999) GMM
+  model-selection criteria  MSC = J - (#z - #θ)·κ(n)   (BIC / AIC / HQIC)
+
+    python gmm_spec.py --csv data.csv --lags 2 --out specs.csv
+"""
+
+import argparse
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from numpy.linalg import LinAlgError
+
+import profiling
+from gmm_core import EPS, PARAM_NAMES, clean_volume_data, gmm_from_stats
+
+BLOCK_ROWS = 100_000
+
+# regressor transforms f(sigma) as factor tuples
+TRANSFORMS = {
+    "sigma":  ("sigma",),
+    "sigma2": ("sigma", "sigma"),
+}
+
+
+@dataclass(frozen=True)
+class Spec:
+    transform: str                   # key of TRANSFORMS
+    blocks: tuple                    # instrument blocks: "f", "sigma", "sigma2", "log_c", "log_v1", …
+    dedup: bool = True               # False → keep repeated columns (gmm.py's 12 moments, df 9)
+
+    @property
+    def name(self):
+        return f"{self.transform} | " + "+".join(self.blocks)
+
+    def regressors(self):
+        return [(), TRANSFORMS[self.transform], ("sqrt_c",)]
+
+    def instruments(self):
+        z_base = self.regressors()
+        cols = list(z_base)
+        for blk in self.blocks:
+            f = TRANSFORMS[self.transform] if blk == "f" else \
+                TRANSFORMS[blk] if blk in TRANSFORMS else (blk,)
+            cols += [zb + f for zb in z_base]
+        if not self.dedup:
+            return [tuple(sorted(col)) for col in cols]
+        keys, seen = [], set()
+        for col in cols:
+            key = tuple(sorted(col))
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+        return keys
+
+
+def default_specs(lags=1):
+    """Both transforms × every superset of the f(sigma) block over log c / log V lags / the other sigma."""
+    extra = ["log_c"] + [f"log_v{l}" for l in range(1, lags + 1)]
+    specs = []
+    for t in TRANSFORMS:
+        other = [o for o in TRANSFORMS if o != t]
+        pool = extra + other
+        for r in range(0, len(pool) + 1):
+            for combo in combinations(pool, r):
+                specs.append(Spec(t, ("f",) + combo))
+    return specs
+
+
+# ---------------- 1. data → base factors ---------------- #
+def load_factors(data, lags=1, lag_v=True, drop=True):
+    """Cleaned rows (gmm.py rules, plus valid V lags) → V and the base factor arrays.
+
+    lag_v=False: log_v1 comes from the file's V_prev column; drop=False keeps
+    every row (see clean_volume_data).
+    """
+    data = data.copy()
+    V_raw = pd.to_numeric(data["V"], errors="coerce")
+    for l in range(2, lags + 1):
+        data[f"V_lag{l}"] = V_raw.shift(l)
+    data = clean_volume_data(data, lag_v, drop)
+    for l in range(2 if drop else lags + 1, lags + 1):
+        lag = pd.to_numeric(data[f"V_lag{l}"])
+        data = data[lag.notna() & (lag > 0)]
+
+    V, sigma, c, V_prev = (data[col].to_numpy(dtype=np.float64) for col in ["V", "sigma", "c", "V_prev"])
+    factors = {"sigma": sigma, "sqrt_c": np.sqrt(c),
+               "log_c": np.log(c + EPS), "log_v1": np.log(V_prev + EPS)}
+    for l in range(2, lags + 1):
+        factors[f"log_v{l}"] = np.log(data[f"V_lag{l}"].to_numpy(dtype=np.float64) + EPS)
+    return V, factors
+
+
+def _column(factors, key, sl):
+    out = np.ones(sl.stop - sl.start)
+    for f in key:
+        out = out * factors[f][sl]
+    return out
+
+
+# ---------------- 2. one pass: shared column products ---------------- #
+def shared_products(V, factors, specs, block_rows=BLOCK_ROWS):
+    """Accumulate first- and fourth-order products for the union of all spec columns."""
+    w_keys = ["y"] + sorted({r for s in specs for r in s.regressors()}, key=lambda k: (len(k), k))
+    q_keys = sorted({z for s in specs for z in s.instruments()}, key=lambda k: (len(k), k))
+    nw, nq = len(w_keys), len(q_keys)
+    wa, wb = np.triu_indices(nw)
+    qi, qj = np.triu_indices(nq)
+
+    F = np.zeros((nw, nq))
+    M = np.zeros((len(wa), len(qi)))
+    T = len(V)
+    with profiling.stage("products") as st:
+        for lo in range(0, T, block_rows):
+            sl = slice(lo, min(lo + block_rows, T))
+            Wm = np.column_stack([V[sl] if k == "y" else _column(factors, k, sl) for k in w_keys])
+            Qm = np.column_stack([_column(factors, k, sl) for k in q_keys])
+            F += Wm.T @ Qm
+            M += (Wm[:, wa] * Wm[:, wb]).T @ (Qm[:, qi] * Qm[:, qj])
+        st.rows = T
+
+    # full symmetric 4-index tensor M4[a, b, i, j]
+    M4 = np.zeros((nw, nw, nq, nq))
+    for p, (a, b) in enumerate(zip(wa, wb)):
+        blk = np.zeros((nq, nq))
+        blk[qi, qj] = M[p]
+        blk[qj, qi] = M[p]
+        M4[a, b] = M4[b, a] = blk
+    return {"w": {k: i for i, k in enumerate(w_keys)},
+            "q": {k: i for i, k in enumerate(q_keys)},
+            "F": F, "M4": M4, "n": T}
+
+
+def fit_spec(shared, spec):
+    """Closed-form two-step GMM of one spec from the shared products."""
+    n = shared["n"]
+    wi = [0] + [shared["w"][r] for r in spec.regressors()]
+    zi = [shared["q"][z] for z in spec.instruments()]
+    F = shared["F"][np.ix_(wi, zi)]                  # (1+k, p)
+    Zy, ZX = F[0], F[1:].T
+    M = shared["M4"][np.ix_(wi, wi, zi, zi)]
+
+    def cov_fn(theta):
+        cc = np.concatenate(([1.0], -theta))
+        E = np.einsum("a,b,abij->ij", cc, cc, M)
+        m_bar = (Zy - ZX @ theta) / n
+        return E / n - np.outer(m_bar, m_bar)
+
+    return gmm_from_stats(ZX, Zy, n, cov_fn)
+
+
+def spec_search(V, factors, specs):
+    """Ranked table (by MSC-BIC) of every spec, all fitted from one pass."""
+    shared = shared_products(V, factors, specs)
+    n = shared["n"]
+    rows = []
+    for spec in specs:
+        rec = {"spec": spec.name, "transform": spec.transform,
+               "blocks": "+".join(spec.blocks), "n_z": len(spec.instruments())}
+        try:
+            res = fit_spec(shared, spec)
+        except LinAlgError:
+            rows.append(rec)
+            continue
+        for name, est, se in zip(PARAM_NAMES, res.theta, res.se):
+            rec[name] = est
+            rec[f"se_{name}"] = se
+        over = res.df
+        rec.update(J=res.J, df=over, p_J=res.p_value,
+                   MSC_BIC=res.J - over * np.log(n),
+                   MSC_AIC=res.J - 2 * over,
+                   MSC_HQIC=res.J - 2.01 * over * np.log(np.log(n)))
+        rows.append(rec)
+    return (pd.DataFrame(rows)
+              .sort_values("MSC_BIC", na_position="last")
+              .reset_index(drop=True))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Batched GMM specification search")
+    ap.add_argument("--csv", default="data.csv", help="CSV with V, sigma, c")
+    ap.add_argument("--lags", type=int, default=1, help="log V lags available as instrument blocks")
+    ap.add_argument("--out", default="gmm_specs.csv")
+    profiling.add_argument(ap)
+    args = ap.parse_args(argv)
+    profiling.apply(args)
+
+    with profiling.run("gmm_spec"):
+        with profiling.stage("load") as st:
+            V, factors = load_factors(pd.read_csv(args.csv, dtype=str), args.lags)
+            st.rows = len(V)
+        table = spec_search(V, factors, default_specs(args.lags))
+    table.to_csv(args.out, index=False)
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(table[["spec", "n_z", *PARAM_NAMES, "J", "p_J", "MSC_BIC"]].head(20))
+    print(f"\n✅ {len(table)} specs → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
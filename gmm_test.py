@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
 # gmm_gpu.py ---------------------------------------------------
 """
-GPU-accelerated two-step GMM for volume equation
+GPU-accelerated streaming two-step GMM for volume equation
     V  = a0 + a_sigma·sigma + a_c·sqrt(c) + ε
 • supports float32 / float64
 • streams dataset in batches if the whole thing does not fit in VRAM
+• reads the CSV exactly twice: pass 1 → Z'X, Z'y ; pass 2 → S(θ₁)
+• step 1 is OLS as before: z_base = X, so X'X, X'y are the first 3 rows of Z'X, Z'y
+• step 2 is evaluated from those in-memory accumulators (m̄(θ) = b - Aθ)
+• V_prev is carried across batch boundaries (same rows as gmm.py)
 • falls back to NumPy when no CUDA device is visible
 """
 
-import argparse, sys, math, os
+import argparse, math
 import numpy as np
-import pandas as pd
+
+import profiling
+from gmm_core import csv_design_blocks, cross_products, moment_cov, gmm_from_stats
+
+# AMM_PROFILE=<dir> → stage timings / memory in <dir>/gmm_test.profile.json
+profiling.start("gmm_test")
 
 # ------------------------------------------------------------
 # 0. CLI
@@ -20,10 +29,11 @@ ap.add_argument("--csv",   required=True, help="CSV with V, sigma, c")
 ap.add_argument("--dtype", choices=["float32","float64"], default="float32")
 ap.add_argument("--batch", type=int, default=0,
                 help="rows per GPU batch (0 = auto)")
+ap.add_argument("--step2", choices=["closed","bfgs"], default="closed",
+                help="step-2 solver; both use the accumulators only")
 args   = ap.parse_args()
 DTYPE  = np.float32 if args.dtype=="float32" else np.float64
 BYTES  = 4 if args.dtype=="float32" else 8
-EPS    = 1e-8
 
 # ------------------------------------------------------------
 # 1. pick backend: CuPy if GPU, else NumPy
@@ -34,150 +44,48 @@ try:
     print(f"🟢  CuPy detected  ({nGPU} GPU)")
 except Exception:
     import numpy as xp             # type: ignore
-    xp.cuda = None                 # dummy attr
     print("🟡  CuPy not found – fallback to CPU NumPy")
 
 GPU = (xp.__name__ == "cupy")
 
-# ------------------------------------------------------------
-# 2. quick scan CSV – count rows  (avoid loading twice)
-# ------------------------------------------------------------
-row_count = sum(1 for _ in open(args.csv)) - 1
-print(f"rows in CSV = {row_count:,}")
+def to_host(a):
+    return a.get() if GPU else a
 
 # ------------------------------------------------------------
-# 3. decide batch size
-#   memory ≈ 28 * T * bytes_per_float  (see derivation earlier)
+# 2. decide batch size
+#   memory ≈ 28 * T * bytes_per_float  (X, Z, moments per row)
 # ------------------------------------------------------------
-def auto_batch(rows:int, bytes_per=BYTES, vram_GB:float=8.0):
-    need = 28 * rows * bytes_per / 1024**3
-    return rows if need < vram_GB*0.8 else int(math.floor(vram_GB*0.8*1024**3/(28*bytes_per)))
+def auto_batch(bytes_per=BYTES, vram_GB:float=8.0):
+    return int(math.floor(vram_GB*0.8*1024**3/(28*bytes_per)))
 
 if args.batch > 0:
     batch_rows = args.batch
 else:
-    batch_rows = auto_batch(row_count, BYTES,  xp.cuda.Device().mem_info[1]/1024**3 if GPU else 16)
+    batch_rows = auto_batch(BYTES, xp.cuda.Device().mem_info[1]/1024**3 if GPU else 16)
 
 print(f"batch_rows = {batch_rows:,}   (dtype={args.dtype})")
 
-# ------------------------------------------------------------
-# 4. first pass  – read in batches, build sufficient stats
-#   we need:
-#     S₁ = Σ Z'ε   (size 12)
-#     S₂ = Σ (Z'ε)(Z'ε)' (size 12×12)
-#   plus   X'X , X'y  for closed-form OLS (step-1)
-# ------------------------------------------------------------
-p   = 12
-XtX = xp.zeros((3,3),  dtype=DTYPE)
-Xty = xp.zeros(3,       dtype=DTYPE)
-Sum_m   = xp.zeros(p,   dtype=DTYPE)
-Sum_mmT = xp.zeros((p,p),dtype=DTYPE)
-
-reader = pd.read_csv(args.csv, chunksize=batch_rows,
-                     dtype={"V":DTYPE,"sigma":DTYPE,"c":DTYPE})
-
-tot = 0
-for chunk in reader:
-    chunk["V_prev"] = chunk["V"].shift(1)
-    chunk = chunk.dropna(subset=["V","sigma","c","V_prev"])
-    chunk = chunk[(chunk["V_prev"]>0)&(chunk["c"]>0)&(chunk["sigma"]>=0)]
-    if chunk.empty: continue
-
-    V      = xp.asarray(chunk["V"].values,      dtype=DTYPE)
-    sigma  = xp.asarray(chunk["sigma"].values,  dtype=DTYPE)
-    c      = xp.asarray(chunk["c"].values,      dtype=DTYPE)
-    V_prev = xp.asarray(chunk["V_prev"].values, dtype=DTYPE)
-    T = V.size;  tot += T
-
-    X = xp.column_stack((xp.ones(T,dtype=DTYPE), sigma, xp.sqrt(c)))
-    XtX += X.T @ X
-    Xty += X.T @ V
-
-print(f"effective rows after cleaning = {tot:,}")
-
-# ---------- step-1 closed-form / OLS -------------------------
-theta1 = xp.linalg.solve(XtX, Xty).get() if GPU else np.linalg.solve(XtX, Xty)
-print("step-1 theta (OLS) =", theta1)
+def blocks():
+    for V, X, Z in csv_design_blocks(args.csv, batch_rows, DTYPE):
+        yield xp.asarray(V), xp.asarray(X), xp.asarray(Z)
 
 # ------------------------------------------------------------
-# 5. second pass  – compute optimal weight matrix
-#   S = cov( moments )
+# 3. pass 1 – Z'X, Z'y
 # ------------------------------------------------------------
-reader = pd.read_csv(args.csv, chunksize=batch_rows,
-                     dtype={"V":DTYPE,"sigma":DTYPE,"c":DTYPE})
-tot = 0
-Sum_m.fill(0); Sum_mmT.fill(0)
-
-a0, a_sig, a_c = [DTYPE(x) for x in theta1]
-
-for chunk in reader:
-    chunk["V_prev"] = chunk["V"].shift(1)
-    chunk = chunk.dropna(subset=["V","sigma","c","V_prev"])
-    chunk = chunk[(chunk["V_prev"]>0)&(chunk["c"]>0)&(chunk["sigma"]>=0)]
-    if chunk.empty: continue
-
-    V      = xp.asarray(chunk["V"].values,      dtype=DTYPE)
-    sigma  = xp.asarray(chunk["sigma"].values,  dtype=DTYPE)
-    c      = xp.asarray(chunk["c"].values,      dtype=DTYPE)
-    V_prev = xp.asarray(chunk["V_prev"].values, dtype=DTYPE)
-    T = V.size;  tot += T
-
-    Z_base = xp.column_stack((xp.ones(T,dtype=DTYPE),
-                              sigma,
-                              xp.sqrt(c)))
-    log_c  = xp.log(c+EPS)
-    log_v  = xp.log(V_prev+EPS)
-    Z = xp.column_stack((Z_base,
-                         Z_base*sigma[:,None],
-                         Z_base*log_c[:,None],
-                         Z_base*log_v[:,None]))
-
-    resid = V - a0 - a_sig*sigma - a_c*xp.sqrt(c)
-    m = resid[:,None] * Z                 # (T,12)
-
-    Sum_m   += m.sum(axis=0)
-    Sum_mmT += m.T @ m
-
-# mean & covariance (on GPU then bring back)
-m_bar = Sum_m / tot
-S     = (Sum_mmT / tot) - m_bar[:,None]*m_bar[None,:]
-m_bar_host = m_bar.get() if GPU else m_bar
-S_host     = S.get()     if GPU else S
-W_opt = np.linalg.pinv(S_host)
+ZX, Zy, tot = cross_products(blocks())
+ZX, Zy = to_host(ZX).astype(np.float64), to_host(Zy).astype(np.float64)
+print(f"effective rows after cleaning = {tot:,}")
 
 # ------------------------------------------------------------
-# 6. step-2 minimization  (still on CPU, small matrix ops)
+# 4. pass 2 – S(θ₁) inside gmm_from_stats ; step 2 from accumulators
 # ------------------------------------------------------------
-def avg_m(theta):
-    a0,a_sig,a_c = theta.astype(DTYPE)
-    # stream again (memory cheap): only need mean of moments
-    reader = pd.read_csv(args.csv, chunksize=batch_rows,
-                         dtype={"V":DTYPE,"sigma":DTYPE,"c":DTYPE})
-    totM = np.zeros(12, dtype=DTYPE); N=0
-    for ch in reader:
-        ch["V_prev"]=ch["V"].shift(1)
-        ch=ch.dropna(subset=["V","sigma","c","V_prev"])
-        ch=ch[(ch["V_prev"]>0)&(ch["c"]>0)&(ch["sigma"]>=0)]
-        if ch.empty: continue
-        V = ch["V"].to_numpy(dtype=DTYPE)
-        sigma = ch["sigma"].to_numpy(dtype=DTYPE)
-        c = ch["c"].to_numpy(dtype=DTYPE)
-        V_prev = ch["V_prev"].to_numpy(dtype=DTYPE)
-        T=V.size; N+=T
-        Zb   = np.column_stack((np.ones(T), sigma, np.sqrt(c))).astype(DTYPE)
-        m = (V - a0 - a_sig*sigma - a_c*np.sqrt(c))[:,None] * np.column_stack(
-                (Zb,
-                 Zb*sigma[:,None],
-                 Zb*np.log(c+EPS)[:,None],
-                 Zb*np.log(V_prev+EPS)[:,None])
-            )
-        totM += m.sum(axis=0)
-    return totM/N
-
-def gmm2(theta):
-    m=avg_m(theta)
-    return m@W_opt@m
-
-from scipy.optimize import minimize
-theta2 = minimize(gmm2, theta1, method="BFGS").x
-print("step-2 theta =",theta2)
+def cov_fn(theta1):
+    print("step-1 theta =", theta1)
+    S = moment_cov(blocks(), xp.asarray(theta1.astype(DTYPE)))
+    return to_host(S).astype(np.float64)
+
+theta1 = np.linalg.solve(ZX[:3], Zy[:3])          # OLS: (X'X)⁻¹X'y
+res = gmm_from_stats(ZX, Zy, tot, cov_fn, step2=args.step2, theta1=theta1)
+print("step-2 theta =", res.theta)
+print()
+print(res.summary())
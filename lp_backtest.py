@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+lp_backtest.py
+-------------------------------------------------
+Constant-product (x·y=k) LP backtest on the pipeline.py output <pool>.csv
+(blockNumber, price, pool_value, volume, fee), for a whole grid of
+fee tier × entry block × position size × holding horizon at once.
+
+• a position of S (quote) entered at block e holds liquidity ℓ = S / (2√p_e):
+      value  V = S·√(p_x / p_e)          hodl  H = S/2 · (1 + p_x / p_e)
+      IL     = V / H − 1 = 2√r / (1 + r) − 1
+• fee income = its share V_t / pool_value_t of every later block's fees
+      F = φ · S / √p_e · (C_x − C_e),   C_t = Σ_{τ≤t} volume_τ · √p_τ / pool_value_τ
+  → one prefix sum per pool, every scenario is O(1) (no loop over blocks or
+  scenarios)；φ = counterfactual fee tier on the same volume, or the pool's
+  actual fee column
+• the position is small relative to the pool (its own liquidity does not
+  dilute the share) and fees are not reinvested；--gas is a fixed cost per
+  position (entry + exit) in quote units, so size matters for net returns
+
+    python lp_backtest.py USDC_ETH --fee-tiers 5 30 100 --entries 100 --sizes 1e3 1e4 1e5 --horizons 7 30
+    python lp_backtest.py USDC_ETH --entry-block 15000000 --size 10000 --path path.csv
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from pools import BALANCER_POOLS, POOLS, get_balancer_pool, get_pool
+
+CHUNK_ROWS = 1_000_000
+
+
+class LPData:
+    """Per-block arrays of one pool plus the fee prefix sums."""
+
+    def __init__(self, blocks, price, pool_value, volume, fee):
+        self.blocks = np.asarray(blocks, dtype=np.int64)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.sqrt_p = np.sqrt(self.price)
+        pv = np.asarray(pool_value, dtype=np.float64)
+        w = np.where(pv > 0, self.sqrt_p / np.where(pv > 0, pv, 1.0), 0.0)
+        self.c_volume = np.cumsum(np.nan_to_num(np.asarray(volume, dtype=np.float64) * w))
+        self.c_fee = np.cumsum(np.nan_to_num(np.asarray(fee, dtype=np.float64) * w))
+
+    @classmethod
+    def from_csv(cls, path, chunksize=CHUNK_ROWS):
+        cols = ["blockNumber", "price", "pool_value", "volume", "fee"]
+        parts = [c.dropna(subset=["price"]) for c in pd.read_csv(path, usecols=cols, chunksize=chunksize)]
+        df = pd.concat(parts, ignore_index=True)
+        return cls(df["blockNumber"], df["price"], df["pool_value"].astype(np.float64), df["volume"], df["fee"])
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def row(self, blocks):
+        """Row of the last block ≤ each block (clipped to the data)."""
+        idx = np.searchsorted(self.blocks, np.asarray(blocks, dtype=np.int64), side="right") - 1
+        return np.clip(idx, 0, len(self.blocks) - 1)
+
+
+def lp_grid(data, entry_blocks, sizes, fee_tiers=None, horizons=(None,), gas=0.0):
+    """Every combination of fee tier × entry × size × horizon (blocks; None = to the end).
+
+    fee_tiers: fee rates (0.003 = 30 bp) applied to the observed volume; None → the
+    pool's own fee column (fee_tier NaN in the output). Returns one row per scenario.
+    """
+    tiers = [np.nan] if fee_tiers is None else list(fee_tiers)
+    e = data.row(entry_blocks)
+    h = np.array([-1 if x is None else int(x) for x in horizons], dtype=np.int64)
+    x = np.where(h[None, :] < 0, len(data) - 1,
+                 data.row(data.blocks[e][:, None] + np.maximum(h[None, :], 0)))    # (E, H)
+    x = np.maximum(x, e[:, None])
+
+    phi = np.asarray(tiers, dtype=np.float64)[:, None, None, None]                 # (T, 1, 1, 1)
+    S = np.asarray(sizes, dtype=np.float64)[None, None, :, None]                   # (1, 1, S, 1)
+    ee, xx = e[None, :, None, None], x[None, :, None, :]                           # (1, E, 1, 1), (1, E, 1, H)
+
+    r = data.price[xx] / data.price[ee]
+    value = S * np.sqrt(r)
+    hodl = 0.5 * S * (1.0 + r)
+    per_unit = np.where(np.isnan(phi),
+                        data.c_fee[xx] - data.c_fee[ee],
+                        np.nan_to_num(phi) * (data.c_volume[xx] - data.c_volume[ee]))
+    fees = S / data.sqrt_p[ee] * per_unit
+    net = value + fees - gas
+
+    shape = np.broadcast_shapes(phi.shape, ee.shape, S.shape, xx.shape)
+    grid = np.meshgrid(np.arange(len(tiers)), np.arange(len(e)), np.arange(len(sizes)),
+                       np.arange(len(h)), indexing="ij")
+    full = lambda a: np.broadcast_to(a, shape).ravel()
+    return pd.DataFrame({
+        "fee_tier":    np.asarray(tiers, dtype=np.float64)[grid[0].ravel()],
+        "entry_block": data.blocks[e][grid[1].ravel()],
+        "size":        np.asarray(sizes, dtype=np.float64)[grid[2].ravel()],
+        "horizon":     h[grid[3].ravel()],
+        "exit_block":  full(data.blocks[xx]),
+        "price_ratio": full(r),
+        "value":       full(value),
+        "hodl":        full(hodl),
+        "fees":        full(fees),
+        "il":          full(value / hodl - 1.0),
+        "pnl_vs_hodl": full(net - hodl),
+        "net_return":  full(net / S - 1.0),
+    })
+
+
+def lp_path(data, entry_block, size, fee_tier=None):
+    """Per-block value / hodl / cumulative fees / IL of one position from its entry on."""
+    e = int(data.row([entry_block])[0])
+    sl = slice(e, len(data))
+    r = data.price[sl] / data.price[e]
+    c = data.c_fee if fee_tier is None else fee_tier * data.c_volume
+    fees = size / data.sqrt_p[e] * (c[sl] - c[e])
+    value, hodl = size * np.sqrt(r), 0.5 * size * (1.0 + r)
+    return pd.DataFrame({"blockNumber": data.blocks[sl], "price": data.price[sl], "value": value,
+                         "hodl": hodl, "fees": fees, "il": value / hodl - 1.0,
+                         "pnl_vs_hodl": value + fees - hodl})
+
+
+def _pool(name):
+    return get_pool(name) if name in POOLS else get_balancer_pool(name)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Vectorized constant-product LP backtest over a parameter grid")
+    ap.add_argument("pool", help=f"pool name ({', '.join([*POOLS, *BALANCER_POOLS])})")
+    ap.add_argument("--data-dir", default=".", help="directory with the pipeline output <pool>.csv")
+    ap.add_argument("--fee-tiers", type=float, nargs="*", default=None,
+                    help="fee tiers in bp on the observed volume (default / none given: the pool's own fees)")
+    ap.add_argument("--entries", type=int, default=100, help="number of evenly spaced entry blocks")
+    ap.add_argument("--sizes", type=float, nargs="+", default=[1e4], help="position sizes (quote units)")
+    ap.add_argument("--horizons", type=float, nargs="*", default=[],
+                    help="holding periods in days (default: hold to the last block)")
+    ap.add_argument("--gas", type=float, default=0.0, help="fixed cost per position, quote units")
+    ap.add_argument("--out", default=None, help="default: <pool>_lp_grid.csv")
+    ap.add_argument("--entry-block", type=int, default=None, help="with --path: single position")
+    ap.add_argument("--size", type=float, default=1e4)
+    ap.add_argument("--path", default=None, help="write the per-block path of one position")
+    args = ap.parse_args(argv)
+
+    pool = _pool(args.pool)
+    start = time.perf_counter()
+    data = LPData.from_csv(os.path.join(args.data_dir, pool.output_file))
+    loaded = time.perf_counter()
+
+    if args.path:
+        entry = data.blocks[0] if args.entry_block is None else args.entry_block
+        tier = None if not args.fee_tiers else args.fee_tiers[0] / 10_000
+        lp_path(data, entry, args.size, tier).to_csv(args.path, index=False)
+        print(f"✅ {args.path}  ({len(data) - int(data.row([entry])[0]):,} blocks)")
+        return
+
+    entries = data.blocks[np.linspace(0, len(data) - 1, args.entries).astype(np.int64)]
+    tiers = [t / 10_000 for t in args.fee_tiers] if args.fee_tiers else None   # bare --fee-tiers = own fees
+    horizons = [int(d * pool.rv_window) for d in args.horizons] or [None]
+    grid = lp_grid(data, entries, args.sizes, tiers, horizons, args.gas)
+    out = args.out or f"{pool.name}_lp_grid.csv"
+    grid.to_csv(out, index=False)
+    print(f"✅ {out}  {len(grid):,} scenarios over {len(data):,} blocks  "
+          f"(load {loaded - start:.1f} s, grid {time.perf_counter() - loaded:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
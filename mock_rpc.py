@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+mock_rpc.py
+-------------------------------------------------
+Local JSON-RPC stand-in (eth_blockNumber, eth_getLogs, eth_getBlockByNumber) to
+exercise fetch_logs.py and block_time.py.
+
+• logs are a deterministic function of the block number: a few blocks are
+  very busy, most are quiet → both range splitting and widening get used
+• provider limits like Infura / BSC nodes: more than --max-results logs →
+  -32005 "query returned more than N results"; more than --max-range blocks →
+  "exceed maximum block range"；--fail-rate 隨機回 HTTP 500 / rate-limit error
+• expected_logs(address, lo, hi) gives what a correct fetcher must write
+
+    python mock_rpc.py --port 8545 --head 1000000 &
+    python fetch_logs.py USDC_ETH --from-block 0 --to-block 200000 --rpc-url http://127.0.0.1:8545
+"""
+
+import argparse
+import random
+
+from aiohttp import web
+
+from fetch_logs import EVENTS, TOPICS
+
+_TOPIC_OF = {name: "0x" + t for t, name in TOPICS.items()}
+_KINDS = list(EVENTS)
+
+
+def _mix(*xs):
+    h = 0x9E3779B97F4A7C15
+    for x in xs:
+        h = ((h ^ x) * 0xBF58476D1CE4E5B9 + 0x94D049BB133111EB) & (2**64 - 1)
+        h ^= h >> 31
+    return h
+
+
+def logs_in_block(address, b):
+    """Deterministic logs of one block: (kind, [uint fields])."""
+    busy = _mix(b // 1000) % 20 == 0                         # 5% of 1000-block stretches are busy
+    n = _mix(b, 1) % (40 if busy else 3) if _mix(b, 2) % (1 if busy else 25) == 0 else 0
+    out = []
+    for i in range(n):
+        kind = _KINDS[_mix(b, i, 3) % len(_KINDS)]
+        bits = 112 if kind == "sync" else 200
+        vals = [_mix(b, i, j, 4) * _mix(b, i, j, 5) * _mix(b, i, j, 6) % 2**bits
+                for j in range(len(EVENTS[kind][1]))]
+        out.append((kind, vals))
+    return out
+
+
+def block_timestamp(b):
+    """Unix time of block b: 13–15 s blocks, then 12 s after block 500_000 (like the Merge)."""
+    merge = 500_000
+    t = 1_600_000_000 + 14 * min(b, merge) + (b * 7919 % 3 - 1 if 0 < b < merge else 0)
+    return t + 12 * max(b - merge, 0)
+
+
+def expected_logs(address, lo, hi):
+    """{kind: [(block, [values…])]} for blocks lo..hi, in (block, logIndex) order."""
+    out = {k: [] for k in EVENTS}
+    for b in range(lo, hi + 1):
+        for kind, vals in logs_in_block(address, b):
+            out[kind].append((b, vals))
+    return out
+
+
+def _rpc_log(address, b, i, kind, vals):
+    return {"address": address, "blockNumber": hex(b), "logIndex": hex(i),
+            "topics": [_TOPIC_OF[kind], "0x" + "00" * 32],
+            "data": "0x" + "".join(f"{v:064x}" for v in vals),
+            "transactionHash": "0x" + f"{_mix(b, i):064x}", "removed": False}
+
+
+def make_app(head=1_000_000, max_results=10_000, max_range=5_000, fail_rate=0.0, seed=0):
+    rng = random.Random(seed)
+    stats = {"calls": 0, "too_many": 0, "failed": 0}
+
+    def error(req_id, code, message):
+        return web.json_response({"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}})
+
+    async def handle(request):
+        body = await request.json()
+        req_id, method, params = body.get("id"), body.get("method"), body.get("params", [])
+        stats["calls"] += 1
+        if fail_rate and rng.random() < fail_rate:
+            stats["failed"] += 1
+            if rng.random() < 0.5:
+                return web.Response(status=500, text="upstream error")
+            return error(req_id, -32005, "daily request count exceeded, request rate limited")
+
+        if method == "eth_blockNumber":
+            return web.json_response({"jsonrpc": "2.0", "id": req_id, "result": hex(head)})
+        if method == "eth_getBlockByNumber":
+            b = int(params[0], 16)
+            return web.json_response({"jsonrpc": "2.0", "id": req_id,
+                                      "result": {"number": hex(b), "timestamp": hex(block_timestamp(b))}})
+        if method != "eth_getLogs":
+            return error(req_id, -32601, f"the method {method} does not exist/is not available")
+
+        flt = params[0]
+        lo, hi = int(flt["fromBlock"], 16), min(int(flt["toBlock"], 16), head)
+        if hi - lo + 1 > max_range:
+            stats["too_many"] += 1
+            return error(req_id, -32000, f"exceed maximum block range: {max_range}")
+        wanted = set(flt.get("topics", [[]])[0] or _TOPIC_OF.values())
+        result = []
+        for b in range(lo, hi + 1):
+            for i, (kind, vals) in enumerate(logs_in_block(flt["address"], b)):
+                if _TOPIC_OF[kind] in wanted:
+                    result.append(_rpc_log(flt["address"], b, i, kind, vals))
+            if len(result) > max_results:
+                stats["too_many"] += 1
+                return error(req_id, -32005, f"query returned more than {max_results} results")
+        return web.json_response({"jsonrpc": "2.0", "id": req_id, "result": result})
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/", handle)
+    return app
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Mock JSON-RPC node for eth_getLogs")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8545)
+    ap.add_argument("--head", type=int, default=1_000_000, help="latest block number")
+    ap.add_argument("--max-results", type=int, default=10_000)
+    ap.add_argument("--max-range", type=int, default=5_000)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args(argv)
+    web.run_app(make_app(args.head, args.max_results, args.max_range, args.fail_rate),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
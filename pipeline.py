@@ -0,0 +1,652 @@
+#!/usr/bin/env python
+"""
+pipeline.py
+-------------------------------------------------
+Per-block pool features (price, pool_value, RV, volume, fee) for any pool
+in pools.POOLS — replaces preprocess_token0.py / preprocess_token1.py.
+
+• numeraire (USD、或 ETH/WBNB) 那一邊叫 quote，另一邊叫 base
+  price = quote / base，pool_value 以 quote 計
+• decimals、fee、RV 視窗 (1 天的區塊數) 都從 pool registry 來
+• amounts / reserves stay exact uint256 limbs (wideint.py) through the swap
+  classification and netIn = amountIn × (10000 − fee bps) / 10000; only the
+  final ÷ 10**decimals rounds (correctly) to float
+• reserve state = sparse change-point table (blocks with a Sync); any block's
+  value is found with searchsorted, the per-block table is only built chunk by
+  chunk while writing it out
+• --chunk-rows：Swap / Sync 也一段一段讀（整個區塊為單位），只帶著最後一個
+  change point 與 RV 視窗進下一段 → 記憶體只跟 chunk 大小有關，輸出與一次讀完相同
+• --shards：區塊範圍切成 N 段給 N 個 process，每段先重算 W–2W 個區塊的 halo
+  (RV 視窗 + 前一個 Sync 的 reserve)，各自寫 part 檔再依序接起來；需要
+  event_cache（沒有就先建），輸出與單核相同
+
+    python pipeline.py USDC_ETH                # one pool
+    python pipeline.py --all --jobs 5          # every registered pool, in parallel
+    python pipeline.py USDC_ETH --sparse       # only blocks with a Sync / Swap
+    python pipeline.py --all --incremental     # daily refresh: only blocks past the checkpoint
+    python pipeline.py USDC_ETH --chunk-rows 2000000   # out-of-core for full-history pools
+    python pipeline.py USDC_ETH --shards 8     # one pool on 8 cores
+    python pipeline.py USDC_ETH --profile prof # stage timings / memory → prof/USDC_ETH.profile.json
+"""
+
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import profiling
+import wideint
+from event_cache import frame_to_table, ingest, is_fresh, iter_table, load_table
+from pools import POOLS, get_pool
+from rv import RollingRV
+
+
+# ============================================================
+# 1‧ 讀檔
+# ============================================================
+def load_events(swap_file, sync_file):
+    """Swap / Sync tables {column: array} with exact integer amounts.
+
+    uint256 columns are (N, 4) uint64 limbs (wideint.py); they come straight
+    from the memory-mapped columnar cache (event_cache.py) when it is fresh,
+    otherwise the CSVs are parsed.
+    """
+    return load_table(swap_file), load_table(sync_file)
+
+
+def to_units(col, decimals):
+    """Integer amounts (limbs or an int column) → human units, correctly rounded.
+
+    Same float as Python's int / 10**decimals for every value, so the result
+    does not depend on how the column was stored or which rows were read
+    together.
+    """
+    return wideint.to_float(wideint.from_column(col), 10**decimals)
+
+
+# ============================================================
+# 2‧ reserves → sparse change points（只存有 Sync 的區塊）
+# ============================================================
+def reserve_changes(syncs, pool):
+    """Last Sync of every block that has one → blockNumber, price, pool_value.
+
+    This table *is* the reserve state: the value at any block b is the row of
+    the last change point ≤ b (state_index), so no per-block frame is built.
+    """
+    blk = syncs["blockNumber"]
+    order = np.argsort(blk, kind="stable")
+    sorted_blk = blk[order]
+    last = order[np.flatnonzero(np.r_[sorted_blk[1:] != sorted_blk[:-1], len(blk) > 0])]
+
+    # 人類單位 → quote / base
+    r0_h = to_units(syncs["reserve0"][last], pool.dec0)
+    r1_h = to_units(syncs["reserve1"][last], pool.dec1)
+    rq_h, rb_h = (r0_h, r1_h) if pool.numeraire == 0 else (r1_h, r0_h)
+
+    price = rq_h / rb_h
+    return pd.DataFrame({"blockNumber": blk[last].astype(np.int64), "price": price,
+                         "pool_value": pd.Series(rq_h + rb_h * price).apply(int)})
+
+
+def state_index(change_blocks, blocks):
+    """Row of the last change point ≤ each block (-1 before the first one)."""
+    return np.searchsorted(change_blocks, blocks, side="right") - 1
+
+
+def price_at(changes, blocks):
+    """Mid-price at each block; NaN outside [first, last] change point."""
+    cb = changes["blockNumber"].to_numpy(dtype=np.int64)
+    blocks = np.asarray(blocks, dtype=np.int64)
+    idx = state_index(cb, blocks)
+    out = changes["price"].to_numpy()[np.maximum(idx, 0)]
+    out[(idx < 0) | (blocks > cb[-1])] = np.nan
+    return out
+
+
+# ============================================================
+# 3‧ Swap 分類 → 每筆 price / volume / fee → 區塊聚合
+# ============================================================
+def block_volume(swaps, changes, pool):
+    fee_rate = pool.fee_rate
+    amounts = {c: wideint.from_column(swaps[c])
+               for c in ("amount0In", "amount1In", "amount0Out", "amount1Out")}
+    nz = {c: ~wideint.is_zero(a) for c, a in amounts.items()}
+
+    sell0 = nz["amount0In"] & nz["amount1Out"] & ~nz["amount0Out"] & ~nz["amount1In"]
+    sell1 = nz["amount1In"] & nz["amount0Out"] & ~nz["amount1Out"] & ~nz["amount0In"]
+    valid = sell0 | sell1
+    blk = np.asarray(swaps["blockNumber"], dtype=np.int64)
+
+    # 人類單位；netIn = amountIn × (10000 − fee_bps) / 10000 在整數上算完才轉 float
+    amt = {}
+    keep = 10_000 - pool.fee_bps
+    for side, dec in ((0, pool.dec0), (1, pool.dec1)):
+        a_in = amounts[f"amount{side}In"][valid]
+        amt[f"in{side}"]    = wideint.to_float(a_in, 10**dec)
+        amt[f"out{side}"]   = wideint.to_float(amounts[f"amount{side}Out"][valid], 10**dec)
+        amt[f"netIn{side}"] = wideint.to_float(wideint.mul_const(a_in, keep), 10_000 * 10**dec)
+    q, b = pool.numeraire, 1 - pool.numeraire
+
+    # 賣 quote（付 quote、收 base） vs 賣 base（付 base、收 quote）
+    sell_q = (sell0 if q == 0 else sell1)[valid]
+
+    # price = quote / base，付出的一方取手續費後淨額
+    num = np.where(sell_q, amt[f"netIn{q}"], amt[f"out{q}"])
+    den = np.where(sell_q, amt[f"out{b}"], amt[f"netIn{b}"])
+    den = np.where(den == 0, np.nan, den)
+    price = num / den
+
+    # 算不出來 → 補池子 mid-price（searchsorted 查 change point）
+    nan_idx = np.isnan(price)
+    if nan_idx.any():
+        price[nan_idx] = price_at(changes, blk[valid][nan_idx])
+
+    # 成交量以 quote 計：賣 quote → quote 投入量；賣 base → base 投入量 × price
+    volume = np.where(sell_q, amt[f"in{q}"], amt[f"in{b}"] * price)
+    valid_swaps = pd.DataFrame({"blockNumber": blk[valid], "volume": volume, "fee": volume * fee_rate})
+
+    # flash / dust → volume、fee 歸零
+    other_swaps = pd.DataFrame({"blockNumber": blk[~valid], "volume": 0, "fee": 0})
+
+    return (pd.concat([valid_swaps, other_swaps], ignore_index=True)
+              .groupby("blockNumber", as_index=False)[["volume", "fee"]]
+              .sum())
+
+
+# ============================================================
+# 4‧ 輸出：一次一段區塊，RV 狀態跨段延續
+# ============================================================
+CHUNK_BLOCKS = 1_000_000
+
+
+def block_frames(changes, swaps_blk, pool, dense=True, chunk_blocks=CHUNK_BLOCKS,
+                 start=None, rv=None, stop=None):
+    """Output rows for [first, last] change block, one block range at a time.
+
+    dense=True → one row per block (the old per-block table)；dense=False →
+    only blocks with a Sync or a Swap, with the same values as their dense rows.
+    start / rv resume a previous run: rows begin at block `start` and the
+    RollingRV `rv` must hold the state after block start-1. stop ends the
+    rows before that block instead of after the last change (shards).
+    """
+    cb  = changes["blockNumber"].to_numpy(dtype=np.int64)
+    cp  = changes["price"].to_numpy(dtype=np.float64)
+    cpv = changes["pool_value"].to_numpy()
+    sb  = swaps_blk["blockNumber"].to_numpy(dtype=np.int64)
+    sv  = swaps_blk["volume"].to_numpy(dtype=np.float64)
+    sf  = swaps_blk["fee"].to_numpy(dtype=np.float64)
+
+    first_blk, last_blk = int(cb[0]), int(cb[-1]) if stop is None else int(stop) - 1
+    start = first_blk if start is None else int(start)
+    rv = RollingRV(pool.rv_window) if rv is None else rv
+    prev_price = cp[state_index(cb, start - 1)] if start > first_blk else np.nan   # price of block lo-1
+    for lo in range(start, last_blk + 1, chunk_blocks):
+        hi = min(lo + chunk_blocks, last_blk + 1)
+        with profiling.stage("fill") as st:
+            blocks = np.arange(lo, hi, dtype=np.int64)
+            idx = state_index(cb, blocks)
+            price = cp[idx]
+            st.rows = hi - lo
+
+        # log return 用 forward-filled price（沒有 Sync 的區塊 = 0）
+        with profiling.stage("rv") as st:
+            log_return = np.log(price / np.r_[prev_price, price[:-1]])
+            prev_price = price[-1]
+            RV = rv.update(log_return)
+            st.rows = hi - lo
+
+        with profiling.stage("aggregate") as st:
+            s_lo, s_hi = np.searchsorted(sb, [lo, hi])
+            volume, fee = np.zeros(hi - lo), np.zeros(hi - lo)
+            volume[sb[s_lo:s_hi] - lo] = sv[s_lo:s_hi]
+            fee[sb[s_lo:s_hi] - lo]    = sf[s_lo:s_hi]
+
+            if dense:
+                keep = slice(None)
+            else:
+                c_lo, c_hi = np.searchsorted(cb, [lo, hi])
+                keep = np.union1d(cb[c_lo:c_hi], sb[s_lo:s_hi]) - lo
+            frame = pd.DataFrame({"blockNumber": blocks[keep], "price": price[keep],
+                                  "pool_value": cpv[idx[keep]], "RV": RV[keep],
+                                  "volume": volume[keep], "fee": fee[keep]})
+            st.rows = len(frame)
+        yield frame
+
+
+# ============================================================
+# 5‧ out-of-core：事件一段一段讀，狀態跨段延續
+# ============================================================
+def block_aligned(chunks):
+    """Re-cut row chunks of a table so no block is split across two chunks (file order kept)."""
+    held, prev_top = None, None
+    for t in chunks:
+        blk = t["blockNumber"]
+        if not len(blk):
+            continue
+        if prev_top is not None and blk.min() < prev_top:
+            raise ValueError("events are not sorted by blockNumber; run without --chunk-rows")
+        if held is not None:
+            t = {c: np.concatenate([held[c], a]) for c, a in t.items()}
+            blk = t["blockNumber"]
+        prev_top = blk.max()
+        last = blk == prev_top
+        if not last.all():
+            yield {c: a[~last] for c, a in t.items()}
+        held = {c: a[last] for c, a in t.items()}
+    if held is not None:
+        yield held
+
+
+def _timed(chunks, name):
+    it = iter(chunks)
+    while True:
+        with profiling.stage(name) as st:
+            t = next(it, None)
+            st.rows = 0 if t is None else len(t["blockNumber"])
+        if t is None:
+            return
+        yield t
+
+
+def stream_frames(swap_chunks, sync_chunks, pool, dense=True, last=None, start=None, rv=None):
+    """Same rows as block_frames on the whole files, from row chunks of both tables.
+
+    Every Sync chunk (whole blocks only) becomes change points, the Swaps up to
+    its last block are classified against them, and its block range is written;
+    only the last change point, the RollingRV window and at most one chunk of
+    Swaps are carried to the next one. last / start / rv resume like
+    block_frames.
+    """
+    rv = RollingRV(pool.rv_window) if rv is None else rv
+    swaps_iter = block_aligned(swap_chunks)
+    pending = None
+    for syncs in block_aligned(sync_chunks):
+        with profiling.stage("reserves") as st:
+            changes = reserve_changes(syncs, pool)
+            if last is not None:
+                changes = pd.concat([last, changes], ignore_index=True)
+            st.rows = len(syncs["blockNumber"])
+        top = int(changes["blockNumber"].iloc[-1])
+
+        # Swaps up to the last block of this Sync chunk; later ones wait for the next chunk
+        parts = []
+        while True:
+            if pending is None:
+                pending = next(swaps_iter, None)
+                if pending is None:
+                    break
+            now = pending["blockNumber"] <= top
+            if now.all():
+                parts.append(pending)
+                pending = None
+                continue
+            parts.append({c: a[now] for c, a in pending.items()})
+            pending = {c: a[~now] for c, a in pending.items()}
+            break
+
+        with profiling.stage("classify") as st:
+            if parts:
+                swaps = {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+                swaps_blk = block_volume(swaps, changes, pool)
+                st.rows = len(swaps["blockNumber"])
+            else:
+                swaps_blk = pd.DataFrame({"blockNumber": np.empty(0, dtype=np.int64),
+                                          "volume": np.empty(0), "fee": np.empty(0)})
+        yield from block_frames(changes, swaps_blk, pool, dense=dense, start=start, rv=rv)
+        last, start = changes.iloc[[-1]].reset_index(drop=True), top + 1
+
+
+# ============================================================
+# 6‧ 多核：區塊範圍切成 shard，每個 shard 帶 halo 自己算
+# ============================================================
+def shard_ranges(first_blk, last_blk, shards):
+    """[lo, hi) block ranges covering first_blk..last_blk in `shards` near-equal parts."""
+    edges = np.linspace(first_blk, last_blk + 1, shards + 1).round().astype(np.int64)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def halo_start(lo, first_blk, window):
+    """First block a shard starting at `lo` has to replay.
+
+    RV at lo needs the W-1 blocks before it, and RollingRV sums whole
+    W-block segments of a grid anchored at first_blk, so the halo starts on
+    the segment before lo's: W to 2W blocks, same floats as the serial run.
+    """
+    return first_blk + max((lo - first_blk) // window - 1, 0) * window
+
+
+def halo_frames(swaps, syncs, pool, lo, first_blk, dense=True, hi=None):
+    """Output rows of blocks [lo, hi) (hi=None → last change), same as the serial run.
+
+    syncs must start at the whole block of the last Sync before
+    halo_start(lo) (the ffilled reserve state; at first_blk if there is
+    none) and swaps at lo; the halo is replayed for RV and not written.
+    """
+    halo = halo_start(lo, first_blk, pool.rv_window)
+    with profiling.stage("reserves") as st:
+        changes = reserve_changes(syncs, pool)
+        st.rows = len(syncs["blockNumber"])
+    with profiling.stage("classify") as st:
+        swaps_blk = block_volume(swaps, changes, pool)
+        st.rows = len(swaps["blockNumber"])
+
+    rv = RollingRV(pool.rv_window)
+    rv.state = (np.full(pool.rv_window, np.nan), halo - first_blk - pool.rv_window)
+    for frame in block_frames(changes, swaps_blk, pool, dense=dense, start=halo, rv=rv, stop=hi):
+        if len(frame) and frame["blockNumber"].iat[0] < lo:                 # halo rows
+            frame = frame[frame["blockNumber"].to_numpy() >= lo]
+        yield frame
+
+
+def _rows(table, i0, i1):
+    return {c: np.asarray(a[i0:i1]) for c, a in table.items()}
+
+
+def preprocess_shard(pool, swap_file, sync_file, part, lo, hi, first_blk, dense, header):
+    """Rows of blocks [lo, hi) → `part` (CSV without header unless header=True); returns #rows.
+
+    Reads only its own rows from the memory-mapped cache: Syncs from the
+    halo on (plus the whole block of the last Sync before it) and Swaps of
+    [lo, hi).
+    """
+    if isinstance(pool, str):
+        pool = get_pool(pool)
+    with profiling.run(f"{pool.name}_{lo}"):
+        halo = halo_start(lo, first_blk, pool.rv_window)
+        with profiling.stage("load") as st:
+            swaps, syncs = load_events(swap_file, sync_file)
+            sblk = syncs["blockNumber"]
+            i0, i1 = np.searchsorted(sblk, [halo, hi])
+            if i0:
+                i0 = np.searchsorted(sblk, sblk[i0 - 1])
+            j0, j1 = np.searchsorted(swaps["blockNumber"], [lo, hi])
+            swaps, syncs = _rows(swaps, j0, j1), _rows(syncs, i0, i1)
+            st.rows = (j1 - j0) + (i1 - i0)
+
+        rows = 0
+        with open(part, "w", newline="") as f:
+            for frame in halo_frames(swaps, syncs, pool, lo, first_blk, dense=dense, hi=hi):
+                with profiling.stage("write") as st:
+                    frame.to_csv(f, header=header, index=False)
+                    header, rows = False, rows + len(frame)
+                    st.rows = len(frame)
+    return rows
+
+
+def _preprocess_sharded(pool, swap_file, sync_file, output, dense, shards):
+    """Run preprocess_shard on `shards` processes and stitch the parts in block order."""
+    for path in (swap_file, sync_file):                        # shards need random access
+        if not is_fresh(path):
+            with profiling.stage("ingest"):
+                ingest(path)
+    swaps, syncs = load_events(swap_file, sync_file)
+    for blk in (swaps["blockNumber"], syncs["blockNumber"]):
+        if (np.diff(blk) < 0).any():
+            raise ValueError("events are not sorted by blockNumber; run without --shards")
+    sblk = syncs["blockNumber"]
+    if not len(sblk):
+        return None
+    first_blk, last_blk = int(sblk[0]), int(sblk[-1])
+    del swaps, syncs, sblk
+
+    ranges = shard_ranges(first_blk, last_blk, shards)
+    parts = [f"{output}.part{k}" for k in range(len(ranges))]
+    try:
+        with profiling.stage("shards"):
+            with ProcessPoolExecutor(max_workers=len(ranges)) as ex:
+                futs = [ex.submit(preprocess_shard, pool.name, swap_file, sync_file, part, lo, hi,
+                                  first_blk, dense, k == 0)
+                        for k, (part, (lo, hi)) in enumerate(zip(parts, ranges))]
+                rows = sum(f.result() for f in futs)
+        with profiling.stage("stitch"):
+            with open(output, "wb") as out:
+                for part in parts:
+                    with open(part, "rb") as f:
+                        shutil.copyfileobj(f, out, 1 << 24)
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+    return rows
+
+
+def _write_frames(frames, output, mode="w"):
+    rows = 0
+    for frame in frames:
+        with profiling.stage("write") as st:
+            frame.to_csv(output, mode=mode, header=(mode == "w"), index=False)
+            mode, rows = "a", rows + len(frame)
+            st.rows = len(frame)
+    return rows
+
+
+def preprocess_pool(pool, data_dir=".", out_dir=None, dense=True, incremental=False, chunk_rows=0,
+                    shards=1):
+    """Run the whole pipeline for one pool; returns (pool name, rows, seconds).
+
+    incremental=True → continue from the pool's checkpoint (only blocks past
+    it are processed; the output is cut back to it and appended), then write
+    a new checkpoint.
+    chunk_rows > 0 → out-of-core: events are read chunk_rows at a time
+    (stream_frames), same output as loading the whole files.
+    shards > 1 → the block range is split over that many processes
+    (preprocess_shard), same output as the serial run.
+    """
+    if isinstance(pool, str):
+        pool = get_pool(pool)
+    with profiling.run(pool.name):
+        return _preprocess_pool(pool, data_dir, out_dir, dense, incremental, chunk_rows, shards)
+
+
+def _preprocess_pool(pool, data_dir, out_dir, dense, incremental, chunk_rows=0, shards=1):
+    out_dir = data_dir if out_dir is None else out_dir
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    swap_file = os.path.join(data_dir, pool.swap_file)
+    sync_file = os.path.join(data_dir, pool.sync_file)
+    output    = os.path.join(out_dir, pool.output_file)
+    ckpt_file = os.path.join(out_dir, pool.checkpoint_file)
+
+    ckpt = load_checkpoint(ckpt_file) if incremental else None
+    if ckpt is not None and not checkpoint_matches(ckpt, pool, swap_file, sync_file, output, dense):
+        ckpt = None
+    if ckpt is not None:
+        with profiling.stage("load") as st:
+            swaps = read_tail(swap_file, ckpt["swap_offset"])
+            syncs = read_tail(sync_file, ckpt["sync_offset"])
+            st.rows = len(swaps["blockNumber"]) + len(syncs["blockNumber"])
+        if ((swaps["blockNumber"] < ckpt["resume_block"]).any()
+                or (syncs["blockNumber"] < ckpt["sync_block"]).any()):
+            print(f"⚠️ {pool.name}: rows before the checkpoint were appended → full rebuild")
+            ckpt = None
+
+    if ckpt is not None:                                      # 只重算 checkpoint 之後（含 halo）
+        with open(output, "r+b") as f:
+            f.truncate(ckpt["output_offset"])
+        rows = _write_frames(halo_frames(swaps, syncs, pool, ckpt["resume_block"], ckpt["first_block"],
+                                         dense=dense), output, mode="a")
+        del swaps, syncs
+    else:
+        rows = None                                           # 從頭算，切 shard 平行（沒有 Sync → 單核）
+        if shards > 1:
+            rows = _preprocess_sharded(pool, swap_file, sync_file, output, dense, shards)
+        if rows is None and chunk_rows:                       # 從頭算，一段一段讀
+            rows = _write_frames(stream_frames(_timed(iter_table(swap_file, chunk_rows), "load"),
+                                               _timed(iter_table(sync_file, chunk_rows), "load"),
+                                               pool, dense=dense), output)
+        elif rows is None:                                    # 從頭算
+            with profiling.stage("load") as st:
+                swaps, syncs = load_events(swap_file, sync_file)
+                st.rows = len(swaps["blockNumber"]) + len(syncs["blockNumber"])
+            with profiling.stage("reserves") as st:
+                changes = reserve_changes(syncs, pool)
+                st.rows = len(syncs["blockNumber"])
+            with profiling.stage("classify") as st:
+                swaps_blk = block_volume(swaps, changes, pool)
+                st.rows = len(swaps["blockNumber"])
+            del swaps, syncs
+            rows = _write_frames(block_frames(changes, swaps_blk, pool, dense=dense), output)
+
+    if incremental:
+        with profiling.stage("checkpoint"):
+            save_checkpoint(ckpt_file, pool, swap_file, sync_file, output, dense)
+    return pool.name, rows, time.perf_counter() - start
+
+
+# ============================================================
+# 7‧ checkpoint：增量模式（fetcher 只會往 CSV 後面追加）
+# ============================================================
+def _row_end(path, last_blk, step=1 << 16):
+    """(byte offset just past the last row with blockNumber ≤ last_blk, its blockNumber).
+
+    Fetcher CSVs are appended in block order, so this only reads the tail;
+    (end of header, None) if there is no such row.
+    """
+    with open(path, "rb") as f:
+        header_end = len(f.readline())
+        end = pos = f.seek(0, os.SEEK_END)
+        buf, e = b"", end                      # e = absolute end of the line being checked
+        while e > header_end:
+            s = buf.rfind(b"\n", 0, e - pos - 1)
+            if s < 0 and pos > header_end:     # line starts before buf → read further back
+                n = min(step, pos - header_end)
+                pos -= n
+                f.seek(pos)
+                buf = f.read(n) + buf
+                continue
+            line_start = pos + s + 1
+            line = buf[line_start - pos:e - pos].strip()
+            if line and int(line.split(b",", 1)[0]) <= last_blk:
+                return e, int(line.split(b",", 1)[0])
+            e = line_start
+        return header_end, None
+
+
+def resume_offset(path, last_blk):
+    """Byte offset just past the last row with blockNumber ≤ last_blk."""
+    return _row_end(path, last_blk)[0]
+
+
+def read_tail(path, offset):
+    """Rows from byte `offset` on, as the same kind of table as load_events."""
+    header = pd.read_csv(path, nrows=0).columns
+    if offset >= os.path.getsize(path):
+        return frame_to_table(pd.DataFrame({c: np.empty(0, dtype=np.int64) for c in header}))
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return frame_to_table(pd.read_csv(f, names=header, header=None, converters={c: int for c in header}))
+
+
+def save_checkpoint(path, pool, swap_file, sync_file, output, dense):
+    """Where a later run resumes: the block and the byte offsets of every file there.
+
+    The two fetchers stop at different heights and the last block of each
+    file may still be incomplete, so the resume block is the last block of
+    the shorter file — every block before it is complete in both. Nothing
+    else is stored: the next run re-reads the Syncs from the RV halo before
+    it (halo_frames), and cuts the output back to it.
+    """
+    swap_last = _row_end(swap_file, np.inf)[1]
+    sync_last = _row_end(sync_file, np.inf)[1]
+    with open(sync_file, "rb") as f:
+        f.readline()
+        line = f.readline().strip()
+    if swap_last is None or sync_last is None or not line:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    first_blk = int(line.split(b",", 1)[0])
+    resume_blk = min(swap_last, sync_last)
+    if resume_blk <= first_blk:                # nothing complete yet → next run is a full one
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    halo = halo_start(resume_blk, first_blk, pool.rv_window)
+    sync_blk = _row_end(sync_file, halo - 1)[1]                 # last Sync before the halo (ffill state)
+    sync_blk = first_blk if sync_blk is None else sync_blk
+    tmp = path + ".tmp.npz"
+    np.savez(tmp,
+             first_block=first_blk,
+             resume_block=resume_blk,
+             sync_block=sync_blk,
+             rv_window=pool.rv_window,
+             swap_offset=resume_offset(swap_file, resume_blk - 1),
+             sync_offset=resume_offset(sync_file, sync_blk - 1),
+             output_offset=resume_offset(output, resume_blk - 1),
+             dense=dense)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        if "resume_block" not in z.files:      # older checkpoint format → full rebuild
+            return None
+        return {"first_block":   int(z["first_block"]),
+                "resume_block":  int(z["resume_block"]),
+                "sync_block":    int(z["sync_block"]),
+                "rv_window":     int(z["rv_window"]),
+                "swap_offset":   int(z["swap_offset"]),
+                "sync_offset":   int(z["sync_offset"]),
+                "output_offset": int(z["output_offset"]),
+                "dense":         bool(z["dense"])}
+
+
+def checkpoint_matches(ckpt, pool, swap_file, sync_file, output, dense):
+    """Checkpoint still describes these files (else: full rebuild)."""
+    return (ckpt["rv_window"] == pool.rv_window and ckpt["dense"] == dense
+            and os.path.exists(output) and os.path.getsize(output) >= ckpt["output_offset"]
+            and os.path.getsize(swap_file) >= ckpt["swap_offset"]
+            and os.path.getsize(sync_file) >= ckpt["sync_offset"])
+
+
+# ============================================================
+# 8‧ CLI：多個 pool 平行跑
+# ============================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-block pool features for registered pools")
+    ap.add_argument("pools", nargs="*", help=f"pool names ({', '.join(POOLS)})")
+    ap.add_argument("--all", action="store_true", help="process every registered pool")
+    ap.add_argument("--jobs", type=int, default=0, help="worker processes (0 = one per pool, up to #cores)")
+    ap.add_argument("--data-dir", default=".", help="directory with <pool>_swaps.csv / <pool>_syncs.csv")
+    ap.add_argument("--out-dir", default=None, help="output directory (default: --data-dir)")
+    ap.add_argument("--sparse", action="store_true",
+                    help="only write blocks with a Sync or Swap (default: one row per block)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="append blocks past the pool's checkpoint (full run + checkpoint if none)")
+    ap.add_argument("--chunk-rows", type=int, default=0,
+                    help="out-of-core: read events N rows at a time (memory bounded by N; 0 = whole files)")
+    ap.add_argument("--shards", type=int, default=1,
+                    help="split each pool's block range over N processes (pools then run one after another)")
+    profiling.add_argument(ap)
+    args = ap.parse_args(argv)
+    profiling.apply(args)
+
+    names = list(POOLS) if args.all else args.pools
+    if not names:
+        ap.error("give pool names or --all")
+    for name in names:
+        get_pool(name)
+
+    jobs = args.jobs or min(len(names), os.cpu_count() or 1)
+    opts = (args.data_dir, args.out_dir, not args.sparse, args.incremental, args.chunk_rows, args.shards)
+    if jobs == 1 or len(names) == 1 or args.shards > 1:
+        results = [preprocess_pool(n, *opts) for n in names]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            futs = [ex.submit(preprocess_pool, n, *opts) for n in names]
+            results = [f.result() for f in as_completed(futs)]
+
+    for name, rows, secs in sorted(results):
+        print(f"✅ {name:10}  rows = {rows:,}  ({secs:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
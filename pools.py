@@ -0,0 +1,125 @@
+"""
+pools.py
+-------------------------------------------------
+Pool registry for the preprocessing pipeline.
+
+• 每個 pool：地址、鏈、token0/token1、decimals、numeraire 在哪一邊、fee (bps)
+• block time 由鏈決定（RV 的 1 天視窗 = 86400 / block_time 個區塊）
+• 新增 pool 只要在 POOLS 加一筆
+• Balancer V2 weighted pools (BALANCER_POOLS): same fields plus poolId, token
+  addresses and weights; every pool sits behind the one Vault address
+"""
+
+from dataclasses import dataclass
+
+# seconds per block
+CHAINS = {
+    "ethereum": {"block_time": 12.0},
+    "bsc":      {"block_time": 3.0},
+}
+
+
+@dataclass(frozen=True)
+class Pool:
+    name: str
+    address: str
+    chain: str
+    token0: str
+    token1: str
+    dec0: int
+    dec1: int
+    numeraire: int          # 0 → price = token0 / token1,  1 → price = token1 / token0
+    fee_bps: int
+
+    @property
+    def fee_rate(self):
+        return self.fee_bps / 10_000
+
+    @property
+    def block_time(self):
+        return CHAINS[self.chain]["block_time"]
+
+    @property
+    def rv_window(self):
+        """Number of blocks in one day."""
+        return int(86400 // self.block_time)
+
+    @property
+    def swap_file(self):
+        return f"{self.name}_swaps.csv"
+
+    @property
+    def sync_file(self):
+        return f"{self.name}_syncs.csv"
+
+    @property
+    def mint_file(self):
+        return f"{self.name}_mints.csv"
+
+    @property
+    def burn_file(self):
+        return f"{self.name}_burns.csv"
+
+    @property
+    def output_file(self):
+        return f"{self.name}.csv"
+
+    @property
+    def checkpoint_file(self):
+        return f"{self.name}.ckpt.npz"
+
+
+POOLS = {p.name: p for p in [
+    # ---- Uniswap V2 (30 bp) ----
+    Pool("ETH_USDT",  "0x0d4a11d5EEaaC28EC3F61d100daF4d40471f1852", "ethereum",
+         "WETH", "USDT", 18,  6, numeraire=1, fee_bps=30),
+    Pool("USDC_ETH",  "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc", "ethereum",
+         "USDC", "WETH",  6, 18, numeraire=0, fee_bps=30),
+    Pool("PEPE_ETH",  "0xA43fe16908251ee70EF74718545e4FE6C5cCEc9f", "ethereum",
+         "PEPE", "WETH", 18, 18, numeraire=1, fee_bps=30),
+    # ---- PancakeSwap V2 (25 bp)；BSC 上的 USDT 是 18 decimals ----
+    Pool("USDT_WBNB", "0x16b9a82891338f9bA80E2D6970FddA79D1eb0daE", "bsc",
+         "USDT", "WBNB", 18, 18, numeraire=0, fee_bps=25),
+    Pool("CAKE_WBNB", "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0", "bsc",
+         "CAKE", "WBNB", 18, 18, numeraire=1, fee_bps=25),
+]}
+
+
+@dataclass(frozen=True)
+class BalancerPool(Pool):
+    pool_id: str            # bytes32; the first 20 bytes are the pool contract address
+    token0_address: str     # Vault token order (sorted by address)
+    token1_address: str
+    weight0: float
+    weight1: float
+
+    @property
+    def balance_file(self):
+        return f"{self.name}_balances.csv"
+
+
+BALANCER_VAULT = "0xBA12222222228d8Ba445958a75a0704d566BF2C8"
+
+BALANCER_POOLS = {p.name: p for p in [
+    # ---- Balancer V2 weighted；swap fee 以 pool 的 getSwapFeePercentage() 為準 (可被調整) ----
+    BalancerPool("GNO_COW", "0x92762b42a06dcdddc5b7362cfb01e631c4d44b40", "ethereum",
+                 "GNO", "COW", 18, 18, numeraire=1, fee_bps=30,
+                 pool_id="0x92762b42a06dcdddc5b7362cfb01e631c4d44b40000200000000000000000182",
+                 token0_address="0x6810e776880c02933d47db1b9fc05908e5386b96",
+                 token1_address="0xdef1ca1fb7fbcdc777520aa7f396b4e015f497ab",
+                 weight0=0.5, weight1=0.5),
+]}
+
+
+def get_pool(name):
+    try:
+        return POOLS[name]
+    except KeyError:
+        raise KeyError(f"unknown pool {name!r}; registered: {', '.join(POOLS)}") from None
+
+
+def get_balancer_pool(name):
+    try:
+        return BALANCER_POOLS[name]
+    except KeyError:
+        raise KeyError(f"unknown Balancer pool {name!r}; registered: {', '.join(BALANCER_POOLS)}") from None
@@ -0,0 +1,225 @@
+"""
+profiling.py
+-------------------------------------------------
+Stage-level timers and memory snapshots for the preprocessing and GMM
+scripts, off unless asked for.
+
+• switch on with  AMM_PROFILE=<dir>  (or 1 → current directory), or a
+  script's --profile flag；AMM_PROFILE_MEM=1 also turns on tracemalloc
+  (Python-level allocation peak per stage — noticeably slower)
+• off → stage() returns one shared no-op context: an attribute lookup and a
+  flag check per call, nothing is recorded
+• per stage: wall seconds, calls, rows, rows/s, RSS at the end, Δ RSS, peak
+  RSS of the process so far, tracemalloc peak；同名 stage 會累加（例如每個
+  chunk 的 "rv"），巢狀 stage 記成 "write/rv"
+• one JSON report per run: <dir>/<run>.profile.json；每個 worker process
+  自己寫自己的 run（pool 名稱當 run 名稱）
+
+    >>> with profiling.run("USDC_ETH"):
+    ...     with profiling.stage("load") as st:
+    ...         swaps = load_table(path)
+    ...         st.rows = len(swaps["blockNumber"])
+
+    AMM_PROFILE=prof python pipeline.py --all
+    python gmm.py          # flat scripts: profiling.start("gmm") … report written at exit
+"""
+
+import atexit
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:                                          # Windows
+    resource = None
+
+ENV_DIR = "AMM_PROFILE"
+ENV_MEM = "AMM_PROFILE_MEM"
+
+
+def _on(value):
+    return bool(value) and value.lower() not in ("0", "false", "no", "off")
+
+
+_enabled = _on(os.environ.get(ENV_DIR, ""))
+_memory = _enabled and _on(os.environ.get(ENV_MEM, ""))
+_current = None                                               # the active _Run
+
+
+def enable(out_dir=".", memory=False):
+    """Turn profiling on for this process and the worker processes it starts."""
+    global _enabled, _memory
+    os.environ[ENV_DIR] = out_dir
+    if memory:
+        os.environ[ENV_MEM] = "1"
+    _enabled, _memory = True, memory or _on(os.environ.get(ENV_MEM, ""))
+
+
+def enabled():
+    return _enabled
+
+
+def _out_dir():
+    d = os.environ.get(ENV_DIR, ".")
+    return "." if d.lower() in ("1", "true", "yes", "on") else d
+
+
+# ---------------- 1. memory probes ---------------- #
+def rss_mb():
+    """Current resident set size (MB); 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def peak_rss_mb():
+    """Peak RSS of this process so far (MB)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10    # bytes on macOS, kB on Linux
+
+
+# ---------------- 2. records ---------------- #
+class _Null:
+    """Shared no-op stage (profiling off)."""
+
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL = _Null()
+
+
+class _Stage:
+    __slots__ = ("run", "name", "rows", "t0", "rss0")
+
+    def __init__(self, run, name):
+        self.run, self.name, self.rows = run, name, None
+
+    def __enter__(self):
+        self.run.stack.append(self.name)
+        if _memory:
+            tracemalloc.reset_peak()
+        self.rss0 = rss_mb()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        secs = time.perf_counter() - self.t0
+        name = "/".join(self.run.stack)
+        self.run.stack.pop()
+        rec = self.run.stages.get(name)
+        if rec is None:
+            rec = self.run.stages[name] = {"stage": name, "calls": 0, "seconds": 0.0, "rows": None,
+                                           "rss_mb": 0.0, "rss_delta_mb": 0.0, "peak_rss_mb": 0.0}
+        rss = rss_mb()
+        rec["calls"] += 1
+        rec["seconds"] += secs
+        if self.rows is not None:
+            rec["rows"] = (rec["rows"] or 0) + int(self.rows)
+        rec["rss_mb"] = rss
+        rec["rss_delta_mb"] += rss - self.rss0
+        rec["peak_rss_mb"] = peak_rss_mb()
+        if _memory:
+            rec["tracemalloc_peak_mb"] = max(rec.get("tracemalloc_peak_mb", 0.0),
+                                             tracemalloc.get_traced_memory()[1] / 2**20)
+        return False
+
+
+class _Run:
+    def __init__(self, name):
+        self.name = name
+        self.stack, self.stages = [], {}
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+
+    def report(self):
+        stages = []
+        for rec in self.stages.values():
+            rec = dict(rec)
+            if rec["rows"] is not None:
+                rec["rows_per_s"] = rec["rows"] / rec["seconds"] if rec["seconds"] > 0 else None
+            stages.append(rec)
+        return {"run": self.name, "pid": os.getpid(), "argv": sys.argv,
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "seconds": time.perf_counter() - self.t0, "peak_rss_mb": peak_rss_mb(),
+                "tracemalloc": _memory, "stages": stages}
+
+
+# ---------------- 3. API ---------------- #
+def stage(name):
+    """Context manager timing one stage of the active run; set .rows on it for rows/s."""
+    if not _enabled or _current is None:
+        return _NULL
+    return _Stage(_current, name)
+
+
+def _begin(name):
+    global _current
+    if _memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _current = _Run(name)
+
+
+def start(name):
+    """Begin a run (flat scripts); its report is written at interpreter exit."""
+    if _enabled:
+        _begin(name)
+        atexit.register(finish)
+
+
+def finish():
+    """Write the active run's report; returns its path (None when off)."""
+    global _current
+    run, _current = _current, None
+    if run is None:
+        return None
+    out_dir = _out_dir()
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{run.name}.profile.json")
+    with open(path, "w") as f:
+        json.dump(run.report(), f, indent=2)
+    return path
+
+
+@contextmanager
+def run(name):
+    """start() … finish() around a block (worker functions, main())."""
+    if not _enabled:
+        yield
+        return
+    global _current
+    outer = _current
+    _begin(name)
+    try:
+        yield
+    finally:
+        finish()
+        _current = outer
+
+
+def add_argument(ap):
+    """--profile [DIR] on an argparse parser; call apply(args) after parsing."""
+    ap.add_argument("--profile", nargs="?", const=".", default=None, metavar="DIR",
+                    help=f"write <run>.profile.json stage reports to DIR (or set {ENV_DIR})")
+    ap.add_argument("--profile-memory", action="store_true", help="also trace Python allocations")
+
+
+def apply(args):
+    if args.profile is not None:
+        enable(args.profile, args.profile_memory)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+resample.py
+-------------------------------------------------
+Streaming time-bucket OHLC resampler: one pass over a (1s) price CSV writes
+several target intervals at once (12s, 1m, 1h, …).
+
+• bucket = floor(time / interval) on the epoch grid, labelled by its start
+  (same buckets as df.resample(interval, origin="epoch").agg(first/max/min/
+  last/sum)；plain df.resample anchors at each day's midnight, which only
+  differs for intervals that do not divide a day, e.g. 7s or 13min)
+• per chunk everything is vectorized (np.*.reduceat over bucket boundaries)；
+  只有每個 interval 最後一個還沒結束的 bucket 跨 chunk 帶著走 → memory does
+  not grow with the input
+• input is either a single price column (open = first, close = last price)
+  or OHLC(+volume) columns; rows with a NaN price are skipped
+• fill=True also writes empty buckets (gaps) with the previous close, Count 0
+
+    python resample.py ETHUSDC_1s.csv --intervals 12s 1min 1h
+    python resample.py ETHUSDC_1s.csv --intervals 1min --time-col "Open Time" --price-col "Close Price"
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+FIELDS = ["Open", "High", "Low", "Close", "Volume", "Count"]
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"            # fixed: pandas drops the time when a chunk is all midnights
+
+
+def _ns(interval):
+    ns = pd.Timedelta(interval).value
+    if ns <= 0:
+        raise ValueError(f"interval must be positive: {interval!r}")
+    return ns
+
+
+class BucketAggregator:
+    """OHLC buckets of one interval; feed sorted chunks with update(), then flush()."""
+
+    def __init__(self, interval, fill=False):
+        self.interval = interval
+        self.step = _ns(interval)
+        self.fill = fill
+        self._open = None        # unfinished bucket: [id, open, high, low, close, volume, count]
+        self._last = None        # (id, close) of the last emitted bucket, for fill
+
+    def update(self, t_ns, o, h, l, c, v):
+        """Aggregate one chunk; returns the buckets that are complete (a DataFrame)."""
+        if len(t_ns) == 0:
+            return self._frame(np.empty(0, dtype=np.int64), *[np.empty(0)] * 5, np.empty(0, dtype=np.int64))
+        bid = t_ns // self.step
+        starts = np.flatnonzero(np.r_[True, bid[1:] != bid[:-1]])
+        ends = np.r_[starts[1:], len(bid)]
+
+        ids = bid[starts]
+        op, cl = o[starts], c[ends - 1]
+        hi, lo = np.maximum.reduceat(h, starts), np.minimum.reduceat(l, starts)
+        vol, cnt = np.add.reduceat(v, starts), ends - starts
+
+        if self._open is not None:
+            pid, po, ph, pl, pc, pv, pn = self._open
+            if pid == ids[0]:                             # same bucket continues in this chunk
+                op[0], hi[0], lo[0] = po, max(ph, hi[0]), min(pl, lo[0])
+                vol[0] += pv
+                cnt[0] += pn
+            else:
+                ids, op, hi, lo, cl = (np.r_[pid, ids], np.r_[po, op], np.r_[ph, hi],
+                                       np.r_[pl, lo], np.r_[pc, cl])
+                vol, cnt = np.r_[pv, vol], np.r_[pn, cnt]
+
+        # the last bucket may continue in the next chunk
+        self._open = (ids[-1], op[-1], hi[-1], lo[-1], cl[-1], vol[-1], cnt[-1])
+        return self._emit(ids[:-1], op[:-1], hi[:-1], lo[:-1], cl[:-1], vol[:-1], cnt[:-1])
+
+    def flush(self):
+        """The last (unfinished) bucket at the end of the input."""
+        if self._open is None:
+            return self._emit(np.empty(0, dtype=np.int64), *[np.empty(0)] * 5, np.empty(0, dtype=np.int64))
+        parts = [np.array([x]) for x in self._open]
+        self._open = None
+        return self._emit(*parts)
+
+    def _emit(self, ids, op, hi, lo, cl, vol, cnt):
+        if self.fill and len(ids):
+            first = ids[0] if self._last is None else self._last[0] + 1
+            full = np.arange(first, ids[-1] + 1, dtype=np.int64)
+            if len(full) != len(ids):
+                pos = np.searchsorted(full, ids)
+                have = np.zeros(len(full), dtype=bool)
+                have[pos] = True
+                # previous close for the empty buckets (also across chunks)
+                src = np.maximum.accumulate(np.where(have, np.arange(len(full)), -1))
+                prev_close = np.nan if self._last is None else self._last[1]
+                close_full = np.full(len(full), np.nan)
+                close_full[pos] = cl
+                filled = np.where(src >= 0, close_full[np.maximum(src, 0)], prev_close)
+
+                def spread(a, empty):
+                    out = np.full(len(full), empty, dtype=np.result_type(a, type(empty)))
+                    out[pos] = a
+                    return out
+
+                op = np.where(have, spread(op, 0.0), filled)
+                hi = np.where(have, spread(hi, 0.0), filled)
+                lo = np.where(have, spread(lo, 0.0), filled)
+                cl = filled
+                vol, cnt = spread(vol, 0.0), spread(cnt, 0)
+                ids = full
+        if len(ids):
+            self._last = (ids[-1], cl[-1])
+        return self._frame(ids, op, hi, lo, cl, vol, cnt)
+
+    def _frame(self, ids, op, hi, lo, cl, vol, cnt):
+        return pd.DataFrame({"Timestamp": pd.to_datetime(ids * self.step, unit="ns"),
+                             "Open": op, "High": hi, "Low": lo, "Close": cl,
+                             "Volume": vol, "Count": np.asarray(cnt, dtype=np.int64)})
+
+
+def _columns(chunk, time_col, price_col, ohlc_cols, volume_col):
+    """Chunk → (sorted ns times, o, h, l, c, v) with NaN-price rows removed."""
+    t = pd.to_datetime(chunk[time_col]).astype("datetime64[ns]").to_numpy().view(np.int64)
+    if ohlc_cols:
+        o, h, l, c = (chunk[col].to_numpy(dtype=np.float64) for col in ohlc_cols)
+    else:
+        o = h = l = c = chunk[price_col].to_numpy(dtype=np.float64)
+    v = chunk[volume_col].to_numpy(dtype=np.float64) if volume_col else np.zeros(len(t))
+    ok = ~np.isnan(c)
+    if not ok.all():
+        t, o, h, l, c, v = t[ok], o[ok], h[ok], l[ok], c[ok], v[ok]
+    return t, o, h, l, c, v
+
+
+def resample_csv(input_csv, outputs, time_col="Timestamp", price_col="ETH_price", ohlc_cols=None,
+                 volume_col=None, fill=False, chunksize=CHUNK_ROWS):
+    """Single pass over input_csv; outputs = {interval: out_csv}. Returns {interval: rows written}."""
+    aggs = {iv: BucketAggregator(iv, fill) for iv in outputs}
+    rows = {iv: 0 for iv in outputs}
+    header = {iv: True for iv in outputs}
+    cols = [time_col, *(ohlc_cols or [price_col]), *([volume_col] if volume_col else [])]
+    keep = FIELDS if volume_col else [f for f in FIELDS if f != "Volume"]
+    last_t = None
+
+    def write(iv, frame):
+        fmt = DATE_FORMAT if aggs[iv].step % 10**9 == 0 else DATE_FORMAT + ".%f"
+        frame[["Timestamp", *keep]].to_csv(outputs[iv], mode="w" if header[iv] else "a",
+                                           header=header[iv], index=False, date_format=fmt)
+        header[iv] = False
+        rows[iv] += len(frame)
+
+    for chunk in pd.read_csv(input_csv, usecols=cols, chunksize=chunksize):
+        t, o, h, l, c, v = _columns(chunk, time_col, price_col, ohlc_cols, volume_col)
+        if len(t) and ((last_t is not None and t[0] < last_t) or (np.diff(t) < 0).any()):
+            raise ValueError(f"{input_csv} is not sorted by {time_col!r}")
+        if len(t):
+            last_t = t[-1]
+        for iv, agg in aggs.items():
+            write(iv, agg.update(t, o, h, l, c, v))
+    for iv, agg in aggs.items():
+        write(iv, agg.flush())
+    return rows
+
+
+def output_name(input_csv, interval):
+    """ETHUSDC_1s.csv + 12s → ETHUSDC_12s.csv (otherwise <stem>_<interval>.csv)."""
+    stem, ext = os.path.splitext(input_csv)
+    base = stem.rsplit("_", 1)[0] if "_" in os.path.basename(stem) else stem
+    return f"{base}_{interval}{ext or '.csv'}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Streaming multi-interval OHLC resampler")
+    ap.add_argument("input", help="price CSV sorted by time (e.g. ETHUSDC_1s.csv)")
+    ap.add_argument("--intervals", nargs="+", default=["12s", "1min", "1h"])
+    ap.add_argument("--time-col", default="Timestamp")
+    ap.add_argument("--price-col", default="ETH_price")
+    ap.add_argument("--ohlc-cols", default=None, help="e.g. Open,High,Low,Close (instead of --price-col)")
+    ap.add_argument("--volume-col", default=None)
+    ap.add_argument("--fill", action="store_true", help="also write empty buckets (previous close)")
+    ap.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args(argv)
+
+    ohlc = args.ohlc_cols.split(",") if args.ohlc_cols else None
+    if ohlc and len(ohlc) != 4:
+        ap.error("--ohlc-cols needs four names")
+    outputs = {iv: output_name(args.input, iv) for iv in args.intervals}
+    rows = resample_csv(args.input, outputs, args.time_col, args.price_col, ohlc,
+                        args.volume_col, args.fill, args.chunksize)
+    for iv, out in outputs.items():
+        print(f"✅ {iv:>6} → {out}  ({rows[iv]:,} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+rv.py
+-------------------------------------------------
+Rolling realized volatility  RV_t = sqrt( Σ_{i=t-W+1..t} r_i² ),  O(N).
+
+• same semantics as
+      s.rolling(W, min_periods=M).apply(lambda x: np.sqrt(np.nansum(x**2)))
+  NaN（以及 ±inf，pandas rolling 也把它當 NaN）不計入總和、也不計入
+  min_periods 的觀測數
+• running sum of squares without drift: the series is cut into W-long
+  segments on a fixed global grid, and every window sum is
+      suffix(segment k-1) + prefix(segment k)
+  where both partial sums are Kahan-compensated (vectorized TwoSum), so the
+  error never depends on how long the series is
+• RollingRV keeps ≤ 2W values of state → chunked / streaming input gives the
+  exact same floats as a single call on the whole array
+"""
+
+import numpy as np
+
+
+def _comp_cumsum(a, axis=-1):
+    """Compensated cumulative sum (vectorized TwoSum on np.cumsum's steps)."""
+    c    = np.cumsum(a, axis=axis)
+    prev = np.roll(c, 1, axis=axis)
+    np.moveaxis(prev, axis, 0)[0] = 0.0
+    bb   = c - prev
+    err  = (prev - (c - bb)) + (a - bb)
+    return c + np.cumsum(err, axis=axis)
+
+
+def _window_sums(ext, w):
+    """Window sums for ext[w:], where len(ext) % w == 0 and ext[0] is on the grid.
+
+    Returns (sum of finite squares, #finite values) for each position ≥ w.
+    """
+    k  = len(ext) // w
+    ok = np.isfinite(ext)
+    sq = np.where(ok, ext * ext, 0.0).reshape(k, w)
+
+    pre = _comp_cumsum(sq, axis=1)                           # Σ seg[k, 0..j]
+    suf = _comp_cumsum(sq[:, ::-1], axis=1)[:, ::-1]         # Σ seg[k, j..w-1]
+    suf = np.concatenate([suf[:, 1:], np.zeros((k, 1))], axis=1)   # Σ seg[k, j+1..]
+
+    tot = (suf[:-1] + pre[1:]).ravel()
+
+    cnt  = np.cumsum(ok, dtype=np.int64)
+    n_ok = cnt[w:] - cnt[:-w]
+    return tot, n_ok
+
+
+class RollingRV:
+    """Streaming rolling RV; feed chunks with update(), get RV for each value.
+
+    >>> rv = RollingRV(7200)
+    >>> out = np.concatenate([rv.update(c) for c in chunks])
+    """
+
+    def __init__(self, window, min_periods=None):
+        self.window      = int(window)
+        self.min_periods = self.window if min_periods is None else int(min_periods)
+        self._buf   = np.full(self.window, np.nan)   # segment -1 (before the data)
+        self._start = -self.window                    # global index of _buf[0]
+
+    @property
+    def state(self):
+        return self._buf.copy(), self._start
+
+    @state.setter
+    def state(self, value):
+        buf, start = value
+        self._buf, self._start = np.asarray(buf, dtype=np.float64).copy(), int(start)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if x.size == 0:
+            return np.empty(0)
+        w    = self.window
+        head = len(self._buf)
+        ext  = np.concatenate([self._buf, x])
+        n    = len(ext)
+
+        pad = -n % w
+        tot, n_ok = _window_sums(np.concatenate([ext, np.full(pad, np.nan)]), w)
+        sl = slice(head - w, n - w)
+
+        out = np.sqrt(np.maximum(tot[sl], 0.0))
+        out[n_ok[sl] < self.min_periods] = np.nan
+
+        # keep from the start of the segment before the next value
+        nxt  = self._start + n
+        keep = (nxt // w - 1) * w
+        self._buf   = ext[keep - self._start:]
+        self._start = keep
+        return out
+
+
+def rolling_rv(x, window, min_periods=None):
+    """RV for a whole array at once (same floats as streaming it)."""
+    return RollingRV(window, min_periods).update(x)
+
+
+def rv_stream(chunks, window, min_periods=None):
+    """Generator form: yields one RV array per input chunk."""
+    rv = RollingRV(window, min_periods)
+    for chunk in chunks:
+        yield rv.update(chunk)
@@ -1,5 +1,14 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import profiling
+
+# AMM_PROFILE=<dir> → stage timings / memory in <dir>/uniswapv2_drop.profile.json
+profiling.start("uniswapv2_drop")
+
 # Define the file path and data types
 file_path = "uniswap_v2.csv"
 output_file = "drop.csv"
@@ -17,13 +26,17 @@ dtypes = {
 }
 
 # Read the CSV file with specified dtypes
-df = pd.read_csv(file_path, dtype=dtypes)
+with profiling.stage("load") as st:
+    df = pd.read_csv(file_path, dtype=dtypes)
+    st.rows = len(df)
 
 # Drop columns related to mint and burn
 columns_to_drop = ["mint_amount0", "mint_amount1", "burn_amount0", "burn_amount1"]
 df = df.drop(columns=columns_to_drop)
 
 # Save the updated DataFrame to a new CSV file
-df.to_csv(output_file, index=False)
+with profiling.stage("write") as st:
+    df.to_csv(output_file, index=False)
+    st.rows = len(df)
 
 print(f"Updated CSV saved as '{output_file}'.")
@@ -1,5 +1,14 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import profiling
+
+# AMM_PROFILE=<dir> → stage timings / memory in <dir>/uniswapv2_merge.profile.json
+profiling.start("uniswapv2_merge")
+
 dtypes = {
     "burn_amount0": "string",  
     "burn_amount1": "string",  
@@ -16,16 +25,22 @@ dtypes = {
 
 
 # Load the two CSV files into DataFrames
-df1 = pd.read_csv("timestamp.csv", low_memory=False, dtype=dtypes)
-df2 = pd.read_csv("merge.csv", low_memory=False, dtype=dtypes)
+with profiling.stage("load") as st:
+    df1 = pd.read_csv("timestamp.csv", low_memory=False, dtype=dtypes)
+    df2 = pd.read_csv("merge.csv", low_memory=False, dtype=dtypes)
+    st.rows = len(df1) + len(df2)
 
 # Merge the two DataFrames on the 'blockNumber' column using an outer join
-merged_df = pd.merge(df1, df2, on="blockNumber", how="outer")
+with profiling.stage("merge") as st:
+    merged_df = pd.merge(df1, df2, on="blockNumber", how="outer")
 
-# Sort the DataFrame by 'blockNumber'
-merged_df = merged_df.sort_values(by="blockNumber")
+    # Sort the DataFrame by 'blockNumber'
+    merged_df = merged_df.sort_values(by="blockNumber")
+    st.rows = len(merged_df)
 
 # Save the merged DataFrame to a new CSV file
-merged_df.to_csv("merge.csv", index=False)
+with profiling.stage("write") as st:
+    merged_df.to_csv("merge.csv", index=False)
+    st.rows = len(merged_df)
 
 print("Merged CSV saved as 'merge.csv'")
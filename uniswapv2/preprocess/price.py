@@ -1,49 +1,57 @@
+import os
+import sys
+import time
+
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import profiling
+from replay import initial_state, replay_chunk
+
+# AMM_PROFILE=<dir> → stage timings / memory in <dir>/uniswapv2_price.profile.json
+profiling.start("uniswapv2_price")
+
 # File paths
 input_file = "./merge.csv"
 output_file = "./uniswap_v2.csv"
 
 # Specify the start row and chunk size
 start_row = 1  # Start processing from this row
-chunksize = 3000  # Number of rows per chunk
-
-previous_row = pd.read_csv(input_file, skiprows=range(1, start_row - 1), nrows=1, dtype="string")
-
-# Process the file in chunks starting from the specific row
-for chunk in pd.read_csv(input_file, chunksize=chunksize, skiprows=range(1, start_row-1), dtype="string"):
+chunksize = 1_000_000  # Number of rows per chunk (replay is vectorized, big chunks are fine)
 
-    chunk = pd.concat([previous_row, chunk], ignore_index=True)
+# reserve0 * PRICE_SCALE / reserve1 → USDC (6 dec) per ETH (18 dec)
+PRICE_SCALE = 10**12
 
-    # Calculate reserve0 and reserve1 iteratively
-    for i in range(1, len(chunk)):
-        chunk.loc[i, "reserve0"] = str(
-            int(chunk.loc[i - 1, "reserve0"])  # reserve0(t-1)
-            + int(chunk.loc[i, "mint_amount0"])
-            - int(chunk.loc[i, "burn_amount0"])
-            + int(chunk.loc[i, "amount0In"])
-            - int(chunk.loc[i, "amount0Out"])
-        )
-        chunk.loc[i, "reserve1"] = str(
-            int(chunk.loc[i - 1, "reserve1"])  # reserve1(t-1)
-            + int(chunk.loc[i, "mint_amount1"])
-            - int(chunk.loc[i, "burn_amount1"])
-            + int(chunk.loc[i, "amount1In"])
-            - int(chunk.loc[i, "amount1Out"])
-        )
-
-        chunk.loc[i, "ETH_price"] = str(round(int(chunk.loc[i, "reserve0"]) * 10**12 / int(chunk.loc[i, "reserve1"]), 2))
-
-    # Save the last row of this chunk for the next iteration
-    previous_row = chunk.iloc[[-1]]  # Preserve the last row for continuity
-
-    # Drop the last row before saving the chunk (it will be processed in the next chunk)
-    chunk = chunk.iloc[:-1]
-
-    # Append processed chunk to the output file
-    chunk.to_csv(output_file, mode="a", index=False, header=False)
+previous_row = pd.read_csv(input_file, skiprows=range(1, start_row - 1), nrows=1, dtype="string")
+state = initial_state(previous_row.loc[0, "reserve0"], previous_row.loc[0, "reserve1"])
 
-# Save the final previous row (last row of the last chunk)
-previous_row.to_csv(output_file, mode="a", index=False, header=False)
+start = time.perf_counter()
+rows = 0
+header = True
 
+# Process the file in chunks starting from the specific row
+reader = pd.read_csv(input_file, chunksize=chunksize, skiprows=range(1, start_row-1), dtype="string")
+while True:
+    with profiling.stage("load") as st:
+        chunk = next(reader, None)
+        st.rows = 0 if chunk is None else len(chunk)
+    if chunk is None:
+        break
+
+    # reserve(t) = reserve(t-1) + mint - burn + in - out, carried across chunks via `state`
+    with profiling.stage("replay") as st:
+        chunk, state = replay_chunk(chunk, state, PRICE_SCALE)
+        st.rows = len(chunk)
+
+    with profiling.stage("write") as st:
+        chunk.to_csv(output_file, mode="w" if header else "a", index=False, header=header)
+        st.rows = len(chunk)
+    header = False
+
+    rows += len(chunk)
+    elapsed = time.perf_counter() - start
+    print(f"{rows:,} rows replayed  ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+elapsed = time.perf_counter() - start
 print(f"Processing completed. Processed file saved to '{output_file}'.")
+print(f"Throughput: {rows:,} rows in {elapsed:.2f} s = {rows / max(elapsed, 1e-9):,.0f} rows/s")
@@ -1,9 +1,21 @@
+import os
+import sys
+
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import profiling
+from block_time import BlockTimeIndex, index_path
+
+# AMM_PROFILE=<dir> → stage timings / memory in <dir>/uniswapv2_timestamp.profile.json
+profiling.start("uniswapv2_timestamp")
 
 # File paths
 input_file = "timestamp.csv"
 output_file = "test.csv"
+chain = "ethereum"
+index_file = index_path(chain)          # built with: python block_time.py build --chain ethereum ...
 
 dtypes = {
     "burn_amount0": "string",
@@ -18,34 +30,37 @@ dtypes = {
     "amount1Out": "string",
 }
 
-# Initial values
+# Fallback when there is no index yet: one anchor + average block time (drifts over long ranges)
 start_block = 18908894
 start_timestamp = "2023-12-31 11:59:59"  # Starting timestamp
 average_block_time = 12.09992925000  # Average block generation period in seconds
 
+if os.path.exists(index_file):
+    index = BlockTimeIndex.load(index_file)
+else:
+    print(f"⚠️ {index_file} not found, extrapolating from block {start_block}")
+    index = BlockTimeIndex.from_anchor(start_block, start_timestamp, chain, average_block_time)
+
 # Read the CSV file
-df = pd.read_csv(input_file, low_memory=False, dtype=dtypes)
+with profiling.stage("load") as st:
+    df = pd.read_csv(input_file, low_memory=False, dtype=dtypes)
+    st.rows = len(df)
 
 # Ensure the CSV has a 'blockNumber' column
 if "blockNumber" not in df.columns:
     raise ValueError("The CSV must contain a 'blockNumber' column.")
 
 # Sort by blockNumber to ensure proper calculation
-df = df.sort_values(by="blockNumber").reset_index(drop=True)
-
-# Calculate the timestamp for each block
-current_time = datetime.strptime(start_timestamp, "%Y-%m-%d %H:%M:%S")
-timestamps = []
-
-for block in df["blockNumber"]:
-    time_difference = (block - start_block) * average_block_time
-    adjusted_time = current_time + timedelta(seconds=time_difference)
-    timestamps.append(adjusted_time.strftime("%Y-%m-%d %H:%M:%S"))
+with profiling.stage("timestamp") as st:
+    df = df.sort_values(by="blockNumber").reset_index(drop=True)
 
-# Replace or add the timestamp column
-df["Timestamp"] = timestamps
-df.drop(columns=['timestamp'], inplace=True)
+    # Timestamp of every block: vectorized interpolation between anchor blocks
+    df["Timestamp"] = index.datetimes(df["blockNumber"].to_numpy(dtype=np.int64))
+    df.drop(columns=['timestamp'], inplace=True, errors="ignore")
+    st.rows = len(df)
 # Save the updated DataFrame to a new CSV
-df.to_csv(output_file, index=False)
+with profiling.stage("write") as st:
+    df.to_csv(output_file, index=False)
+    st.rows = len(df)
 
 print(f"CSV with updated timestamps saved as '{output_file}'.")
@@ -0,0 +1,266 @@
+"""
+wideint.py
+-------------------------------------------------
+Vectorized wide unsigned integers (uint256 amounts / reserves) as NumPy
+multi-limb arrays: shape (N, L) uint64, least significant limb first — the
+same layout as the event_cache.py columns.
+
+• from_column: int64 / Python-int (object) / decimal-string column → limbs
+• add, sub (OverflowError on carry / borrow), cmp, eq, lt, gt, is_zero
+• mul_const (exact, the result grows as many limbs as it needs), cumsum
+  (exact running sums), div_small (÷ constant < 2**32 → quotient, remainder)
+• to_float(a, scale): a / scale correctly rounded — the same float as
+  Python's int / int — from a double-double estimate；只有落在兩個 float
+  正中間附近的極少數列才改用 Python int 精確計算
+• to_decimal(a, decimals): exact decimal strings ("1234.000000000000000001")
+
+    >>> a = from_column(swaps["amount0In"])
+    >>> net = mul_const(a, 10_000 - pool.fee_bps)               # exact netIn × 10**4
+    >>> net_h = to_float(net, 10_000 * 10**pool.dec0)
+"""
+
+import numpy as np
+import pandas as pd
+
+from event_cache import U256_LIMBS, int_to_uint256, parse_uint256
+
+_M32 = np.uint64(0xFFFFFFFF)
+_S32 = np.uint64(32)
+_SPLIT = 134217729.0                  # 2**27 + 1 (Dekker split)
+
+
+# ---------------- 1. conversion ---------------- #
+def from_column(values, limbs=U256_LIMBS):
+    """int64 / Python ints / decimal strings (array or Series) → (N, limbs) uint64."""
+    if isinstance(values, pd.Series):
+        values = values.to_numpy()
+    arr = np.asarray(values)
+    if arr.ndim == 2:
+        return _pad(arr.astype(np.uint64, copy=False), limbs)
+    if arr.dtype.kind in "SU" or (arr.dtype == object and len(arr) and isinstance(arr[0], str)):
+        return _pad(parse_uint256(arr), limbs)
+    return _pad(int_to_uint256(arr), limbs)
+
+
+def to_ints(a):
+    """(N, L) limbs → object array of exact Python ints."""
+    out = np.zeros(len(a), dtype=object)
+    for k in range(a.shape[1] - 1, -1, -1):
+        out = (out << 64) + a[:, k].astype(object)
+    return out
+
+
+def _pad(a, limbs):
+    if a.shape[1] >= limbs:
+        if a.shape[1] > limbs and a[:, limbs:].any():
+            raise OverflowError(f"integer wider than {64 * limbs} bits")
+        return a[:, :limbs]
+    return np.concatenate([a, np.zeros((len(a), limbs - a.shape[1]), dtype=np.uint64)], axis=1)
+
+
+def _same_width(a, b):
+    w = max(a.shape[1], b.shape[1])
+    return _pad(a, w), _pad(b, w)
+
+
+def _halves(a):
+    """(N, L) limbs → (N, 2L) 32-bit digits (in uint64), least significant first."""
+    h = np.empty((len(a), 2 * a.shape[1]), dtype=np.uint64)
+    h[:, 0::2] = a & _M32
+    h[:, 1::2] = a >> _S32
+    return h
+
+
+def _join(h):
+    if h.shape[1] % 2:
+        h = np.concatenate([h, np.zeros((len(h), 1), dtype=np.uint64)], axis=1)
+    return h[:, 0::2] | (h[:, 1::2] << _S32)
+
+
+# ---------------- 2. arithmetic / comparison ---------------- #
+def add(a, b):
+    a, b = _same_width(a, b)
+    out = np.empty_like(a)
+    carry = np.zeros(len(a), dtype=np.uint64)
+    for k in range(a.shape[1]):
+        s = a[:, k] + b[:, k]
+        c1 = s < a[:, k]
+        out[:, k] = s + carry
+        carry = (c1 | (out[:, k] < s)).astype(np.uint64)
+    if carry.any():
+        raise OverflowError(f"sum wider than {64 * a.shape[1]} bits")
+    return out
+
+
+def sub(a, b):
+    a, b = _same_width(a, b)
+    out = np.empty_like(a)
+    borrow = np.zeros(len(a), dtype=np.uint64)
+    for k in range(a.shape[1]):
+        d = a[:, k] - b[:, k]
+        b1 = a[:, k] < b[:, k]
+        out[:, k] = d - borrow
+        borrow = (b1 | (d < borrow)).astype(np.uint64)
+    if borrow.any():
+        raise OverflowError("negative difference in unsigned subtraction")
+    return out
+
+
+def cmp(a, b):
+    """-1 / 0 / 1 per row (int8)."""
+    a, b = _same_width(a, b)
+    out = np.zeros(len(a), dtype=np.int8)
+    open_ = np.ones(len(a), dtype=bool)
+    for k in range(a.shape[1] - 1, -1, -1):
+        out[open_ & (a[:, k] > b[:, k])] = 1
+        out[open_ & (a[:, k] < b[:, k])] = -1
+        open_ &= a[:, k] == b[:, k]
+    return out
+
+
+def eq(a, b):
+    a, b = _same_width(a, b)
+    return (a == b).all(axis=1)
+
+
+def lt(a, b):
+    return cmp(a, b) < 0
+
+
+def gt(a, b):
+    return cmp(a, b) > 0
+
+
+def is_zero(a):
+    return ~a.any(axis=1)
+
+
+def mul_const(a, c, limbs=None):
+    """Exact a × c for a Python int constant c ≥ 0; by default as many limbs as needed."""
+    c = int(c)
+    if c < 0:
+        raise ValueError("negative constant")
+    digits = []
+    while c:
+        digits.append(c & 0xFFFFFFFF)
+        c >>= 32
+    h = _halves(a)
+    n_h = h.shape[1]
+    res = np.zeros((len(a), n_h + max(len(digits), 1)), dtype=np.uint64)
+    for j, cj in enumerate(digits):
+        cj = np.uint64(cj)
+        carry = np.zeros(len(a), dtype=np.uint64)
+        for i in range(n_h):
+            t = h[:, i] * cj + res[:, i + j] + carry          # ≤ (2**32-1)**2 + 2·(2**32-1) < 2**64
+            res[:, i + j] = t & _M32
+            carry = t >> _S32
+        res[:, n_h + j] = carry
+    out = _join(res)
+    return _pad(out, a.shape[1] + (len(digits) + 1) // 2 if limbs is None else limbs)
+
+
+def cumsum(a):
+    """Exact running sums down the rows; one limb wider than a (fine for < 2**32 rows)."""
+    h = _halves(a)
+    s = np.cumsum(h, axis=0, dtype=np.uint64)                  # each < rows · 2**32
+    res = np.empty((len(a), h.shape[1] + 2), dtype=np.uint64)
+    carry = np.zeros(len(a), dtype=np.uint64)
+    for k in range(h.shape[1]):
+        v = s[:, k] + carry
+        res[:, k] = v & _M32
+        carry = v >> _S32
+    res[:, -2] = carry & _M32
+    res[:, -1] = carry >> _S32
+    return _join(res)
+
+
+def div_small(a, c):
+    """(a // c, a % c) for a constant 0 < c < 2**32."""
+    c = int(c)
+    if not 0 < c < 2**32:
+        raise ValueError("divisor must be in (0, 2**32)")
+    cu = np.uint64(c)
+    h = _halves(a)
+    q = np.empty_like(h)
+    r = np.zeros(len(a), dtype=np.uint64)
+    for i in range(h.shape[1] - 1, -1, -1):
+        cur = (r << _S32) | h[:, i]                            # < c · 2**32
+        q[:, i] = cur // cu
+        r = cur % cu
+    return _join(q), r
+
+
+# ---------------- 3. scaled conversion ---------------- #
+def _two_sum(x, y):
+    s = x + y
+    bb = s - x
+    return s, (x - (s - bb)) + (y - bb)
+
+
+def _two_prod(x, y):
+    p = x * y
+    xh = x * _SPLIT
+    xh = xh - (xh - x)
+    yh = y * _SPLIT
+    yh = yh - (yh - y)
+    xl, yl = x - xh, y - yh
+    return p, ((xh * yh - p) + xh * yl + xl * yh) + xl * yl
+
+
+def to_float(a, scale=1):
+    """a / scale as float64, correctly rounded: the same float as int(a) / scale in Python."""
+    scale = int(scale)
+    d = float(scale)
+    if scale <= 0 or int(d) != scale:                          # scale not an exact double
+        return np.array([x / scale for x in to_ints(a)], dtype=np.float64)
+
+    if not a[:, 1:].any() and not (a[:, 0] >> np.uint64(53)).any():
+        return a[:, 0].astype(np.float64) / d                  # both exact doubles → one rounding
+
+    # double-double of the integer, 32 bits at a time (every step exact up to ~2**-106),
+    # starting at the highest 32-bit digit that is non-zero in any row
+    h = np.ascontiguousarray(_halves(a).astype(np.float64).T)
+    top = int(np.flatnonzero(h.any(axis=1))[-1])
+    hi = h[top].copy()
+    lo = np.zeros(len(a))
+    for i in range(top - 1, -1, -1):
+        s, e = _two_sum(hi * 2.0**32, h[i])
+        hi, lo = _two_sum(s, lo * 2.0**32 + e)
+
+    # ÷ scale in double-double
+    q1 = hi / d
+    p, pe = _two_prod(q1, d)
+    q2 = (((hi - p) - pe) + lo) / d
+    s, e = _two_sum(q1, q2)
+
+    # s is the correctly rounded quotient unless the true value sits (almost) on a midpoint
+    up = np.nextafter(s, np.inf) - s
+    down = s - np.nextafter(s, -np.inf)
+    half = np.where(e >= 0, up, down) * 0.5
+    tie = (e != 0) & (np.abs(np.abs(e) - half) <= np.abs(s) * 2.0**-96)
+    if tie.any():
+        s[tie] = [x / scale for x in to_ints(a[tie])]
+    return s
+
+
+def to_decimal(a, decimals=0):
+    """Exact decimal strings of a / 10**decimals (str array), e.g. '0.000000000000000001'."""
+    chunks = []
+    rest = a
+    n_chunks = -(-a.shape[1] * 64 * 30103 // 100000 // 9) + 1    # base-10**9 digits of 2**(64L)
+    for _ in range(n_chunks):
+        rest, r = div_small(rest, 10**9)
+        chunks.append(r)
+    base = np.stack(chunks[::-1], axis=1)                         # most significant first
+    width = max(9 * n_chunks, decimals + 1)
+    digits = np.zeros((len(a), width), dtype=np.uint8) + ord("0")
+    pw = 10 ** np.arange(8, -1, -1, dtype=np.uint64)
+    d9 = ((base[:, :, None] // pw) % np.uint64(10)).astype(np.uint8) + ord("0")
+    digits[:, width - 9 * n_chunks:] = d9.reshape(len(a), -1)
+
+    int_part = np.char.lstrip(digits[:, :width - decimals].copy().view(f"S{width - decimals}").ravel(), b"0")
+    int_part = np.where(int_part == b"", b"0", int_part)
+    if not decimals:
+        return int_part.astype(str)
+    frac = digits[:, width - decimals:].copy().view(f"S{decimals}").ravel()
+    return np.char.add(np.char.add(int_part, b"."), frac).astype(str)